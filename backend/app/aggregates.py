@@ -0,0 +1,278 @@
+from __future__ import annotations
+from datetime import date, datetime, timedelta, timezone
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import Select, case, func, select
+from sqlalchemy.orm import Session, aliased
+
+from .listing import km_anterior_expr
+from .models import Abastecimento, AbastecimentoRollup, Veiculo
+from .rollups import periodo_de
+from .settings import settings
+from .utils import quinzena_range
+
+# Os totais vêm de abastecimentos_rollup (O(períodos) linhas por usuário);
+# só a quinzena corrente é lida linha a linha para as séries por lançamento.
+
+def _data_utc(dt: datetime) -> date:
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    return dt.date()
+
+
+def inicio_do_mes(dt: datetime) -> datetime:
+    return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def ultimos_meses(hoje: datetime, meses: int) -> list[datetime]:
+    atual = inicio_do_mes(hoje)
+    return [atual - relativedelta(months=i) for i in range(meses - 1, -1, -1)]
+
+# =============================
+# SÉRIES MENSAIS (1 query)
+# =============================
+
+def monthly_series_stmt(user_id: int, hoje: datetime, meses: int = 6) -> tuple[Select, list[datetime]]:
+    inicios = ultimos_meses(hoje, meses)
+    fim = inicios[-1] + relativedelta(months=1)
+
+    stmt = select(
+        AbastecimentoRollup.periodo,
+        func.sum(AbastecimentoRollup.total_valor),
+        func.sum(AbastecimentoRollup.total_litros),
+    ).where(
+        AbastecimentoRollup.user_id == user_id,
+        AbastecimentoRollup.periodo >= inicios[0].date(),
+        AbastecimentoRollup.periodo < fim.date()
+    ).group_by(AbastecimentoRollup.periodo)
+    return stmt, inicios
+
+
+def monthly_series_from_rows(rows, inicios: list[datetime]) -> list[dict]:
+    por_mes: dict[tuple[int, int], list[float]] = {}
+    for periodo, valor, litros in rows:
+        acc = por_mes.setdefault((periodo.year, periodo.month), [0.0, 0.0])
+        acc[0] += float(valor or 0)
+        acc[1] += float(litros or 0)
+
+    serie = []
+    for inicio in inicios:
+        valor, litros = por_mes.get((inicio.year, inicio.month), (0.0, 0.0))
+        serie.append({
+            "mes": inicio.strftime("%m/%Y"),
+            "valor": valor,
+            "litros": litros,
+        })
+    return serie
+
+
+def monthly_series(db: Session, user_id: int, hoje: datetime, meses: int = 6) -> list[dict]:
+    """Soma valor e litros por mês a partir dos rollups, com meses vazios zerados."""
+    stmt, inicios = monthly_series_stmt(user_id, hoje, meses)
+    return monthly_series_from_rows(db.execute(stmt).all(), inicios)
+
+# =============================
+# GASTOS POR VEÍCULO (1 query)
+# =============================
+
+def vehicle_series_stmt(user_id: int, hoje: datetime, meses: int = 6) -> Select:
+    """Gasto total por veículo e gasto, litros e km no período do gráfico.
+
+    Parte de veiculos (poucas linhas por usuário, outer join: veículo sem
+    abastecimentos sai zerado) e lê abastecimentos pelo índice (veiculo_id,
+    data_hora, id) INCLUDE (valor, litros, km_odometro): index-only no PostgreSQL.
+    As colunas do período somam só as linhas a partir do início do gráfico.
+    """
+    inicio = ultimos_meses(hoje, meses)[0]
+    no_periodo = Abastecimento.data_hora >= inicio
+
+    def do_periodo(coluna):
+        return case((no_periodo, coluna))
+
+    # Litros do primeiro abastecimento do período: abastecem km de antes do período
+    primeiro = aliased(Abastecimento)
+    litros_primeiro = select(primeiro.litros).where(
+        primeiro.veiculo_id == Veiculo.id,
+        primeiro.data_hora >= inicio
+    ).order_by(primeiro.data_hora, primeiro.id).limit(1).scalar_subquery()
+
+    return select(
+        Veiculo.id,
+        Veiculo.placa,
+        func.sum(Abastecimento.valor).label("valor_total"),
+        func.sum(do_periodo(Abastecimento.valor)).label("valor"),
+        func.sum(do_periodo(Abastecimento.litros)).label("litros"),
+        func.count(do_periodo(Abastecimento.id)).label("quantidade"),
+        (
+            func.max(do_periodo(Abastecimento.km_odometro))
+            - func.min(do_periodo(Abastecimento.km_odometro))
+        ).label("km_rodado"),
+        litros_primeiro.label("litros_primeiro"),
+    ).outerjoin(
+        Abastecimento, Abastecimento.veiculo_id == Veiculo.id
+    ).where(
+        Veiculo.user_id == user_id
+    ).group_by(Veiculo.id, Veiculo.placa).order_by(Veiculo.placa)
+
+
+def vehicle_series_from_rows(rows) -> dict:
+    """`gastos_por_veiculo` (todo o histórico) e `consumo_por_veiculo_6m` (período do gráfico)."""
+    gastos, consumo = [], []
+    for r in rows:
+        litros = float(r.litros or 0)
+        km = int(r.km_rodado or 0)
+        # km do primeiro ao último abastecimento: consumiu os litros dos abastecimentos
+        # depois do primeiro (como km_por_litro_por_lancamento, que divide pelo litros
+        # de quem fecha o trecho)
+        consumidos = litros - float(r.litros_primeiro or 0)
+        gastos.append({
+            "veiculo_id": r.id,
+            "veiculo": r.placa,
+            "valor": float(r.valor_total or 0),
+        })
+        consumo.append({
+            "veiculo_id": r.id,
+            "veiculo": r.placa,
+            "valor": float(r.valor or 0),
+            "litros": litros,
+            "quantidade": int(r.quantidade),
+            "km_rodado": km,
+            "km_por_litro": round(km / consumidos, 2) if km > 0 and consumidos > 0 else None,
+        })
+    return {"gastos_por_veiculo": gastos, "consumo_por_veiculo_6m": consumo}
+
+
+def vehicle_series(db: Session, user_id: int, hoje: datetime, meses: int = 6) -> dict:
+    return vehicle_series_from_rows(db.execute(vehicle_series_stmt(user_id, hoje, meses)).all())
+
+# =============================
+# TOTAIS DO MÊS / QUINZENA (1 query)
+# =============================
+
+def period_totals_stmt(user_id: int, hoje: datetime) -> Select:
+    return select(
+        AbastecimentoRollup.periodo,
+        AbastecimentoRollup.posto,
+        AbastecimentoRollup.total_valor,
+        AbastecimentoRollup.total_litros,
+    ).where(
+        AbastecimentoRollup.user_id == user_id,
+        AbastecimentoRollup.periodo >= inicio_do_mes(hoje).date(),
+        AbastecimentoRollup.periodo <= periodo_de(hoje)
+    )
+
+
+def period_totals_from_rows(rows, hoje: datetime) -> dict:
+    quinzena = periodo_de(hoje)
+    totais = {
+        "total_mes": 0.0,
+        "litros_mes": 0.0,
+        "total_quinzena": 0.0,
+        "litros_quinzena": 0.0,
+        "ipiranga_quinzena": 0.0,
+    }
+    for periodo, posto, valor, litros in rows:
+        totais["total_mes"] += float(valor)
+        totais["litros_mes"] += float(litros)
+        if periodo == quinzena:
+            totais["total_quinzena"] += float(valor)
+            totais["litros_quinzena"] += float(litros)
+            if posto == "IPIRANGA":
+                totais["ipiranga_quinzena"] += float(valor)
+    return totais
+
+
+def period_totals(db: Session, user_id: int, hoje: datetime) -> dict:
+    """Totais do mês e da quinzena corrente lidos das (no máximo 4) linhas de rollup."""
+    return period_totals_from_rows(db.execute(period_totals_stmt(user_id, hoje)).all(), hoje)
+
+
+def dashboard_totals_from_rows(rows, hoje: datetime) -> dict:
+    """Totais do Dashboard com o saldo Ipiranga da quinzena (bootstrap e eventos SSE)."""
+    totais = period_totals_from_rows(rows, hoje)
+    limite = settings.IPIRANGA_LIMIT_PER_QUINZENA
+    return {
+        "total_mes": totais["total_mes"],
+        "litros_mes": totais["litros_mes"],
+        "total_quinzena": totais["total_quinzena"],
+        "litros_quinzena": totais["litros_quinzena"],
+        "ipiranga_limite": limite,
+        "gasto_ipiranga_quinzena": totais["ipiranga_quinzena"],
+        "saldo_ipiranga_quinzena": limite - totais["ipiranga_quinzena"],
+    }
+
+# =============================
+# RESUMO DA QUINZENA (DashboardSummary)
+# =============================
+
+def quinzena_entries_stmt(user_id: int, hoje: datetime) -> Select:
+    inicio, fim, _ = quinzena_range(hoje)
+    lancamentos = select(
+        Abastecimento.id,
+        Abastecimento.user_id,
+        Abastecimento.veiculo_id,
+        Abastecimento.data_hora,
+        Abastecimento.valor,
+        Abastecimento.litros,
+        Abastecimento.km_odometro,
+    ).where(
+        Abastecimento.user_id == user_id,
+        Abastecimento.data_hora >= inicio,
+        Abastecimento.data_hora < fim + timedelta(seconds=1)
+    ).subquery()
+
+    # km anterior por veículo (pode ser de antes da quinzena)
+    return select(
+        lancamentos.c.data_hora,
+        lancamentos.c.valor,
+        lancamentos.c.litros,
+        lancamentos.c.km_odometro,
+        km_anterior_expr(lancamentos.c).label("km_anterior"),
+    ).order_by(lancamentos.c.data_hora, lancamentos.c.id)
+
+
+def quinzena_summary_from_rows(totais: dict, lancamentos, hoje: datetime) -> dict:
+    inicio, fim, label = quinzena_range(hoje)
+
+    limite = settings.IPIRANGA_LIMIT_PER_QUINZENA
+    gasto_ipiranga = totais["ipiranga_quinzena"]
+    total_gasto = totais["total_quinzena"]
+    total_litros = totais["litros_quinzena"]
+
+    dias = (fim.date() - inicio.date()).days + 1
+    labels = [(inicio + timedelta(days=i)).strftime("%d/%m") for i in range(dias)]
+    gastos_por_dia = [0.0] * dias
+    preco_litro = []
+    km_por_litro = []
+
+    for data_hora, valor, litros, km, km_anterior in lancamentos:
+        idx = (_data_utc(data_hora) - inicio.date()).days
+        if 0 <= idx < dias:
+            gastos_por_dia[idx] += float(valor)
+        preco_litro.append(round(float(valor) / float(litros), 3))
+        if km_anterior is not None and km > km_anterior:
+            km_por_litro.append(round((km - km_anterior) / float(litros), 2))
+
+    return {
+        "quinzena_label": label,
+        "inicio": inicio,
+        "fim": fim,
+        "ipiranga_limite": limite,
+        "gasto_ipiranga_quinzena": gasto_ipiranga,
+        "saldo_ipiranga_quinzena": limite - gasto_ipiranga,
+        "percentual_usado": round(gasto_ipiranga / limite * 100, 2) if limite else 0.0,
+        "total_gasto_quinzena": total_gasto,
+        "total_litros_quinzena": total_litros,
+        "media_preco_litro_quinzena": round(total_gasto / total_litros, 3) if total_litros else None,
+        "labels": labels,
+        "gastos_por_dia": gastos_por_dia,
+        "preco_litro_por_lancamento": preco_litro,
+        "km_por_litro_por_lancamento": km_por_litro,
+    }
+
+
+def quinzena_summary(db: Session, user_id: int, hoje: datetime) -> dict:
+    # Totais do rollup; lançamentos só da quinzena (limitados ao período) para as séries
+    totais = period_totals(db, user_id, hoje)
+    lancamentos = db.execute(quinzena_entries_stmt(user_id, hoje)).all()
+    return quinzena_summary_from_rows(totais, lancamentos, hoje)
@@ -0,0 +1,279 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy import Float, Select, cast, func, select
+from sqlalchemy.orm import Session
+
+from .models import Abastecimento, Veiculo
+
+MAX_ANOMALIAS = 500
+
+# =============================
+# SÉRIE COLUNAR (histórico completo do usuário)
+# =============================
+
+@dataclass
+class Serie:
+    ids: np.ndarray  # int64
+    ts: np.ndarray  # epoch em segundos (UTC), float64
+    km: np.ndarray  # int64
+    litros: np.ndarray  # float64
+    valor: np.ndarray  # float64
+    veiculo: np.ndarray  # int64, 0 = sem veículo (encadeado por usuário)
+    capacidade: np.ndarray  # float64, NaN = veículo sem capacidade cadastrada
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def _epoch_expr(dialect: str):
+    # Conversão no banco: evita criar 100k datetimes/Decimals em Python
+    if dialect == "sqlite":
+        return (func.julianday(Abastecimento.data_hora) - 2440587.5) * 86400.0
+    return func.extract("epoch", Abastecimento.data_hora)
+
+
+def serie_stmt(user_id: int, dialect: str, veiculo_id: int | None = None) -> Select:
+    A = Abastecimento
+    stmt = select(
+        A.id,
+        cast(_epoch_expr(dialect), Float),
+        A.km_odometro,
+        cast(A.litros, Float),
+        cast(A.valor, Float),
+        func.coalesce(A.veiculo_id, 0),
+        cast(Veiculo.capacidade_tanque, Float),
+    ).outerjoin(Veiculo, Veiculo.id == A.veiculo_id).where(A.user_id == user_id)
+    if veiculo_id is not None:
+        stmt = stmt.where(A.veiculo_id == veiculo_id)
+    return stmt.order_by(A.data_hora, A.id)
+
+
+def serie_from_rows(rows) -> Serie:
+    if not rows:
+        vazio = np.array([], dtype=np.float64)
+        inteiros = np.array([], dtype=np.int64)
+        return Serie(inteiros, vazio, inteiros, vazio, vazio, inteiros, vazio)
+    ids, ts, kms, litros, valores, veiculos, capacidades = zip(*rows)
+    return Serie(
+        ids=np.array(ids, dtype=np.int64),
+        ts=np.array(ts, dtype=np.float64),
+        km=np.array(kms, dtype=np.int64),
+        litros=np.array(litros, dtype=np.float64),
+        valor=np.array(valores, dtype=np.float64),
+        veiculo=np.array(veiculos, dtype=np.int64),
+        capacidade=np.array([np.nan if c is None else c for c in capacidades], dtype=np.float64),
+    )
+
+
+def carregar_serie(db: Session, user_id: int, veiculo_id: int | None = None) -> Serie:
+    stmt = serie_stmt(user_id, db.get_bind().dialect.name, veiculo_id)
+    return serie_from_rows(db.execute(stmt).all())
+
+# =============================
+# MÉTRICAS VETORIZADAS
+# =============================
+
+def _dividir(a: np.ndarray, b: np.ndarray, onde: np.ndarray) -> np.ndarray:
+    return np.divide(a, b, out=np.full(len(a), np.nan), where=onde)
+
+
+def _diff_por_veiculo(s: Serie) -> np.ndarray:
+    """km desde o abastecimento anterior do mesmo veículo (NaN no primeiro de cada um)."""
+    ordem = np.argsort(s.veiculo, kind="stable")  # estável: mantém a ordem cronológica
+    km = s.km[ordem]
+    veiculo = s.veiculo[ordem]
+    diff = np.full(len(s), np.nan)
+    diff[1:] = np.diff(km)
+    diff[1:][veiculo[1:] != veiculo[:-1]] = np.nan
+    saida = np.empty(len(s))
+    saida[ordem] = diff
+    return saida
+
+
+def metricas(s: Serie) -> dict[str, np.ndarray]:
+    """Mesmas definições de metricas_derivadas(), para todas as linhas de uma vez."""
+    km_rodado = _diff_por_veiculo(s)
+    rodou = km_rodado > 0
+    return {
+        "km_rodado": km_rodado,
+        "rodou": rodou,
+        "preco_por_litro": _dividir(s.valor, s.litros, s.litros > 0),
+        "km_por_litro": _dividir(km_rodado, s.litros, rodou & (s.litros > 0)),
+        "custo_por_km": _dividir(s.valor, km_rodado, rodou),
+    }
+
+
+def media_movel(km_rodado: np.ndarray, litros: np.ndarray, validos: np.ndarray, janela: int) -> np.ndarray:
+    """km/l das últimas `janela` medições válidas (soma de km / soma de litros)."""
+    saida = np.full(len(km_rodado), np.nan)
+    idx = np.flatnonzero(validos)
+    if len(idx) == 0:
+        return saida
+    km_acum = np.concatenate(([0.0], np.cumsum(km_rodado[idx])))
+    litros_acum = np.concatenate(([0.0], np.cumsum(litros[idx])))
+    fim = np.arange(1, len(idx) + 1)
+    inicio = np.maximum(fim - janela, 0)
+    saida[idx] = (km_acum[fim] - km_acum[inicio]) / (litros_acum[fim] - litros_acum[inicio])
+    return saida
+
+
+def z_robusto(x: np.ndarray) -> tuple[np.ndarray, float | None]:
+    """z-score pela mediana/MAD (não é puxado pelos próprios outliers)."""
+    validos = ~np.isnan(x)
+    if validos.sum() < 3:
+        return np.full(len(x), np.nan), None
+    mediana = float(np.median(x[validos]))
+    desvios = np.abs(x[validos] - mediana)
+    mad = float(np.median(desvios))
+    if mad > 0:
+        return 0.6745 * (x - mediana) / mad, mediana
+    # Mais da metade dos valores iguais: usa o desvio absoluto médio
+    media_abs = float(desvios.mean())
+    if media_abs == 0:
+        return np.full(len(x), np.nan), mediana
+    return (x - mediana) / (1.253314 * media_abs), mediana
+
+
+def tendencia_mensal(s: Serie, m: dict) -> list[dict]:
+    if len(s) == 0:
+        return []
+    meses = s.ts.astype("datetime64[s]").astype("datetime64[M]")
+    unicos, grupo = np.unique(meses, return_inverse=True)
+    n = len(unicos)
+    rodou = m["rodou"]
+
+    litros = np.bincount(grupo, weights=s.litros, minlength=n)
+    valor = np.bincount(grupo, weights=s.valor, minlength=n)
+    km = np.bincount(grupo, weights=np.where(rodou, m["km_rodado"], 0.0), minlength=n)
+    litros_medidos = np.bincount(grupo, weights=np.where(rodou, s.litros, 0.0), minlength=n)
+    valor_medido = np.bincount(grupo, weights=np.where(rodou, s.valor, 0.0), minlength=n)
+
+    km_l = _dividir(km, litros_medidos, litros_medidos > 0)
+    custo_km = _dividir(valor_medido, km, km > 0)
+    preco = _dividir(valor, litros, litros > 0)
+    return [
+        {
+            "mes": str(unicos[i]),
+            "litros": round(float(litros[i]), 3),
+            "valor": round(float(valor[i]), 2),
+            "km_rodado": int(km[i]),
+            "km_por_litro": _num(km_l[i], 2),
+            "custo_por_km": _num(custo_km[i], 3),
+            "preco_medio_litro": _num(preco[i], 3),
+        }
+        for i in range(n)
+    ]
+
+
+def _num(x, casas: int) -> float | None:
+    return None if np.isnan(x) else round(float(x), casas)
+
+
+def _data_iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+# =============================
+# ANOMALIAS
+# =============================
+
+def anomalias(
+    s: Serie,
+    m: dict,
+    capacidade_tanque: float | None,
+    z_limite: float,
+    limite: int = MAX_ANOMALIAS
+) -> tuple[list[dict], int]:
+    """Anomalias mais recentes primeiro (até `limite`) e o total encontrado."""
+    regras: list[tuple[np.ndarray, str, np.ndarray, np.ndarray | float]] = []
+
+    # Capacidade do veículo; o parâmetro vale para lançamentos sem capacidade cadastrada
+    capacidade = s.capacidade
+    if capacidade_tanque:
+        capacidade = np.where(np.isnan(capacidade), capacidade_tanque, capacidade)
+    with np.errstate(invalid="ignore"):
+        regras.append((s.litros > capacidade, "litros_acima_tanque", s.litros, capacidade))
+
+    regras.append((m["km_rodado"] < 0, "odometro_regressivo", m["km_rodado"], 0.0))
+
+    # z e mediana por veículo: carros diferentes têm consumos diferentes
+    z = np.full(len(s), np.nan)
+    mediana = np.full(len(s), np.nan)
+    for v in np.unique(s.veiculo):
+        grupo = s.veiculo == v
+        z_v, mediana_v = z_robusto(m["km_por_litro"][grupo])
+        z[grupo] = z_v
+        mediana[grupo] = np.nan if mediana_v is None else mediana_v
+    with np.errstate(invalid="ignore"):
+        regras.append((z < -z_limite, "km_por_litro_baixo", m["km_por_litro"], mediana))
+        regras.append((z > z_limite, "km_por_litro_alto", m["km_por_litro"], mediana))
+
+    linhas = [np.flatnonzero(mascara) for mascara, _, _, _ in regras]
+    regra = np.concatenate([np.full(len(l), r) for r, l in enumerate(linhas)]).astype(np.int64)
+    linha = np.concatenate(linhas).astype(np.int64)
+    total = len(linha)
+
+    # Ordena só os índices; os dicts são montados apenas para os `limite` primeiros
+    ordem = np.lexsort((regra, -s.ts[linha]))[:limite]
+    saida = []
+    for k in ordem:
+        i, (_, tipo, valores, referencia) = linha[k], regras[regra[k]]
+        saida.append({
+            "id": int(s.ids[i]),
+            "data_hora": _data_iso(s.ts[i]),
+            "veiculo_id": int(s.veiculo[i]) or None,
+            "tipo": tipo,
+            "valor": _num(valores[i], 3),
+            "referencia": _num(referencia[i] if isinstance(referencia, np.ndarray) else referencia, 3),
+        })
+    return saida, total
+
+
+def analisar(
+    s: Serie,
+    janela: int = 5,
+    capacidade_tanque: float | None = None,
+    z_limite: float = 3.5,
+    pontos: int = 120
+) -> dict:
+    m = metricas(s)
+    rodou = m["rodou"] & (s.litros > 0)
+    movel = media_movel(m["km_rodado"], s.litros, rodou, janela)
+    lista, total_anomalias = anomalias(s, m, capacidade_tanque, z_limite)
+
+    km_medido = float(m["km_rodado"][rodou].sum())
+    litros_medidos = float(s.litros[rodou].sum())
+    km_l_validos = m["km_por_litro"][~np.isnan(m["km_por_litro"])]
+    mediana_km_l = float(np.median(km_l_validos)) if len(km_l_validos) else None
+
+    ultimos = np.flatnonzero(rodou)[-pontos:] if pontos > 0 else np.array([], dtype=np.int64)
+    return {
+        "resumo": {
+            "lancamentos": len(s),
+            "km_total": int(np.nansum(m["km_rodado"])),  # último - primeiro, somado por veículo
+            "litros_total": round(float(s.litros.sum()), 3),
+            "valor_total": round(float(s.valor.sum()), 2),
+            "km_por_litro_medio": round(km_medido / litros_medidos, 2) if litros_medidos else None,
+            "km_por_litro_mediana": None if mediana_km_l is None else round(mediana_km_l, 2),
+            "custo_por_km_medio": (
+                round(float(s.valor[rodou].sum()) / km_medido, 3) if km_medido else None
+            ),
+        },
+        "tendencia_mensal": tendencia_mensal(s, m),
+        "media_movel": {
+            "janela": janela,
+            "pontos": [
+                {
+                    "id": int(s.ids[i]),
+                    "data_hora": _data_iso(s.ts[i]),
+                    "km_por_litro": _num(m["km_por_litro"][i], 2),
+                    "media_movel": _num(movel[i], 2),
+                }
+                for i in ultimos
+            ],
+        },
+        "total_anomalias": total_anomalias,
+        "anomalias": lista,
+    }
@@ -1,14 +1,20 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .db import get_db
+from .db import get_async_db, get_db
 from .models import User
+from .settings import settings
 
 # =============================
 # CONFIGURAÇÕES JWT
@@ -20,18 +26,6 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 horas
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# =============================
-# UTILIDADES DE SENHA
-# =============================
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
-
 # =============================
 # JWT
 # =============================
@@ -43,41 +37,170 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 # =============================
-# AUTENTICAÇÃO DO USUÁRIO
+# CACHE DE PRINCIPAIS (TTL + LRU)
 # =============================
 
-def authenticate_user(db: Session, email: str, password: str):
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        return None
-    if not verify_password(password, user.password):
-        return None
-    return user
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    is_admin: bool
+
+
+class PrincipalCache:
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[int, str], tuple[float, Principal]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int, token: str) -> Principal | None:
+        key = (user_id, token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, token: str, principal: Principal) -> None:
+        if self.max_entries <= 0:
+            return
+        key = (principal.id, token)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, principal)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int | None = None) -> int:
+        with self._lock:
+            if user_id is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+            keys = [k for k in self._entries if k[0] == user_id]
+            for k in keys:
+                del self._entries[k]
+            return len(keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+principal_cache = PrincipalCache(
+    settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+)
+
+
+def invalidate_principal(user_id: int | None = None) -> int:
+    # Alterações fora do ORM (SQL direto): DELETE /admin/principal-cache
+    return principal_cache.invalidate(user_id)
+
+
+@event.listens_for(User, "after_update")
+def _invalidar_ao_alterar(mapper, connection, target: User) -> None:
+    # Papel ou senha trocados pelo ORM: o principal em cache deixa de valer
+    estado = inspect(target)
+    if estado.attrs.is_admin.history.has_changes() or estado.attrs.password.history.has_changes():
+        invalidate_principal(target.id)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidar_ao_excluir(mapper, connection, target: User) -> None:
+    invalidate_principal(target.id)
 
 # =============================
 # DEPENDÊNCIA PRINCIPAL (CRÍTICA)
 # =============================
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Credenciais inválidas",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+
+def _user_id_from_token(token: str) -> int:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str | None = payload.get("sub")
         if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+            raise _credentials_exception()
+        return int(user_id)
+    except (JWTError, ValueError):
+        raise _credentials_exception()
+
+
+def _principal_stmt(user_id: int):
+    return select(User.id, User.is_admin).where(User.id == user_id)
+
+
+def _principal_from_token(token: str, db: Session, liberar: bool = True) -> Principal:
+    """Principal do token: cache ou uma leitura de users (o usuário precisa existir).
+
+    `liberar=False` quando `db` é a própria sessão da rota (mantém a conexão).
+    """
+    user_id = _user_id_from_token(token)
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
-    if user is None:
-        raise credentials_exception
+    principal = principal_cache.get(user_id, token)
+    if principal is not None:
+        return principal
 
-    return user
+    row = db.execute(_principal_stmt(user_id)).first()
+    # Encerra a transação de leitura: a conexão volta ao pool antes da rota (que
+    # pode nem usar o primário); no Transaction Pooler, libera o backend
+    if liberar:
+        db.rollback()
+    if row is None:
+        raise _credentials_exception()
+
+    principal = Principal(id=row.id, is_admin=bool(row.is_admin))
+    principal_cache.set(token, principal)
+    return principal
+
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> Principal:
+    return _principal_from_token(token, db)
+
+
+async def _principal_from_token_async(token: str, db: AsyncSession, liberar: bool = True) -> Principal:
+    user_id = _user_id_from_token(token)
+
+    principal = principal_cache.get(user_id, token)
+    if principal is not None:
+        return principal
+
+    row = (await db.execute(_principal_stmt(user_id))).first()
+    if liberar:
+        await db.rollback()
+    if row is None:
+        raise _credentials_exception()
+
+    principal = Principal(id=row.id, is_admin=bool(row.is_admin))
+    principal_cache.set(token, principal)
+    return principal
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    return await _principal_from_token_async(token, db)
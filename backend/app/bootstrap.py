@@ -0,0 +1,81 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import Any, Callable
+
+from fastapi import HTTPException, Query
+from sqlalchemy import Select
+
+from .aggregates import (
+    dashboard_totals_from_rows,
+    monthly_series_from_rows,
+    monthly_series_stmt,
+    period_totals_stmt,
+    vehicle_series_from_rows,
+    vehicle_series_stmt,
+)
+from .listing import last_km_stmt, recent_entries_from_rows, recent_entries_stmt
+
+# =============================
+# BOOTSTRAP DO PWA (PRIMEIRA TELA)
+# =============================
+# Uma resposta com tudo que a abertura do app pedia em chamadas separadas. Cada
+# seção é independente: devolve seus statements e a função que monta o valor a
+# partir das linhas de cada um (na ordem). As rotas sync executam em sequência
+# na sessão do request; as async, em paralelo, em até BOOTSTRAP_CONEXOES sessões.
+
+Secao = Callable[[int, datetime], tuple[list[Select], Callable[..., Any]]]
+
+
+def _summary(user_id: int, hoje: datetime):
+    return [period_totals_stmt(user_id, hoje)], lambda rows: dashboard_totals_from_rows(rows, hoje)
+
+
+def _recent_entries(user_id: int, hoje: datetime):
+    return [recent_entries_stmt(user_id, 10)], recent_entries_from_rows
+
+
+def _ultimo_km(user_id: int, hoje: datetime):
+    return [last_km_stmt(user_id)], lambda rows: rows[0].km_odometro if rows else None
+
+
+def _charts(user_id: int, hoje: datetime):
+    stmt, inicios = monthly_series_stmt(user_id, hoje, meses=6)
+
+    def montar(serie_rows, veiculo_rows):
+        serie = monthly_series_from_rows(serie_rows, inicios)
+        return {
+            "gastos_mensais": [{"mes": m["mes"], "valor": m["valor"]} for m in serie],
+            "litros_mensais": [{"mes": m["mes"], "litros": m["litros"]} for m in serie],
+            **vehicle_series_from_rows(veiculo_rows),
+        }
+
+    return [stmt, vehicle_series_stmt(user_id, hoje, meses=6)], montar
+
+
+SECOES: dict[str, Secao] = {
+    "summary": _summary,
+    "recent_entries": _recent_entries,
+    "ultimo_km": _ultimo_km,
+    "charts": _charts,
+}
+
+
+def bootstrap_fields(
+    fields: str | None = Query(
+        None,
+        max_length=200,
+        description=f"Seções separadas por vírgula ({', '.join(SECOES)}); vazio = todas",
+    )
+) -> tuple[str, ...]:
+    """Seções pedidas, na ordem de SECOES (a ordem e repetições no parâmetro não mudam a chave do cache)."""
+    pedidas = {f.strip() for f in (fields or "").split(",") if f.strip()}
+    if not pedidas:
+        return tuple(SECOES)
+    desconhecidas = pedidas - SECOES.keys()
+    if desconhecidas:
+        raise HTTPException(status_code=400, detail=f"Campos desconhecidos: {', '.join(sorted(desconhecidas))}")
+    return tuple(s for s in SECOES if s in pedidas)
+
+
+def cache_endpoint(campos: tuple[str, ...]) -> str:
+    return f"dashboard.bootstrap:{','.join(campos)}"
@@ -1,28 +1,30 @@
 from sqlalchemy.orm import Session
-from .db import SessionLocal
+from .db import new_session
 from .models import User
-from .auth import get_password_hash
+from .passwords import hash_password_blocking
 
 ADMIN_EMAIL = "admin@fuelcontrol.com"
 ADMIN_PASSWORD = "admin123"
 ADMIN_NOME = "Administrador"
 
 def create_admin():
-    db: Session = SessionLocal()
+    # Executado por `python -m app.manage init-db` / `upgrade-db`, não no startup da API
+    db: Session = new_session()
+    try:
+        admin = db.query(User).filter(User.email == ADMIN_EMAIL).first()
+        if admin:
+            print("Admin já existe")
+            return
 
-    admin = db.query(User).filter(User.email == ADMIN_EMAIL).first()
-    if admin:
-        print("Admin já existe")
-        return
+        admin = User(
+            nome=ADMIN_NOME,
+            email=ADMIN_EMAIL,
+            password=hash_password_blocking(ADMIN_PASSWORD),
+            is_admin=True
+        )
 
-    admin = User(
-        nome=ADMIN_NOME,
-        email=ADMIN_EMAIL,
-        password=get_password_hash(ADMIN_PASSWORD),
-        is_admin=True
-    )
-
-    db.add(admin)
-    db.commit()
-    db.close()
-    print("Admin criado com sucesso")
+        db.add(admin)
+        db.commit()
+        print("Admin criado com sucesso")
+    finally:
+        db.close()
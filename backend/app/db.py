@@ -1,16 +1,197 @@
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase
+from .metrics import TimedAsyncAdaptedQueuePool, TimedQueuePool, forget_engine, instrument_engine
 from .settings import settings
 
 class Base(DeclarativeBase):
     pass
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+# =============================
+# POOL (dimensionado para o pooler do Supabase)
+# =============================
+# DB_POOLER_MODE=session: cada conexão do pool prende um backend do Postgres
+# enquanto existir; pre-ping a cada checkout.
+# DB_POOLER_MODE=transaction: o pooler só entrega um backend durante cada
+# transação, então muitos workers dividem poucos backends. Não pode haver estado
+# de sessão entre transações: o psycopg 3 não prepara statements no servidor
+# (prepare_threshold=None) e o pre-ping (um round trip extra por checkout) dá
+# lugar a recycle curto + LIFO, que mantém quentes só as conexões em uso.
+
+def pool_kwargs(url: str) -> dict:
+    if make_url(url).get_backend_name() == "sqlite":
+        return {"pool_pre_ping": True}
+    kwargs = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+    if settings.DB_POOLER_MODE == "transaction":
+        kwargs.update({
+            "pool_recycle": min(settings.DB_POOL_RECYCLE, settings.DB_TXN_POOL_RECYCLE),
+            "pool_pre_ping": False,
+            "pool_use_lifo": True,
+        })
+    return kwargs
+
+
+def connect_args(url: str) -> dict:
+    if settings.DB_POOLER_MODE != "transaction":
+        return {}
+    if make_url(url).get_driver_name() == "psycopg":
+        # O próximo statement pode cair em outro backend, onde o prepared não existe
+        return {"prepare_threshold": None}
+    return {}
+
+# =============================
+# ENGINE SÍNCRONO (padrão)
+# =============================
+# Criado no primeiro uso (não no import), para o processo subir sem tocar no banco.
+
+_engine: Engine | None = None
+SessionLocal = sessionmaker(autoflush=False, autocommit=False)
+
+def _create_engine(url: str, name: str) -> Engine:
+    kwargs = pool_kwargs(url)
+    if "pool_size" in kwargs:
+        kwargs["poolclass"] = TimedQueuePool
+    engine = create_engine(url, connect_args=connect_args(url), **kwargs)
+    instrument_engine(engine, name)
+    return engine
+
+
+def get_engine() -> Engine:
+    global _engine
+    if _engine is None:
+        _engine = _create_engine(settings.DATABASE_URL, "primary")
+        SessionLocal.configure(bind=_engine)
+    return _engine
+
+
+def __getattr__(name: str):
+    # `from .db import engine` continua funcionando, criando o engine sob demanda
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def new_session() -> Session:
+    get_engine()
+    return SessionLocal()
+
 
 def get_db():
-    db = SessionLocal()
+    db = new_session()
     try:
         yield db
     finally:
         db.close()
+
+# =============================
+# RÉPLICA DE LEITURA (opcional)
+# =============================
+# Só engines e sessões; a escolha réplica/primário por request fica em replica.py.
+
+_read_engine: Engine | None = None
+ReadSessionLocal = sessionmaker(autoflush=False, autocommit=False)
+
+def get_read_engine() -> Engine | None:
+    """Engine da réplica (DATABASE_READ_URL) ou None se não configurada."""
+    global _read_engine
+    if not settings.DATABASE_READ_URL:
+        return None
+    if _read_engine is None:
+        _read_engine = _create_engine(settings.DATABASE_READ_URL, "replica")
+        ReadSessionLocal.configure(bind=_read_engine)
+    return _read_engine
+
+
+def new_read_session() -> Session:
+    get_read_engine()
+    return ReadSessionLocal()
+
+# =============================
+# ENGINE ASSÍNCRONO (DB_MODE=async)
+# =============================
+# Criado sob demanda: no modo sync nenhum driver async é carregado.
+
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+psycopg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def async_database_url(url: str) -> str:
+    parsed = make_url(url)
+    driver = _ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        return url
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+_async_engine: AsyncEngine | None = None
+_AsyncSessionLocal: async_sessionmaker[AsyncSession] | None = None
+_async_read_engine: AsyncEngine | None = None
+_AsyncReadSessionLocal: async_sessionmaker[AsyncSession] | None = None
+
+def _create_async_engine(url: str, name: str) -> AsyncEngine:
+    url = async_database_url(url)
+    kwargs = pool_kwargs(url)
+    if "pool_size" in kwargs:
+        kwargs["poolclass"] = TimedAsyncAdaptedQueuePool
+    engine = create_async_engine(url, connect_args=connect_args(url), **kwargs)
+    instrument_engine(engine.sync_engine, name)
+    return engine
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        _async_engine = _create_async_engine(settings.DATABASE_URL, "primary_async")
+        _AsyncSessionLocal = async_sessionmaker(
+            bind=_async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
+
+
+def get_async_read_engine() -> AsyncEngine | None:
+    global _async_read_engine, _AsyncReadSessionLocal
+    if not settings.DATABASE_READ_URL:
+        return None
+    if _async_read_engine is None:
+        _async_read_engine = _create_async_engine(settings.DATABASE_READ_URL, "replica_async")
+        _AsyncReadSessionLocal = async_sessionmaker(
+            bind=_async_read_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_read_engine
+
+
+def new_async_read_session() -> AsyncSession:
+    get_async_read_engine()
+    return _AsyncReadSessionLocal()
+
+
+async def dispose_async_engine():
+    global _async_engine, _AsyncSessionLocal, _async_read_engine, _AsyncReadSessionLocal
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        forget_engine("primary_async")
+        _async_engine = None
+        _AsyncSessionLocal = None
+    if _async_read_engine is not None:
+        await _async_read_engine.dispose()
+        forget_engine("replica_async")
+        _async_read_engine = None
+        _AsyncReadSessionLocal = None
+
+
+def new_async_session() -> AsyncSession:
+    get_async_engine()
+    return _AsyncSessionLocal()
+
+
+async def get_async_db():
+    async with new_async_session() as db:
+        yield db
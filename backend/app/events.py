@@ -0,0 +1,244 @@
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .aggregates import dashboard_totals_from_rows, period_totals_stmt
+from .listing import recent_entries_from_rows, recent_entries_stmt
+from .models import Abastecimento
+from .settings import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+# =============================
+# ASSINATURAS (uma fila por conexão SSE)
+# =============================
+
+FILA_MAX = 64
+
+
+class Assinatura:
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.fila: asyncio.Queue[dict] = asyncio.Queue(maxsize=FILA_MAX)
+
+    def colocar(self, evento: dict) -> None:
+        # Cliente lento: descarta o mais antigo (os totais de cada evento são absolutos)
+        if self.fila.full():
+            self.fila.get_nowait()
+        self.fila.put_nowait(evento)
+
+# =============================
+# BROKERS
+# =============================
+# MemoryBroker entrega só às conexões deste processo. PostgresBroker publica com
+# NOTIFY e cada worker, com LISTEN, repassa às suas conexões: funciona com vários
+# workers do uvicorn. Backend escolhido por EVENTS_BACKEND.
+
+class MemoryBroker:
+    def __init__(self):
+        self._assinaturas: dict[int, set[Assinatura]] = {}
+        self._lock = threading.Lock()
+
+    async def iniciar(self) -> None:
+        pass
+
+    async def parar(self) -> None:
+        pass
+
+    def assinar(self, user_id: int) -> Assinatura:
+        assinatura = Assinatura(user_id)
+        with self._lock:
+            self._assinaturas.setdefault(user_id, set()).add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura: Assinatura) -> None:
+        with self._lock:
+            conjunto = self._assinaturas.get(assinatura.user_id)
+            if conjunto is not None:
+                conjunto.discard(assinatura)
+                if not conjunto:
+                    del self._assinaturas[assinatura.user_id]
+
+    def interessado(self, user_id: int) -> bool:
+        """Vale montar o evento? (aqui: há conexão aberta neste processo)"""
+        with self._lock:
+            return user_id in self._assinaturas
+
+    def conexoes(self) -> int:
+        with self._lock:
+            return sum(len(c) for c in self._assinaturas.values())
+
+    def _fan_out(self, user_id: int, evento: dict) -> None:
+        with self._lock:
+            destinos = list(self._assinaturas.get(user_id, ()))
+        for assinatura in destinos:
+            # Pode vir do threadpool (rotas síncronas): a fila é do loop da conexão
+            assinatura.loop.call_soon_threadsafe(assinatura.colocar, evento)
+
+    def entregar(self, user_id: int, evento: dict) -> None:
+        self._fan_out(user_id, evento)
+
+
+CANAL = "fuel_eventos"
+
+
+class PostgresBroker(MemoryBroker):
+    """LISTEN/NOTIFY em conexões próprias (não passam pelo Transaction Pooler)."""
+
+    def __init__(self, url: str):
+        super().__init__()
+        self.conninfo = make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._tarefa: asyncio.Task | None = None
+        self._publicador = None
+        self._lock_publicador: asyncio.Lock | None = None
+
+    async def iniciar(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._lock_publicador = asyncio.Lock()
+        self._tarefa = asyncio.create_task(self._escutar())
+
+    async def parar(self) -> None:
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+        if self._publicador is not None:
+            await self._publicador.close()
+
+    def interessado(self, user_id: int) -> bool:
+        # Conexões de outros workers não são visíveis daqui
+        return True
+
+    async def _escutar(self) -> None:
+        import psycopg
+
+        espera = 1.0
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.conninfo, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {CANAL}")
+                    espera = 1.0
+                    async for notificacao in conn.notifies():
+                        mensagem = json.loads(notificacao.payload)
+                        self._fan_out(mensagem["u"], mensagem["e"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as erro:
+                logger.warning("LISTEN %s caiu (%s); reconectando em %.0fs", CANAL, erro, espera)
+                await asyncio.sleep(espera)
+                espera = min(espera * 2, 30.0)
+
+    async def _notificar(self, payload: str) -> None:
+        import psycopg
+
+        try:
+            async with self._lock_publicador:
+                if self._publicador is None or self._publicador.closed:
+                    self._publicador = await psycopg.AsyncConnection.connect(self.conninfo, autocommit=True)
+                await self._publicador.execute("SELECT pg_notify(%s, %s)", (CANAL, payload))
+        except Exception as erro:
+            logger.warning("NOTIFY %s falhou: %s", CANAL, erro)
+
+    def entregar(self, user_id: int, evento: dict) -> None:
+        if self._loop is None:
+            self._fan_out(user_id, evento)
+            return
+        payload = json.dumps({"u": user_id, "e": evento}, separators=(",", ":"))
+        asyncio.run_coroutine_threadsafe(self._notificar(payload), self._loop)
+
+
+def _criar_broker() -> MemoryBroker:
+    if settings.EVENTS_BACKEND == "postgres":
+        return PostgresBroker(settings.EVENTS_DATABASE_URL or settings.DATABASE_URL)
+    return MemoryBroker()
+
+
+broker = _criar_broker()
+
+# =============================
+# ENTREGA APÓS O COMMIT
+# =============================
+# O evento é montado na transação da escrita (lê os rollups já atualizados) e
+# só sai depois do commit: quem recebe nunca vê um total que foi desfeito.
+
+_PENDENTES = "eventos_pendentes"
+
+
+@event.listens_for(Session, "after_commit")
+def _entregar_pendentes(session: Session) -> None:
+    for user_id, evento in session.info.pop(_PENDENTES, ()):
+        broker.entregar(user_id, evento)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_pendentes(session: Session) -> None:
+    session.info.pop(_PENDENTES, None)
+
+
+def _agendar(session: Session, user_id: int, evento: dict) -> None:
+    session.info.setdefault(_PENDENTES, []).append((user_id, evento))
+
+# =============================
+# EVENTO DO DASHBOARD
+# =============================
+# Totais do mês/quinzena, saldo Ipiranga e o lançamento afetado: o suficiente
+# para o Dashboard se atualizar sem refazer GET /dashboard/summary.
+
+def _entrada_stmt(user_id: int, abastecimento_id: int):
+    return recent_entries_stmt(user_id, 1).where(Abastecimento.id == abastecimento_id)
+
+
+def evento_from_rows(acao: str, totais_rows, hoje: datetime, lancamento: dict | None) -> dict:
+    return {
+        "acao": acao,
+        **dashboard_totals_from_rows(totais_rows, hoje),
+        "lancamento": lancamento,
+    }
+
+
+def publicar_escrita(db: Session, user_id: int, acao: str, abastecimento_id: int | None = None) -> None:
+    """Chamar antes do commit de uma escrita em abastecimentos."""
+    if not broker.interessado(user_id):
+        return
+    hoje = datetime.now(timezone.utc)
+    totais = db.execute(period_totals_stmt(user_id, hoje)).all()
+    lancamento = None
+    if abastecimento_id is not None:
+        if acao == "excluido":
+            lancamento = {"id": abastecimento_id}
+        else:
+            entradas = recent_entries_from_rows(db.execute(_entrada_stmt(user_id, abastecimento_id)).all())
+            lancamento = entradas[0] if entradas else None
+    _agendar(db, user_id, evento_from_rows(acao, totais, hoje, lancamento))
+
+
+async def publicar_escrita_async(
+    db: AsyncSession,
+    user_id: int,
+    acao: str,
+    abastecimento_id: int | None = None
+) -> None:
+    if not broker.interessado(user_id):
+        return
+    hoje = datetime.now(timezone.utc)
+    totais = (await db.execute(period_totals_stmt(user_id, hoje))).all()
+    lancamento = None
+    if abastecimento_id is not None:
+        if acao == "excluido":
+            lancamento = {"id": abastecimento_id}
+        else:
+            entradas = recent_entries_from_rows((await db.execute(_entrada_stmt(user_id, abastecimento_id))).all())
+            lancamento = entradas[0] if entradas else None
+    _agendar(db.sync_session, user_id, evento_from_rows(acao, totais, hoje, lancamento))
@@ -0,0 +1,155 @@
+from __future__ import annotations
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Callable, Iterator
+
+from sqlalchemy import Select, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from .db import new_session
+from .listing import anterior_na_cadeia, km_rodado_lag, metricas_derivadas, row_to_out
+from .models import Abastecimento
+
+CHUNK_ROWS = 1000
+
+COLUNAS = (
+    "id",
+    "user_id",
+    "veiculo_id",
+    "data_hora",
+    "posto",
+    "valor",
+    "litros",
+    "km_odometro",
+    "observacao",
+    "preco_por_litro",
+    "km_rodado",
+    "km_por_litro_aprox",
+    "custo_por_km",
+)
+
+# =============================
+# QUERY DO EXPORT
+# =============================
+
+def export_stmt(
+    user_id: int | None,
+    inicio: datetime | None = None,
+    fim: datetime | None = None,
+    posto: str | None = None
+) -> Select:
+    """Linhas ordenadas por (user_id, data_hora, id) com as métricas via LAG().
+
+    km_rodado_lag() percorre cada cadeia em ordem: mesmo resultado do
+    km_anterior_expr() da listagem, sem uma busca no índice por linha. É calculado
+    antes do filtro de posto (a distância é desde o abastecimento anterior, em
+    qualquer posto). O período é um intervalo simples em data_hora (usa o índice);
+    com `inicio`, entra por UNION ALL uma linha de contexto por cadeia presente no
+    período, o lançamento imediatamente anterior a `inicio` (anterior_na_cadeia(),
+    uma busca por cadeia), para a primeira linha do período também ter km_rodado.
+    """
+    A = Abastecimento
+    filtros = []
+    if user_id is not None:
+        filtros.append(A.user_id == user_id)
+    if inicio is not None:
+        filtros.append(A.data_hora >= inicio)
+    if fim is not None:
+        filtros.append(A.data_hora < fim)
+
+    colunas = (
+        A.id,
+        A.user_id,
+        A.veiculo_id,
+        A.data_hora,
+        A.posto,
+        A.valor,
+        A.litros,
+        A.km_odometro,
+        A.observacao,
+    )
+    linhas = select(*colunas, literal(False).label("contexto")).where(*filtros)
+
+    if inicio is not None:
+        cadeias = select(A.user_id, A.veiculo_id).where(*filtros).distinct().subquery()
+        anterior_id = anterior_na_cadeia(cadeias.c, "id", lambda anterior: anterior.data_hora < inicio)
+        contexto = select(*colunas, literal(True).label("contexto")).where(
+            A.id.in_(select(anterior_id).select_from(cadeias))
+        )
+        linhas = union_all(linhas, contexto)
+    linhas = linhas.subquery()
+
+    janela = select(
+        linhas,
+        km_rodado_lag(linhas.c).label("km_rodado"),
+    ).subquery()
+
+    stmt = select(
+        janela.c.id,
+        janela.c.user_id,
+        janela.c.veiculo_id,
+        janela.c.data_hora,
+        janela.c.posto,
+        janela.c.valor,
+        janela.c.litros,
+        janela.c.km_odometro,
+        janela.c.observacao,
+        *metricas_derivadas(janela.c),
+    ).where(janela.c.contexto == literal(False))
+
+    if posto is not None:
+        stmt = stmt.where(janela.c.posto == posto)
+    return stmt.order_by(janela.c.user_id, janela.c.data_hora, janela.c.id)
+
+# =============================
+# SERIALIZAÇÃO EM CHUNKS
+# =============================
+
+def _registro(row) -> dict:
+    out = row_to_out(row).model_dump()
+    out["user_id"] = row.user_id
+    out["data_hora"] = out["data_hora"].isoformat()
+    return {c: out[c] for c in COLUNAS}
+
+
+def _csv_chunks(rows) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUNAS)
+    for n, row in enumerate(rows, start=1):
+        registro = _registro(row)
+        writer.writerow(["" if registro[c] is None else registro[c] for c in COLUNAS])
+        if n % CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson_chunks(rows) -> Iterator[str]:
+    linhas = []
+    for row in rows:
+        linhas.append(json.dumps(_registro(row), ensure_ascii=False))
+        if len(linhas) >= CHUNK_ROWS:
+            yield "\n".join(linhas) + "\n"
+            linhas.clear()
+    if linhas:
+        yield "\n".join(linhas) + "\n"
+
+
+def stream_export(
+    stmt: Select,
+    formato: str,
+    abrir_sessao: Callable[[], Session] = new_session
+) -> Iterator[str]:
+    # Sessão própria: a do Depends(get_db) é fechada antes do streaming terminar.
+    # yield_per usa cursor do lado do servidor no PostgreSQL (memória constante).
+    db = abrir_sessao()
+    try:
+        rows = db.execute(stmt.execution_options(yield_per=CHUNK_ROWS))
+        chunks = _csv_chunks(rows) if formato == "csv" else _ndjson_chunks(rows)
+        yield from chunks
+    finally:
+        db.close()
@@ -0,0 +1,218 @@
+from __future__ import annotations
+import csv
+import io
+import json
+from decimal import Decimal
+from typing import IO, Iterator
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    Numeric,
+    String,
+    Table,
+    Text,
+    and_,
+    exists,
+    insert,
+    select,
+)
+from sqlalchemy.orm import Session
+
+from .models import Abastecimento
+from .rollups import periodo_de, upsert_delta_stmt
+from .schemas import AbastecimentoCreate
+from .events import publicar_escrita
+from .versions import bump_version_stmt
+
+BATCH_SIZE = 1000
+MAX_ERROS_REPORTADOS = 500
+
+_CAMPOS = ("data_hora", "posto", "valor", "litros", "km_odometro", "observacao")
+_lote_adapter = TypeAdapter(list[AbastecimentoCreate])
+
+# =============================
+# TABELA DE STAGING (TEMPORÁRIA)
+# =============================
+
+_staging_metadata = MetaData()
+
+staging = Table(
+    "abastecimentos_import",
+    _staging_metadata,
+    Column("user_id", Integer, nullable=False),
+    Column("data_hora", DateTime(timezone=True), nullable=False),
+    Column("posto", String(50), nullable=False),
+    Column("valor", Numeric(12, 2), nullable=False),
+    Column("litros", Numeric(12, 3), nullable=False),
+    Column("km_odometro", Integer, nullable=False),
+    Column("observacao", Text, nullable=True),
+    prefixes=["TEMPORARY"],
+    # Some no fim da transação: no Transaction Pooler o backend volta para outros clientes
+    postgresql_on_commit="DROP",
+)
+
+# =============================
+# LEITURA EM STREAMING
+# =============================
+
+def _limpar(registro: dict) -> dict:
+    return {
+        campo: (None if registro.get(campo) in ("", None) else registro.get(campo))
+        for campo in _CAMPOS
+    }
+
+
+def iter_registros(arquivo: IO[bytes], formato: str) -> Iterator[tuple[int, dict | None, str | None]]:
+    """Gera (linha, registro, erro_de_parse) lendo o arquivo linha a linha."""
+    texto = io.TextIOWrapper(arquivo, encoding="utf-8-sig", newline="")
+    if formato == "csv":
+        leitor = csv.DictReader(texto)
+        for registro in leitor:
+            yield leitor.line_num, _limpar(registro), None
+        return
+
+    for linha, conteudo in enumerate(texto, start=1):
+        if not conteudo.strip():
+            continue
+        try:
+            registro = json.loads(conteudo)
+        except json.JSONDecodeError as exc:
+            yield linha, None, f"JSON inválido: {exc.msg}"
+            continue
+        if not isinstance(registro, dict):
+            yield linha, None, "Cada linha deve ser um objeto JSON"
+            continue
+        yield linha, _limpar(registro), None
+
+
+def validar_lote(lote: list[tuple[int, dict]]) -> tuple[list[AbastecimentoCreate], list[dict]]:
+    """Valida o lote inteiro de uma vez; só em caso de erro separa as linhas inválidas."""
+    try:
+        return _lote_adapter.validate_python([r for _, r in lote]), []
+    except ValidationError as exc:
+        por_indice: dict[int, list[str]] = {}
+        for erro in exc.errors():
+            idx = erro["loc"][0]
+            campo = ".".join(str(p) for p in erro["loc"][1:])
+            por_indice.setdefault(idx, []).append(f"{campo}: {erro['msg']}")
+
+    validos = [r for i, (_, r) in enumerate(lote) if i not in por_indice]
+    erros = [{"linha": lote[i][0], "erros": msgs} for i, msgs in sorted(por_indice.items())]
+    return _lote_adapter.validate_python(validos), erros
+
+# =============================
+# CARGA (COPY) E MERGE
+# =============================
+
+def _copy_lote(db: Session, linhas: list[tuple]) -> None:
+    conn = db.connection()
+    if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg":
+        raw = conn.connection.driver_connection
+        colunas = ", ".join(c.name for c in staging.columns)
+        with raw.cursor() as cur:
+            with cur.copy(f"COPY {staging.name} ({colunas}) FROM STDIN") as copy:
+                for linha in linhas:
+                    copy.write_row(linha)
+        return
+
+    # Outros drivers (psycopg2, SQLite local): INSERT em lote
+    nomes = [c.name for c in staging.columns]
+    conn.execute(insert(staging), [dict(zip(nomes, linha)) for linha in linhas])
+
+
+def importar(db: Session, user_id: int, arquivo: IO[bytes], formato: str) -> dict:
+    """Importa o arquivo para abastecimentos numa única transação.
+
+    As linhas válidas vão para uma tabela temporária via COPY em lotes de
+    BATCH_SIZE; no fim, um INSERT ... SELECT move para abastecimentos o que ainda
+    não existe (mesmo user_id, data_hora e km_odometro) e os rollups recebem os
+    totais por quinzena. Memória limitada ao lote e ao número de quinzenas.
+    """
+    conn = db.connection()
+    staging.drop(conn, checkfirst=True)
+    staging.create(conn)
+
+    erros: list[dict] = []
+    total_erros = 0
+    lidas = 0
+    lote: list[tuple[int, dict]] = []
+
+    def descarregar():
+        nonlocal total_erros
+        validos, erros_lote = validar_lote(lote)
+        total_erros += len(erros_lote)
+        erros.extend(erros_lote[:max(0, MAX_ERROS_REPORTADOS - len(erros))])
+        if validos:
+            _copy_lote(db, [
+                (user_id, a.data_hora, a.posto, a.valor, a.litros, a.km_odometro, a.observacao)
+                for a in validos
+            ])
+        lote.clear()
+
+    for linha, registro, erro in iter_registros(arquivo, formato):
+        lidas += 1
+        if erro is not None:
+            total_erros += 1
+            if len(erros) < MAX_ERROS_REPORTADOS:
+                erros.append({"linha": linha, "erros": [erro]})
+            continue
+        if registro["data_hora"] is None:
+            total_erros += 1
+            if len(erros) < MAX_ERROS_REPORTADOS:
+                erros.append({"linha": linha, "erros": ["data_hora: obrigatório na importação"]})
+            continue
+        lote.append((linha, registro))
+        if len(lote) >= BATCH_SIZE:
+            descarregar()
+    if lote:
+        descarregar()
+
+    # Descarta o que já existe (reimportar o mesmo arquivo não duplica)
+    ja_existe = exists().where(and_(
+        Abastecimento.user_id == staging.c.user_id,
+        Abastecimento.data_hora == staging.c.data_hora,
+        Abastecimento.km_odometro == staging.c.km_odometro,
+    ))
+    duplicados = conn.execute(staging.delete().where(ja_existe)).rowcount or 0
+
+    # Totais por quinzena/posto para os rollups (streaming sobre a staging)
+    deltas: dict[tuple, list] = {}
+    linhas_staging = conn.execute(
+        select(staging.c.data_hora, staging.c.posto, staging.c.valor, staging.c.litros)
+        .execution_options(yield_per=BATCH_SIZE)
+    )
+    for data_hora, posto, valor, litros in linhas_staging:
+        acc = deltas.setdefault((periodo_de(data_hora), posto), [Decimal("0"), Decimal("0"), 0])
+        acc[0] += Decimal(str(valor))
+        acc[1] += Decimal(str(litros))
+        acc[2] += 1
+
+    colunas = [c.name for c in staging.columns]
+    importados = conn.execute(
+        insert(Abastecimento.__table__).from_select(colunas, select(*staging.columns))
+    ).rowcount or 0
+
+    dialect = conn.dialect.name
+    # Ordem fixa das chaves, como no /sync: sem deadlock entre lotes do mesmo usuário
+    for (periodo, posto), (valor, litros, quantidade) in sorted(deltas.items()):
+        conn.execute(upsert_delta_stmt(dialect, user_id, periodo, posto, valor, litros, quantidade))
+
+    if importados:
+        conn.execute(bump_version_stmt(user_id))
+        publicar_escrita(db, user_id, "importacao")
+
+    staging.drop(conn)
+    db.commit()
+
+    erros.sort(key=lambda e: e["linha"])
+    return {
+        "linhas_lidas": lidas,
+        "importados": importados,
+        "duplicados": duplicados,
+        "total_erros": total_erros,
+        "erros": erros,
+    }
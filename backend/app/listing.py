@@ -0,0 +1,261 @@
+from __future__ import annotations
+import base64
+from dataclasses import dataclass
+from datetime import datetime
+
+from fastapi import Query
+from sqlalchemy import Select, case, func, select, tuple_
+from sqlalchemy.orm import aliased
+
+from .models import Abastecimento, Veiculo
+from .schemas import AbastecimentoOut
+
+# =============================
+# CURSOR (KEYSET)
+# =============================
+# O cursor é (data_hora, id) do último item da página, codificado em base64.
+
+def encode_cursor(data_hora: datetime, abastecimento_id: int) -> str:
+    raw = f"{data_hora.isoformat()}|{abastecimento_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    data_hora, abastecimento_id = base64.urlsafe_b64decode(padded).decode().split("|", 1)
+    return datetime.fromisoformat(data_hora), int(abastecimento_id)
+
+# =============================
+# FILTROS E BUSCA
+# =============================
+# Cada filtro tem índice (ver models.Abastecimento): posto e valor em índices
+# compostos com user_id, período no (user_id, data_hora, id) da paginação e a
+# busca em observacao num GIN de trigramas (ILIKE '%termo%' sem seq scan).
+
+@dataclass(frozen=True)
+class FiltrosLista:
+    posto: str | None = None
+    inicio: datetime | None = None
+    fim: datetime | None = None  # exclusivo, como na exportação
+    valor_min: float | None = None
+    valor_max: float | None = None
+    veiculo_id: int | None = None
+    busca: str | None = None
+
+    def aplicar(self, stmt: Select) -> Select:
+        A = Abastecimento
+        if self.posto is not None:
+            stmt = stmt.where(A.posto == self.posto)
+        if self.inicio is not None:
+            stmt = stmt.where(A.data_hora >= self.inicio)
+        if self.fim is not None:
+            stmt = stmt.where(A.data_hora < self.fim)
+        if self.valor_min is not None:
+            stmt = stmt.where(A.valor >= self.valor_min)
+        if self.valor_max is not None:
+            stmt = stmt.where(A.valor <= self.valor_max)
+        if self.veiculo_id is not None:
+            stmt = stmt.where(A.veiculo_id == self.veiculo_id)
+        if self.busca:
+            stmt = stmt.where(A.observacao.ilike(f"%{_escape_like(self.busca)}%", escape="\\"))
+        return stmt
+
+
+def _escape_like(termo: str) -> str:
+    return termo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def filtros_lista(
+    posto: str | None = Query(None, pattern="^(IPIRANGA|OUTRO)$"),
+    inicio: datetime | None = None,
+    fim: datetime | None = None,
+    valor_min: float | None = Query(None, ge=0),
+    valor_max: float | None = Query(None, ge=0),
+    veiculo_id: int | None = None,
+    q: str | None = Query(None, min_length=1, max_length=100, description="Texto em observacao"),
+) -> FiltrosLista:
+    """Dependência dos parâmetros de filtro de GET /abastecimentos."""
+    return FiltrosLista(posto, inicio, fim, valor_min, valor_max, veiculo_id, q.strip() if q else None)
+
+# =============================
+# QUERY DA LISTAGEM
+# =============================
+
+_COLUNAS = (
+    Abastecimento.id,
+    Abastecimento.user_id,
+    Abastecimento.veiculo_id,
+    Abastecimento.data_hora,
+    Abastecimento.posto,
+    Abastecimento.valor,
+    Abastecimento.litros,
+    Abastecimento.km_odometro,
+    Abastecimento.observacao,
+)
+
+
+def metricas_derivadas(c) -> list:
+    """Colunas derivadas de AbastecimentoOut a partir de valor, litros e km_rodado."""
+    rodou = c.km_rodado > 0
+    return [
+        (c.valor / c.litros).label("preco_por_litro"),
+        c.km_rodado,
+        case((rodou, c.km_rodado / c.litros)).label("km_por_litro_aprox"),
+        case((rodou, c.valor / c.km_rodado)).label("custo_por_km"),
+    ]
+
+
+def anterior_na_cadeia(c, coluna: str, antes):
+    """`coluna` do último lançamento da cadeia de `c` com `antes(anterior)` verdadeiro.
+
+    A cadeia é o veículo; lançamentos antigos, sem veículo, continuam encadeados
+    entre si por usuário. Subquery correlacionada: uma busca no índice por linha,
+    (veiculo_id, data_hora, id) ou (user_id, data_hora, id).
+    """
+    anterior = aliased(Abastecimento)
+    ordem = (anterior.data_hora.desc(), anterior.id.desc())
+
+    do_veiculo = select(getattr(anterior, coluna)).where(
+        anterior.veiculo_id == c.veiculo_id,
+        antes(anterior)
+    ).order_by(*ordem).limit(1).scalar_subquery()
+
+    sem_veiculo = select(getattr(anterior, coluna)).where(
+        anterior.user_id == c.user_id,
+        anterior.veiculo_id.is_(None),
+        antes(anterior)
+    ).order_by(*ordem).limit(1).scalar_subquery()
+
+    return case((c.veiculo_id.is_(None), sem_veiculo), else_=do_veiculo)
+
+
+def km_anterior_expr(c):
+    """km do lançamento imediatamente anterior na cadeia (por linha de `c`)."""
+    return anterior_na_cadeia(
+        c,
+        "km_odometro",
+        lambda anterior: tuple_(anterior.data_hora, anterior.id) < tuple_(c.data_hora, c.id)
+    )
+
+
+def km_rodado_lag(c):
+    """km_rodado por LAG(), para quem lê a cadeia inteira em ordem (exportação).
+
+    Mesmo resultado de km_odometro - km_anterior_expr(): partição (user_id,
+    veiculo_id) equivale à cadeia (o veículo tem um só dono) e a ordem é a mesma
+    (data_hora, id).
+    """
+    return c.km_odometro - func.lag(c.km_odometro).over(
+        partition_by=(c.user_id, c.veiculo_id),
+        order_by=(c.data_hora, c.id)
+    )
+
+
+def list_stmt(
+    user_id: int,
+    limit: int,
+    order: str = "desc",
+    cursor: tuple[datetime, int] | None = None,
+    filtros: FiltrosLista | None = None
+) -> Select:
+    """Uma página (limit + 1 linhas) com as métricas derivadas.
+
+    O km anterior de cada linha vem de km_anterior_expr() (por veículo), calculado
+    só para as linhas da página: o custo não depende do tamanho do histórico. Com
+    filtros, km_rodado continua sendo desde o lançamento anterior (filtrado ou não).
+    """
+    chave = tuple_(Abastecimento.data_hora, Abastecimento.id)
+    pagina = select(*_COLUNAS).where(Abastecimento.user_id == user_id)
+    if filtros is not None:
+        pagina = filtros.aplicar(pagina)
+
+    if order == "desc":
+        if cursor is not None:
+            pagina = pagina.where(chave < tuple_(*cursor))
+        pagina = pagina.order_by(Abastecimento.data_hora.desc(), Abastecimento.id.desc())
+    else:
+        if cursor is not None:
+            pagina = pagina.where(chave > tuple_(*cursor))
+        pagina = pagina.order_by(Abastecimento.data_hora, Abastecimento.id)
+    pagina = pagina.limit(limit + 1).subquery()
+
+    com_km = select(
+        pagina,
+        (pagina.c.km_odometro - km_anterior_expr(pagina.c)).label("km_rodado")
+    ).subquery()
+
+    stmt = select(
+        com_km.c.id,
+        com_km.c.veiculo_id,
+        com_km.c.data_hora,
+        com_km.c.posto,
+        com_km.c.valor,
+        com_km.c.litros,
+        com_km.c.km_odometro,
+        com_km.c.observacao,
+        *metricas_derivadas(com_km.c),
+    )
+
+    if order == "desc":
+        return stmt.order_by(com_km.c.data_hora.desc(), com_km.c.id.desc())
+    return stmt.order_by(com_km.c.data_hora, com_km.c.id)
+
+
+def row_to_out(row) -> AbastecimentoOut:
+    def _arred(valor, casas):
+        return round(float(valor), casas) if valor is not None else None
+
+    return AbastecimentoOut(
+        id=row.id,
+        veiculo_id=row.veiculo_id,
+        data_hora=row.data_hora,
+        posto=row.posto,
+        valor=float(row.valor),
+        litros=float(row.litros),
+        km_odometro=row.km_odometro,
+        observacao=row.observacao,
+        preco_por_litro=_arred(row.preco_por_litro, 3),
+        km_rodado=row.km_rodado,
+        km_por_litro_aprox=_arred(row.km_por_litro_aprox, 2),
+        custo_por_km=_arred(row.custo_por_km, 3),
+    )
+
+
+def abastecimento_to_out(ab: Abastecimento) -> AbastecimentoOut:
+    # Lançamento isolado (create/update): só a métrica que não depende do anterior
+    out = AbastecimentoOut.model_validate(ab)
+    out.preco_por_litro = round(out.valor / out.litros, 3) if out.litros else None
+    return out
+
+def last_km_stmt(user_id: int) -> Select:
+    # Mesmo índice da paginação (user_id, data_hora DESC, id)
+    return select(Abastecimento.km_odometro).where(
+        Abastecimento.user_id == user_id
+    ).order_by(Abastecimento.data_hora.desc(), Abastecimento.id.desc()).limit(1)
+
+# =============================
+# ÚLTIMOS LANÇAMENTOS (DASHBOARD)
+# =============================
+
+def recent_entries_stmt(user_id: int, limit: int = 10) -> Select:
+    return select(
+        Abastecimento.id,
+        Abastecimento.data_hora,
+        Abastecimento.valor,
+        Veiculo.placa,
+    ).outerjoin(
+        Veiculo, Veiculo.id == Abastecimento.veiculo_id
+    ).where(
+        Abastecimento.user_id == user_id
+    ).order_by(Abastecimento.data_hora.desc(), Abastecimento.id.desc()).limit(limit)
+
+
+def recent_entries_from_rows(rows) -> list[dict]:
+    return [
+        {
+            "id": r.id,
+            "data_hora": r.data_hora.isoformat(),
+            "valor": float(r.valor),
+            "veiculo": r.placa
+        } for r in rows
+    ]
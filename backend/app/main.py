@@ -1,9 +1,21 @@
-from fastapi import FastAPI
+from .startup import timer
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from .routes import auth, abastecimentos, dashboard
-from .db import engine, Base
+from fastapi.responses import PlainTextResponse
+from .routes import auth, abastecimentos, dashboard, admin, analytics, veiculos
+from .db import dispose_async_engine
+from .events import broker
+from .metrics import RequestMetricsMiddleware, render_metrics
+from .passwords import shutdown_pool
+from .replica import ReadYourWritesMiddleware
+from .schema import verificar_schema
+from .settings import settings
+
+timer.mark("imports")
 
-Base.metadata.create_all(bind=engine)
+# Sem create_all nem seed de admin aqui: rode `python -m app.manage upgrade-db` no deploy
+# (o startup só confere o schema). Engine e pool de bcrypt são criados no primeiro uso.
 
 app = FastAPI(title="Fuel Control API")
 
@@ -16,19 +28,68 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing", "X-Read-Your-Writes"],
 )
+# Server-Timing e contagem de queries por request; histogramas em GET /metrics
+app.add_middleware(RequestMetricsMiddleware)
+if settings.DATABASE_READ_URL:
+    # GETs vão para a réplica; depois de uma escrita, o usuário lê do primário por alguns segundos
+    app.add_middleware(ReadYourWritesMiddleware)
+
+if settings.DB_MODE == "async":
+    # Versões async registradas antes: têm precedência sobre as síncronas de mesmo path
+    from .routes_async import auth as auth_async, abastecimentos as abastecimentos_async
+    from .routes_async import dashboard as dashboard_async, admin as admin_async
+
+    app.include_router(auth_async.router, prefix="/auth", tags=["auth"])
+    app.include_router(abastecimentos_async.router, prefix="/abastecimentos", tags=["abastecimentos"])
+    app.include_router(dashboard_async.router, prefix="/dashboard", tags=["dashboard"])
+    app.include_router(admin_async.router)
 
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(abastecimentos.router, prefix="/abastecimentos", tags=["abastecimentos"])
 app.include_router(dashboard.router, prefix="/dashboard", tags=["dashboard"])
+app.include_router(veiculos.router, prefix="/veiculos", tags=["veiculos"])
+app.include_router(admin.router)
+app.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
+
+timer.mark("app_e_rotas")
 
 @app.get("/")
 def read_root():
     return {"status": "ok"}
-from .create_admin import create_admin
+
+
+@app.get("/startup", include_in_schema=False)
+def startup_timing():
+    return timer.report()
+
+
+@app.get("/metrics", include_in_schema=False, response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.middleware("http")
+async def first_request_timing(request: Request, call_next):
+    if timer.concluido or not timer.start_first_request():
+        return await call_next(request)
+    response = await call_next(request)
+    timer.first_request()
+    return response
+
 
 @app.on_event("startup")
-def startup_event():
-    create_admin()
-from .routes import admin
-app.include_router(admin.router)
+async def startup_event():
+    if settings.SCHEMA_CHECK:
+        verificar_schema()
+        timer.mark("schema_check")
+    await broker.iniciar()
+    timer.mark("startup_event")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    shutdown_pool()
+    await broker.parar()
+    await dispose_async_engine()
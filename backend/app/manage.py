@@ -0,0 +1,166 @@
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, text
+
+from .create_admin import create_admin
+from .db import Base, get_engine, new_session
+from .models import AbastecimentoRollup, SyncOperacao
+from .passwords import shutdown_pool
+from .partitions import arquivar_particoes, converter_tabela, criar_particoes, limite_arquivo
+from .rollups import rebuild_rollups, rebuild_rollups_paralelo
+from .schema import aplicar_schema_updates, rollups_vazios, schema_pendente
+
+# =============================
+# COMANDOS DE MANUTENÇÃO
+# =============================
+# Uso: python -m app.manage <comando>
+
+EXTENSOES = ("pg_trgm", "btree_gin")  # índice de busca em observacao
+
+
+def _criar_schema(engine) -> None:
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            for extensao in EXTENSOES:
+                conn.execute(text(f"CREATE EXTENSION IF NOT EXISTS {extensao}"))
+    Base.metadata.create_all(bind=engine)
+
+
+def cmd_init_db(args):
+    # Schema + admin: antes rodavam no import/startup da API (cold start lento)
+    _criar_schema(get_engine())
+    print("Schema criado/verificado")
+    if not args.sem_admin:
+        create_admin()
+
+
+def cmd_upgrade_db(args):
+    # Deploy: tabelas novas (create_all), colunas e índices novos nas existentes
+    # (schema_updates.sql) e rollups quando ainda vazios. Idempotente.
+    engine = get_engine()
+    _criar_schema(engine)
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            aplicar_schema_updates(conn)
+        print("schema_updates.sql aplicado")
+    with engine.connect() as conn:
+        vazios = rollups_vazios(conn)
+    if vazios:
+        cmd_rebuild_rollups(argparse.Namespace(user_id=None, workers=args.workers))
+    with engine.connect() as conn:
+        pendente = schema_pendente(conn)
+    if pendente:
+        raise SystemExit(f"Schema ainda atrás dos models: {', '.join(pendente)}")
+    print("Schema atualizado")
+    if not args.sem_admin:
+        create_admin()
+
+
+def cmd_create_admin(args):
+    create_admin()
+
+
+def cmd_rebuild_rollups(args):
+    engine = get_engine()
+    AbastecimentoRollup.__table__.create(bind=engine, checkfirst=True)
+    desde = None
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            desde = limite_arquivo(conn)
+        if desde is not None:
+            print(f"Períodos arquivados (antes de {desde}) mantidos como estão")
+    # SQLite tem um único escritor: shards em paralelo só no PostgreSQL
+    if args.workers > 1 and args.user_id is None and engine.dialect.name != "sqlite":
+        linhas = rebuild_rollups_paralelo(new_session, args.workers, desde=desde)
+        print(f"Rollups recalculados: {linhas} linhas ({args.workers} shards)")
+        return
+    db = new_session()
+    try:
+        linhas = rebuild_rollups(db, user_id=args.user_id, desde=desde)
+    finally:
+        db.close()
+    print(f"Rollups recalculados: {linhas} linhas")
+
+
+def cmd_prune_sync(args):
+    # Chaves antigas não voltam mais da fila offline; reenvio depois disso reaplicaria
+    limite = datetime.now(timezone.utc) - timedelta(days=args.dias)
+    db = new_session()
+    try:
+        removidas = db.execute(delete(SyncOperacao).where(SyncOperacao.created_at < limite)).rowcount
+        db.commit()
+    finally:
+        db.close()
+    print(f"Chaves de sync removidas: {removidas}")
+
+
+def _engine_postgres():
+    engine = get_engine()
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("Particionamento disponível apenas no PostgreSQL")
+    return engine
+
+
+def cmd_partition_table(args):
+    with _engine_postgres().begin() as conn:
+        copiadas = converter_tabela(conn, datetime.now(timezone.utc), args.meses_a_frente)
+    print(f"abastecimentos particionada por mês ({copiadas} linhas copiadas)")
+
+
+def cmd_maintain_partitions(args):
+    # Cron diário/semanal: partições futuras antes de precisar e arquivo das antigas
+    agora = datetime.now(timezone.utc)
+    with _engine_postgres().begin() as conn:
+        criadas = criar_particoes(conn, agora, args.meses_a_frente)
+        arquivadas = []
+        if args.manter_meses:
+            arquivadas = arquivar_particoes(conn, agora, args.manter_meses, args.tablespace)
+    print(f"Partições criadas: {', '.join(criadas) or 'nenhuma'}")
+    print(f"Partições arquivadas: {', '.join(arquivadas) or 'nenhuma'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.manage")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("init-db", help="Cria as tabelas e o admin inicial")
+    p.add_argument("--sem-admin", action="store_true")
+    p.set_defaults(func=cmd_init_db)
+
+    p = sub.add_parser("upgrade-db", help="Atualiza o schema de um banco existente e preenche os rollups (deploy)")
+    p.add_argument("--sem-admin", action="store_true")
+    p.add_argument("--workers", type=int, default=1, help="Shards do rebuild-rollups, se necessário")
+    p.set_defaults(func=cmd_upgrade_db)
+
+    p = sub.add_parser("create-admin", help="Cria o admin inicial se não existir")
+    p.set_defaults(func=cmd_create_admin)
+
+    p = sub.add_parser("rebuild-rollups", help="Recalcula abastecimentos_rollup do zero")
+    p.add_argument("--user-id", type=int, default=None)
+    p.add_argument("--workers", type=int, default=1, help="Shards de usuários em paralelo (PostgreSQL)")
+    p.set_defaults(func=cmd_rebuild_rollups)
+
+    p = sub.add_parser("prune-sync", help="Remove chaves de idempotência antigas do /abastecimentos/sync")
+    p.add_argument("--dias", type=int, default=90)
+    p.set_defaults(func=cmd_prune_sync)
+
+    p = sub.add_parser("partition-table", help="Converte abastecimentos em tabela particionada por mês (PostgreSQL)")
+    p.add_argument("--meses-a-frente", type=int, default=3)
+    p.set_defaults(func=cmd_partition_table)
+
+    p = sub.add_parser("maintain-partitions", help="Cria partições futuras e arquiva as antigas (PostgreSQL)")
+    p.add_argument("--meses-a-frente", type=int, default=3)
+    p.add_argument("--manter-meses", type=int, default=0, help="Meses mantidos na tabela quente (0 = não arquiva)")
+    p.add_argument("--tablespace", default=None, help="Tablespace das partições arquivadas")
+    p.set_defaults(func=cmd_maintain_partitions)
+
+    args = parser.parse_args(argv)
+    try:
+        args.func(args)
+    finally:
+        shutdown_pool()  # create-admin/init-db/upgrade-db usam o pool de bcrypt
+
+
+if __name__ == "__main__":
+    main()
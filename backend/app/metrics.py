@@ -0,0 +1,265 @@
+from __future__ import annotations
+import bisect
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from .settings import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+# =============================
+# CONTADORES POR REQUEST
+# =============================
+# O middleware coloca um RequestStats no contexto; os eventos do engine (no
+# threadpool ou no greenlet do AsyncSession) recebem uma cópia do contexto, mas
+# o objeto é o mesmo, então as contagens voltam para o request.
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+    checkout_seconds: float = 0.0
+
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> RequestStats | None:
+    return _request_stats.get()
+
+# =============================
+# HISTOGRAMAS / GAUGES (formato Prometheus, por processo)
+# =============================
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CHECKOUT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: tuple, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.labels = labels
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            serie = self._series.get(label_values)
+            if serie is None:
+                serie = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            if idx < len(self.buckets):
+                serie[0][idx] += 1
+            serie[1] += value
+            serie[2] += 1
+
+    def render(self) -> list[str]:
+        linhas = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(k, list(v[0]), v[1], v[2]) for k, v in self._series.items()]
+        for label_values, contagens, soma, total in sorted(series):
+            base = _labels(self.labels, label_values)
+            acumulado = 0
+            for limite, n in zip(self.buckets, contagens):
+                acumulado += n
+                linhas.append(f"{self.name}_bucket{_labels(self.labels, label_values, le=limite)} {acumulado}")
+            linhas.append(f"{self.name}_bucket{_labels(self.labels, label_values, le='+Inf')} {total}")
+            linhas.append(f"{self.name}_sum{base} {soma}")
+            linhas.append(f"{self.name}_count{base} {total}")
+        return linhas
+
+
+def _labels(nomes: tuple, valores: tuple, **extra) -> str:
+    pares = list(zip(nomes, valores)) + list(extra.items())
+    if not pares:
+        return ""
+    corpo = ",".join(f'{k}="{_escape(v)}"' for k, v in pares)
+    return "{" + corpo + "}"
+
+
+def _escape(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+request_latency = Histogram(
+    "http_request_duration_seconds",
+    "Latência dos requests por rota",
+    LATENCY_BUCKETS,
+    ("method", "route", "status"),
+)
+request_queries = Histogram(
+    "db_queries_per_request",
+    "Statements SQL executados por request",
+    QUERY_BUCKETS,
+    ("method", "route"),
+)
+request_db_time = Histogram(
+    "db_time_per_request_seconds",
+    "Tempo gasto em statements SQL por request",
+    LATENCY_BUCKETS,
+    ("method", "route"),
+)
+pool_checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Espera para obter uma conexão do pool",
+    CHECKOUT_BUCKETS,
+    ("engine",),
+)
+
+# =============================
+# INSTRUMENTAÇÃO DO ENGINE
+# =============================
+
+def _timed_connect(pool_cls):
+    class TimedPool(pool_cls):
+        """Pool que mede a espera no checkout (fila quando o pool está cheio)."""
+
+        def connect(self):
+            inicio = time.perf_counter()
+            try:
+                return super().connect()
+            finally:
+                espera = time.perf_counter() - inicio
+                pool_checkout_wait.observe(espera, getattr(self, "_metrics_name", "primary"))
+                stats = _request_stats.get()
+                if stats is not None:
+                    stats.checkout_seconds += espera
+
+    TimedPool.__name__ = TimedPool.__qualname__ = f"Timed{pool_cls.__name__}"
+    return TimedPool
+
+
+TimedQueuePool = _timed_connect(QueuePool)
+TimedAsyncAdaptedQueuePool = _timed_connect(AsyncAdaptedQueuePool)
+
+_engines: dict[str, Engine] = {}
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Conta statements e tempo de banco por request; registra o pool para /metrics."""
+    _engines[name] = engine
+    engine.pool._metrics_name = name
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_metrics_inicio", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _depois(conn, cursor, statement, parameters, context, executemany):
+        inicio = conn.info["_metrics_inicio"].pop()
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += time.perf_counter() - inicio
+
+    @event.listens_for(engine, "handle_error")
+    def _erro(context):
+        pilha = context.connection.info.get("_metrics_inicio") if context.connection is not None else None
+        if pilha:
+            pilha.pop()
+
+
+def forget_engine(name: str) -> None:
+    _engines.pop(name, None)
+
+
+def _pool_gauges() -> list[str]:
+    linhas = []
+    series = {"db_pool_size": [], "db_pool_checked_out": [], "db_pool_overflow": [], "db_pool_saturation": []}
+    for name, engine in sorted(_engines.items()):
+        pool = engine.pool
+        if not isinstance(pool, QueuePool):
+            continue
+        capacidade = pool.size() + max(pool._max_overflow, 0)
+        em_uso = pool.checkedout()
+        label = _labels(("engine",), (name,))
+        series["db_pool_size"].append(f"db_pool_size{label} {pool.size()}")
+        series["db_pool_checked_out"].append(f"db_pool_checked_out{label} {em_uso}")
+        series["db_pool_overflow"].append(f"db_pool_overflow{label} {max(pool.overflow(), 0)}")
+        series["db_pool_saturation"].append(
+            f"db_pool_saturation{label} {em_uso / capacidade if capacidade else 0.0}"
+        )
+    ajuda = {
+        "db_pool_size": "Conexões permanentes do pool",
+        "db_pool_checked_out": "Conexões em uso agora",
+        "db_pool_overflow": "Conexões de overflow abertas agora",
+        "db_pool_saturation": "Conexões em uso / (pool_size + max_overflow)",
+    }
+    for nome, valores in series.items():
+        linhas += [f"# HELP {nome} {ajuda[nome]}", f"# TYPE {nome} gauge", *valores]
+    return linhas
+
+
+def render_metrics() -> str:
+    linhas: list[str] = []
+    for histograma in (request_latency, request_queries, request_db_time, pool_checkout_wait):
+        linhas += histograma.render()
+    linhas += _pool_gauges()
+    return "\n".join(linhas) + "\n"
+
+# =============================
+# MIDDLEWARE ASGI
+# =============================
+# ASGI puro (não BaseHTTPMiddleware): o Server-Timing entra no http.response.start,
+# inclusive em StreamingResponse, e o corpo não é bufferizado.
+
+SEM_ROTA = "<sem rota>"
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        inicio = time.perf_counter()
+        status_code = 500
+
+        async def send_com_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                total_ms = (time.perf_counter() - inicio) * 1000
+                valor = (
+                    f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries", '
+                    f"pool;dur={stats.checkout_seconds * 1000:.1f}, "
+                    f"app;dur={total_ms:.1f}"
+                )
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", valor.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_com_timing)
+        finally:
+            _request_stats.reset(token)
+            duracao = time.perf_counter() - inicio
+            route = scope.get("route")
+            path = getattr(route, "path", None) or SEM_ROTA
+            method = scope["method"]
+
+            request_latency.observe(duracao, method, path, str(status_code))
+            request_queries.observe(stats.queries, method, path)
+            request_db_time.observe(stats.db_seconds, method, path)
+
+            if settings.QUERY_BUDGET and stats.queries > settings.QUERY_BUDGET:
+                logger.warning(
+                    "Query budget excedido: %s %s fez %d queries (limite %d, %.1f ms no banco)",
+                    method, path, stats.queries, settings.QUERY_BUDGET, stats.db_seconds * 1000,
+                )
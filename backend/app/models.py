@@ -7,9 +7,12 @@ from sqlalchemy import (
     String,
     Boolean,
     DateTime,
+    Date,
     Numeric,
     Text,
     ForeignKey,
+    Index,
+    UniqueConstraint,
     func
 )
 from sqlalchemy.orm import relationship
@@ -27,6 +30,9 @@ class User(Base):
 
     is_admin = Column(Boolean, nullable=False, server_default="false")
 
+    # Incrementada a cada escrita em abastecimentos (ETag dos endpoints agregados)
+    data_version = Column(Integer, nullable=False, server_default="0")
+
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     abastecimentos = relationship(
@@ -35,8 +41,43 @@ class User(Base):
         cascade="all, delete-orphan"
     )
 
+    veiculos = relationship(
+        "Veiculo",
+        back_populates="user",
+        cascade="all, delete-orphan"
+    )
+
+
+class Veiculo(Base):
+    __tablename__ = "veiculos"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Dono do veículo: só ele lança abastecimentos nele
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        index=True,
+        nullable=False
+    )
+
+    placa = Column(String(10), nullable=False)
+    descricao = Column(String(100), nullable=True)
+
+    capacidade_tanque = Column(Numeric(6, 1), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    user = relationship("User", back_populates="veiculos")
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "placa", name="uq_veiculos_user_placa"),
+    )
+
 
 class Abastecimento(Base):
+    # No PostgreSQL pode ser particionada por mês (python -m app.manage partition-table):
+    # lá a PK vira (id, data_hora), mas id continua único e o mapeamento não muda
     __tablename__ = "abastecimentos"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -54,6 +95,13 @@ class Abastecimento(Base):
         server_default=func.now()
     )
 
+    # Opcional: lançamentos antigos (antes dos veículos) ficam sem veículo
+    veiculo_id = Column(
+        Integer,
+        ForeignKey("veiculos.id", ondelete="SET NULL"),
+        nullable=True
+    )
+
     posto = Column(String(50), nullable=False)
 
     valor = Column(Numeric(12, 2), nullable=False)
@@ -70,3 +118,73 @@ class Abastecimento(Base):
     )
 
     user = relationship("User", back_populates="abastecimentos")
+    veiculo = relationship("Veiculo")
+
+    __table_args__ = (
+        # Paginação por cursor (keyset) em GET /abastecimentos
+        Index("ix_abastecimentos_user_data_hora_id", user_id, data_hora.desc(), id),
+        # Filtros da listagem: posto (na ordem da paginação) e faixa de valor
+        Index("ix_abastecimentos_user_posto_data_hora", user_id, posto, data_hora.desc(), id),
+        Index("ix_abastecimentos_user_valor", user_id, valor),
+        # Busca em observacao (ILIKE '%termo%'): GIN de trigramas com user_id (pg_trgm + btree_gin)
+        Index(
+            "ix_abastecimentos_user_observacao_trgm",
+            user_id,
+            observacao,
+            postgresql_using="gin",
+            postgresql_ops={"observacao": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        # km anterior por veículo e agregação por veículo (index-only no PostgreSQL)
+        Index(
+            "ix_abastecimentos_veiculo_data_hora",
+            veiculo_id,
+            data_hora,
+            id,
+            postgresql_include=["valor", "litros", "km_odometro"],
+        ),
+    )
+
+
+class AbastecimentoRollup(Base):
+    # Totais por usuário/quinzena/posto mantidos na mesma transação das escritas
+    __tablename__ = "abastecimentos_rollup"
+
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+
+    # Início da quinzena (dia 1 ou 16); o mês é a soma das duas quinzenas
+    periodo = Column(Date, primary_key=True)
+
+    posto = Column(String(50), primary_key=True)
+
+    total_valor = Column(Numeric(14, 2), nullable=False, server_default="0")
+    total_litros = Column(Numeric(14, 3), nullable=False, server_default="0")
+    quantidade = Column(Integer, nullable=False, server_default="0")
+
+    __table_args__ = (
+        # Relatórios da frota: todas as linhas de um intervalo de quinzenas
+        Index("ix_abastecimentos_rollup_periodo_user", periodo, user_id),
+    )
+
+
+class SyncOperacao(Base):
+    # Chaves de idempotência do POST /abastecimentos/sync (reenvio não duplica)
+    __tablename__ = "sync_operacoes"
+
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+
+    chave = Column(String(64), primary_key=True)
+
+    op = Column(String(10), nullable=False)
+
+    # Lançamento criado/alterado/excluído pela operação (sem FK: pode ter sido excluído depois)
+    abastecimento_id = Column(Integer, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
@@ -0,0 +1,201 @@
+from __future__ import annotations
+import re
+from datetime import date, datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from .models import Abastecimento
+
+# =============================
+# PARTICIONAMENTO MENSAL (POSTGRESQL)
+# =============================
+# abastecimentos vira uma tabela particionada por RANGE (data_hora), uma partição
+# por mês (UTC, alinhado às quinzenas dos rollups) e uma partição padrão para
+# datas fora das partições criadas. Consultas com intervalo de data_hora (mês,
+# quinzena) só leem as partições do intervalo; a paginação por data_hora lê as
+# partições em ordem e para na primeira que completa a página.
+#
+# No banco a PK passa a ser (id, data_hora), exigência do PostgreSQL; o ORM
+# continua usando só id (único pela sequence), então models e rotas não mudam.
+# Partições antigas saem para abastecimentos_arquivo (DETACH/ATTACH, sem copiar
+# linhas) e deixam de aparecer na API; os totais delas continuam nos rollups.
+
+TABELA = "abastecimentos"
+ARQUIVO = "abastecimentos_arquivo"
+PADRAO = "abastecimentos_padrao"
+
+_SUFIXO = re.compile(r"_p(\d{4})_(\d{2})$")
+
+
+def inicio_mes(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def somar_meses(mes: date, n: int) -> date:
+    total = mes.year * 12 + mes.month - 1 + n
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def nome_particao(mes: date) -> str:
+    return f"{TABELA}_p{mes.year}_{mes.month:02d}"
+
+
+def _limite(mes: date) -> str:
+    return f"'{mes.isoformat()} 00:00:00+00'"
+
+
+def _intervalo(mes: date) -> str:
+    return f"FROM ({_limite(mes)}) TO ({_limite(somar_meses(mes, 1))})"
+
+
+def existe(conn: Connection, nome: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:nome)"), {"nome": nome}).scalar() is not None
+
+
+def particionada(conn: Connection, tabela: str = TABELA) -> bool:
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.oid = to_regclass(:tabela)"
+    ), {"tabela": tabela}).first() is not None
+
+
+def particoes(conn: Connection, tabela: str = TABELA) -> list[tuple[str, date]]:
+    """Partições mensais (nome, mês) de `tabela`, da mais antiga para a mais nova."""
+    nomes = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:tabela)"
+    ), {"tabela": tabela}).scalars()
+    saida = []
+    for nome in nomes:
+        m = _SUFIXO.search(nome)
+        if m:
+            saida.append((nome, date(int(m.group(1)), int(m.group(2)), 1)))
+    return sorted(saida, key=lambda p: p[1])
+
+
+def limite_arquivo(conn: Connection) -> date | None:
+    """Primeiro dia ainda na tabela quente (None se nada foi arquivado)."""
+    if not existe(conn, ARQUIVO):
+        return None
+    arquivadas = particoes(conn, ARQUIVO)
+    return somar_meses(arquivadas[-1][1], 1) if arquivadas else None
+
+# =============================
+# CRIAÇÃO / CONVERSÃO
+# =============================
+
+def _criar_particao(conn: Connection, mes: date) -> bool:
+    nome = nome_particao(mes)
+    if existe(conn, nome):
+        return False
+    inicio = datetime(mes.year, mes.month, 1, tzinfo=timezone.utc)
+    fim = datetime.combine(somar_meses(mes, 1), datetime.min.time(), timezone.utc)
+    pendentes = conn.execute(
+        text(f"SELECT 1 FROM {PADRAO} WHERE data_hora >= :inicio AND data_hora < :fim LIMIT 1"),
+        {"inicio": inicio, "fim": fim}
+    ).first()
+    if pendentes is None:
+        conn.execute(text(f"CREATE TABLE {nome} PARTITION OF {TABELA} FOR VALUES {_intervalo(mes)}"))
+        return True
+    # Linhas do mês caíram na partição padrão: move para a nova antes de anexar
+    conn.execute(text(f"CREATE TABLE {nome} (LIKE {TABELA} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    conn.execute(text(
+        f"WITH movidas AS (DELETE FROM {PADRAO} WHERE data_hora >= :inicio AND data_hora < :fim RETURNING *) "
+        f"INSERT INTO {nome} SELECT * FROM movidas"
+    ), {"inicio": inicio, "fim": fim})
+    conn.execute(text(f"ALTER TABLE {TABELA} ATTACH PARTITION {nome} FOR VALUES {_intervalo(mes)}"))
+    return True
+
+
+def criar_particoes(conn: Connection, hoje: datetime, meses_a_frente: int = 3) -> list[str]:
+    """Garante as partições do mês corrente até `meses_a_frente` meses adiante."""
+    atual = inicio_mes(hoje.date())
+    criadas = []
+    for n in range(meses_a_frente + 1):
+        mes = somar_meses(atual, n)
+        if _criar_particao(conn, mes):
+            criadas.append(nome_particao(mes))
+    return criadas
+
+
+def converter_tabela(conn: Connection, hoje: datetime, meses_a_frente: int = 3) -> int:
+    """Converte abastecimentos (tabela comum) em particionada, numa transação.
+
+    Copia todas as linhas: rode em janela de manutenção (trava a tabela até o fim).
+    Devolve quantas linhas foram copiadas.
+    """
+    if particionada(conn):
+        return 0
+    legado = f"{TABELA}_legado"
+    sequence = conn.execute(text(f"SELECT pg_get_serial_sequence('{TABELA}', 'id')")).scalar()
+
+    # Índices e PK antigos liberam os nomes para os da tabela nova
+    conn.execute(text(f"ALTER TABLE {TABELA} RENAME TO {legado}"))
+    for (indice,) in conn.execute(
+        text("SELECT indexname FROM pg_indexes WHERE tablename = :t"), {"t": legado}
+    ).all():
+        conn.execute(text(f'ALTER INDEX "{indice}" RENAME TO "{indice[:50]}_legado"'))
+
+    conn.execute(text(
+        f"CREATE TABLE {TABELA} (LIKE {legado} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        "PARTITION BY RANGE (data_hora)"
+    ))
+    conn.execute(text(f"ALTER TABLE {TABELA} ADD PRIMARY KEY (id, data_hora)"))
+    conn.execute(text(
+        f"ALTER TABLE {TABELA} ADD FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE"
+    ))
+    conn.execute(text(
+        f"ALTER TABLE {TABELA} ADD FOREIGN KEY (veiculo_id) REFERENCES veiculos(id) ON DELETE SET NULL"
+    ))
+    if sequence:
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {TABELA}.id"))
+
+    primeiro = conn.execute(text(f"SELECT min(data_hora) FROM {legado}")).scalar()
+    atual = inicio_mes(hoje.date())
+    mes = min(inicio_mes(primeiro.astimezone(timezone.utc).date()), atual) if primeiro else atual
+    conn.execute(text(f"CREATE TABLE {PADRAO} PARTITION OF {TABELA} DEFAULT"))
+    while mes <= somar_meses(atual, meses_a_frente):
+        _criar_particao(conn, mes)
+        mes = somar_meses(mes, 1)
+
+    copiadas = conn.execute(text(f"INSERT INTO {TABELA} SELECT * FROM {legado}")).rowcount
+
+    # Mesmos índices do model, criados no pai (propagam para as partições, atuais e futuras)
+    for indice in Abastecimento.__table__.indexes:
+        indice.create(conn)
+
+    conn.execute(text(f"DROP TABLE {legado}"))
+    conn.execute(text(f"ANALYZE {TABELA}"))
+    return copiadas
+
+# =============================
+# ARQUIVO FRIO
+# =============================
+
+def arquivar_particoes(
+    conn: Connection,
+    hoje: datetime,
+    manter_meses: int = 24,
+    tablespace: str | None = None
+) -> list[str]:
+    """Move para abastecimentos_arquivo as partições anteriores aos últimos `manter_meses` meses.
+
+    DETACH + ATTACH só altera o catálogo: as linhas não são copiadas. Com
+    `tablespace`, a partição arquivada vai para ele (ex.: disco mais barato).
+    """
+    if not existe(conn, ARQUIVO):
+        conn.execute(text(f"CREATE TABLE {ARQUIVO} (LIKE {TABELA}) PARTITION BY RANGE (data_hora)"))
+    limite = somar_meses(inicio_mes(hoje.date()), -manter_meses)
+    preparer = conn.dialect.identifier_preparer
+
+    movidas = []
+    for nome, mes in particoes(conn):
+        if somar_meses(mes, 1) > limite:
+            break
+        conn.execute(text(f"ALTER TABLE {TABELA} DETACH PARTITION {nome}"))
+        conn.execute(text(f"ALTER TABLE {ARQUIVO} ATTACH PARTITION {nome} FOR VALUES {_intervalo(mes)}"))
+        if tablespace:
+            conn.execute(text(f"ALTER TABLE {nome} SET TABLESPACE {preparer.quote(tablespace)}"))
+        movidas.append(nome)
+    return movidas
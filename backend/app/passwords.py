@@ -0,0 +1,124 @@
+from __future__ import annotations
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from .settings import settings
+
+# =============================
+# CONTEXTO BCRYPT
+# =============================
+# min_rounds = custo configurado: hashes antigos com custo menor são refeitos no login.
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+)
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(password: str, hashed: str) -> tuple[bool, str | None]:
+    return pwd_context.verify_and_update(password, hashed)
+
+# =============================
+# POOL DE PROCESSOS (LIMITADO)
+# =============================
+# bcrypt é CPU puro: roda fora dos workers do uvicorn. Quando há mais de
+# PASSWORD_MAX_PENDING operações na fila, responde 503 em vez de enfileirar.
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+_pending = 0
+
+
+def _get_pool() -> ProcessPoolExecutor | None:
+    global _pool
+    if settings.PASSWORD_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _reserve() -> None:
+    global _pending
+    with _pool_lock:
+        if _pending >= settings.PASSWORD_MAX_PENDING:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servidor ocupado, tente novamente",
+                headers={"Retry-After": "1"},
+            )
+        _pending += 1
+
+
+def _release(_future=None) -> None:
+    global _pending
+    with _pool_lock:
+        _pending -= 1
+
+
+def pending() -> int:
+    return _pending
+
+
+def _submit(fn, *args) -> Future:
+    _reserve()
+    pool = _get_pool()
+    if pool is None:
+        # Sem pool (PASSWORD_WORKERS=0): executa em thread, ainda com limite de fila
+        future: Future = Future()
+
+        def run():
+            try:
+                future.set_result(fn(*args))
+            except BaseException as exc:
+                future.set_exception(exc)
+
+        threading.Thread(target=run, daemon=True).start()
+    else:
+        try:
+            future = pool.submit(fn, *args)
+        except BaseException:
+            _release()
+            raise
+    future.add_done_callback(_release)
+    return future
+
+# =============================
+# API
+# =============================
+
+async def verify_and_update(password: str, hashed: str) -> tuple[bool, str | None]:
+    """Verifica a senha e devolve um novo hash quando o custo do atual está desatualizado."""
+    return await asyncio.wrap_future(_submit(_verify_and_update, password, hashed))
+
+
+async def hash_password(password: str) -> str:
+    return await asyncio.wrap_future(_submit(_hash, password))
+
+
+def hash_password_blocking(password: str) -> str:
+    # Para rotas síncronas: bloqueia só a thread do request, o bcrypt roda no pool
+    return _submit(_hash, password).result()
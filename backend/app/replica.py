@@ -0,0 +1,236 @@
+from __future__ import annotations
+import hashlib
+import hmac
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .auth import SECRET_KEY, _principal_from_token, _principal_from_token_async, _user_id_from_token, oauth2_scheme
+from .db import new_async_read_session, new_async_session, new_read_session, new_session
+from .settings import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+# =============================
+# ESCRITAS RECENTES (READ-YOUR-WRITES)
+# =============================
+# Depois de um POST/PUT/DELETE bem-sucedido, os GETs do mesmo usuário vão ao
+# primário por READ_YOUR_WRITES_SECONDS, tempo para a réplica alcançar a escrita.
+# A marca vale em dois lugares: no processo que atendeu a escrita (RecentWrites,
+# como os caches de principal e de respostas) e no cliente, que recebe o header
+# X-Read-Your-Writes assinado e o reenvia — com vários workers, o GET seguinte
+# pode cair em outro processo, que só enxerga a marca pelo header.
+
+class RecentWrites:
+    def __init__(self, window_seconds: float, max_entries: int = 10_000):
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self._until: OrderedDict[int, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def mark(self, user_id: int) -> None:
+        with self._lock:
+            self._until[user_id] = time.monotonic() + self.window_seconds
+            self._until.move_to_end(user_id)
+            while len(self._until) > self.max_entries:
+                self._until.popitem(last=False)
+
+    def recent(self, user_id: int) -> bool:
+        with self._lock:
+            until = self._until.get(user_id)
+            if until is None:
+                return False
+            if until < time.monotonic():
+                del self._until[user_id]
+                return False
+            return True
+
+
+recent_writes = RecentWrites(settings.READ_YOUR_WRITES_SECONDS)
+
+HEADER_ESCRITA = "X-Read-Your-Writes"
+
+
+def _assinatura(user_id: int, ate: int) -> str:
+    return hmac.new(SECRET_KEY.encode(), f"{user_id}.{ate}".encode(), hashlib.sha256).hexdigest()
+
+
+def assinar_escrita(user_id: int) -> str:
+    """Marca `user_id.ate.assinatura` (relógio de parede: vale em qualquer worker)."""
+    ate = int(time.time() + settings.READ_YOUR_WRITES_SECONDS) + 1
+    return f"{user_id}.{ate}.{_assinatura(user_id, ate)}"
+
+
+def escrita_assinada_recente(marca: str | None, user_id: int) -> bool:
+    """A marca do header é deste usuário, foi assinada aqui e ainda não venceu."""
+    if not marca:
+        return False
+    try:
+        dono, ate, assinatura = marca.split(".")
+        dono, ate = int(dono), int(ate)
+    except ValueError:
+        return False
+    return (
+        dono == user_id
+        and ate >= time.time()
+        and hmac.compare_digest(assinatura, _assinatura(dono, ate))
+    )
+
+_METODOS_LEITURA = {"GET", "HEAD", "OPTIONS"}
+
+
+class ReadYourWritesMiddleware:
+    """Marca o usuário quando uma escrita começa a ser respondida com sucesso (já commitada).
+
+    A marca sai no http.response.start, antes de o cliente receber o status: uma
+    leitura disparada assim que ele chega (mesmo com o corpo ainda em streaming)
+    já vai para o primário. A mesma mensagem leva o header assinado ao cliente.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in _METODOS_LEITURA:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_marcando(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                user_id = _user_id_do_header(scope)
+                if user_id is not None:
+                    recent_writes.mark(user_id)
+                    message = {
+                        **message,
+                        "headers": [
+                            *message.get("headers", []),
+                            (HEADER_ESCRITA.lower().encode(), assinar_escrita(user_id).encode()),
+                        ],
+                    }
+            await send(message)
+
+        await self.app(scope, receive, send_marcando)
+
+
+def _user_id_do_header(scope) -> int | None:
+    for nome, valor in scope.get("headers", []):
+        if nome == b"authorization":
+            esquema, _, token = valor.decode("latin-1").partition(" ")
+            if esquema.lower() != "bearer" or not token:
+                return None
+            try:
+                return _user_id_from_token(token)
+            except HTTPException:
+                return None
+    return None
+
+# =============================
+# SAÚDE DA RÉPLICA
+# =============================
+
+class ReplicaHealth:
+    """Depois de uma falha, a réplica fica fora por REPLICA_RETRY_SECONDS."""
+
+    def __init__(self, retry_seconds: float):
+        self.retry_seconds = retry_seconds
+        self._down_until = 0.0
+        self.failures = 0
+
+    def available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def failed(self, erro: Exception) -> None:
+        if self.available():
+            logger.warning("Réplica de leitura indisponível, usando o primário: %s", erro)
+        self._down_until = time.monotonic() + self.retry_seconds
+        self.failures += 1
+
+
+replica_health = ReplicaHealth(settings.REPLICA_RETRY_SECONDS)
+
+
+def _usar_replica(user_id: int, marca: str | None = None) -> bool:
+    return (
+        bool(settings.DATABASE_READ_URL)
+        and replica_health.available()
+        and not recent_writes.recent(user_id)
+        and not escrita_assinada_recente(marca, user_id)
+    )
+
+# =============================
+# DEPENDÊNCIAS DE LEITURA
+# =============================
+# Para GETs: réplica quando configurada e saudável, senão o primário. O checkout
+# da conexão (com pre-ping) acontece aqui, para a queda da réplica virar fallback
+# em vez de erro no meio da rota. `marca` é o header X-Read-Your-Writes do request.
+
+def _abrir_leitura(user_id: int, marca: str | None = None) -> tuple[Session, bool]:
+    if _usar_replica(user_id, marca):
+        db = new_read_session()
+        try:
+            db.connection()
+            return db, True
+        except DBAPIError as erro:
+            db.close()
+            replica_health.failed(erro)
+    return new_session(), False
+
+
+def open_read_session(user_id: int, marca: str | None = None) -> Session:
+    """Sessão de leitura fora de dependências (ex.: streaming da exportação)."""
+    return _abrir_leitura(user_id, marca)[0]
+
+
+def get_read_db(request: Request, token: str = Depends(oauth2_scheme)):
+    """Sessão de leitura da rota, com o principal resolvido nela mesma.
+
+    Cache ou uma leitura de users na sessão de leitura: um GET sem principal em
+    cache usa uma conexão do pool, não uma no primário para o lookup e outra para
+    a rota. As rotas declaram `db` antes de `current_user`, que então sai do cache.
+    """
+    db, replica = _abrir_leitura(_user_id_from_token(token), request.headers.get(HEADER_ESCRITA))
+    try:
+        _principal_from_token(token, db, liberar=False)
+        yield db
+    except DBAPIError as erro:
+        if replica:
+            replica_health.failed(erro)
+        raise
+    finally:
+        db.close()
+
+
+async def _abrir_leitura_async(user_id: int, marca: str | None = None) -> tuple[AsyncSession, bool]:
+    if _usar_replica(user_id, marca):
+        db = new_async_read_session()
+        try:
+            await db.connection()
+            return db, True
+        except DBAPIError as erro:
+            await db.close()
+            replica_health.failed(erro)
+    return new_async_session(), False
+
+
+async def open_async_read_session(user_id: int, marca: str | None = None) -> AsyncSession:
+    """Sessão de leitura extra (ex.: seções do bootstrap consultadas em paralelo)."""
+    return (await _abrir_leitura_async(user_id, marca))[0]
+
+
+async def get_async_read_db(request: Request, token: str = Depends(oauth2_scheme)):
+    db, replica = await _abrir_leitura_async(_user_id_from_token(token), request.headers.get(HEADER_ESCRITA))
+    try:
+        await _principal_from_token_async(token, db, liberar=False)
+        yield db
+    except DBAPIError as erro:
+        if replica:
+            replica_health.failed(erro)
+        raise
+    finally:
+        await db.close()
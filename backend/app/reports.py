@@ -0,0 +1,163 @@
+from __future__ import annotations
+import base64
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import Select, and_, case, func, or_, select
+
+from .models import AbastecimentoRollup, User
+from .rollups import periodo_de
+from .settings import settings
+from .utils import quinzena_range
+
+# =============================
+# RELATÓRIOS DA FROTA (ADMIN)
+# =============================
+# Tudo sai de abastecimentos_rollup (mantida a cada escrita), filtrada pelo
+# índice (periodo, user_id): o custo depende de motoristas x quinzenas do
+# intervalo, não do tamanho do histórico. O intervalo é arredondado para quinzenas.
+
+ORDENS = ("total_valor", "total_litros", "quantidade")
+
+
+def encode_report_cursor(chave: Decimal | float | int, user_id: int) -> str:
+    raw = f"{chave}|{user_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_report_cursor(cursor: str) -> tuple[Decimal, int]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    chave, user_id = base64.urlsafe_b64decode(padded).decode().split("|", 1)
+    return Decimal(chave), int(user_id)
+
+
+def intervalo_periodos(inicio: date | None, fim: date | None, hoje: datetime) -> tuple[date, date]:
+    """Primeira e última quinzena (inclusive); padrão: mês corrente."""
+    if inicio is None:
+        inicio = hoje.date().replace(day=1)
+    if fim is None:
+        fim = hoje.date()
+    return (
+        periodo_de(datetime(inicio.year, inicio.month, inicio.day)),
+        periodo_de(datetime(fim.year, fim.month, fim.day)),
+    )
+
+
+def _pagina(agg, chave, limit: int, cursor: tuple[Decimal, int] | None) -> Select:
+    stmt = select(agg, User.nome, User.email).join(User, User.id == agg.c.user_id)
+    if cursor is not None:
+        valor, user_id = cursor
+        stmt = stmt.where(or_(chave < valor, and_(chave == valor, agg.c.user_id > user_id)))
+    return stmt.order_by(chave.desc(), agg.c.user_id).limit(limit + 1)
+
+
+def motoristas_stmt(
+    primeiro: date,
+    ultimo: date,
+    ordem: str = "total_valor",
+    limit: int = 50,
+    cursor: tuple[Decimal, int] | None = None
+) -> Select:
+    """Gasto, litros e lançamentos por motorista; ordem desc = maiores consumidores."""
+    R = AbastecimentoRollup
+    agg = select(
+        R.user_id,
+        func.sum(R.total_valor).label("total_valor"),
+        func.sum(R.total_litros).label("total_litros"),
+        func.sum(R.quantidade).label("quantidade"),
+        func.sum(case((R.posto == "IPIRANGA", R.total_valor), else_=0)).label("ipiranga_valor"),
+    ).where(
+        R.periodo >= primeiro,
+        R.periodo <= ultimo
+    ).group_by(R.user_id).having(func.sum(R.quantidade) > 0).subquery()
+    return _pagina(agg, agg.c[ordem], limit, cursor)
+
+
+def motoristas_from_rows(rows) -> list[dict]:
+    return [
+        {
+            "user_id": r.user_id,
+            "nome": r.nome,
+            "email": r.email,
+            "total_valor": round(float(r.total_valor), 2),
+            "total_litros": round(float(r.total_litros), 3),
+            "quantidade": int(r.quantidade),
+            "ipiranga_valor": round(float(r.ipiranga_valor), 2),
+            "outro_valor": round(float(r.total_valor) - float(r.ipiranga_valor), 2),
+        }
+        for r in rows
+    ]
+
+
+def ipiranga_stmt(periodo: date, limit: int = 50, cursor: tuple[Decimal, int] | None = None) -> Select:
+    """Uso do limite Ipiranga por motorista numa quinzena (maior uso primeiro)."""
+    R = AbastecimentoRollup
+    agg = select(
+        R.user_id,
+        func.sum(R.total_valor).label("gasto"),
+    ).where(
+        R.periodo == periodo,
+        R.posto == "IPIRANGA"
+    ).group_by(R.user_id).having(func.sum(R.quantidade) > 0).subquery()
+    return _pagina(agg, agg.c.gasto, limit, cursor)
+
+
+def ipiranga_from_rows(rows) -> list[dict]:
+    limite = float(settings.IPIRANGA_LIMIT_PER_QUINZENA)
+    saida = []
+    for r in rows:
+        gasto = float(r.gasto)
+        saida.append({
+            "user_id": r.user_id,
+            "nome": r.nome,
+            "email": r.email,
+            "gasto": round(gasto, 2),
+            "limite": limite,
+            "saldo": round(limite - gasto, 2),
+            "percentual_usado": round(gasto / limite * 100, 1) if limite else 0.0,
+            "excedido": gasto > limite,
+        })
+    return saida
+
+
+def postos_stmt(primeiro: date, ultimo: date) -> Select:
+    R = AbastecimentoRollup
+    return select(
+        R.periodo,
+        R.posto,
+        func.sum(R.total_valor).label("total_valor"),
+        func.sum(R.total_litros).label("total_litros"),
+        func.sum(R.quantidade).label("quantidade"),
+        func.count(func.distinct(R.user_id)).label("motoristas"),
+    ).where(
+        R.periodo >= primeiro,
+        R.periodo <= ultimo,
+        R.quantidade > 0
+    ).group_by(R.periodo, R.posto).order_by(R.periodo, R.posto)
+
+
+def postos_from_rows(rows) -> dict:
+    totais: dict[str, dict] = {}
+    quinzenas = []
+    for r in rows:
+        _, _, label = quinzena_range(datetime(r.periodo.year, r.periodo.month, r.periodo.day))
+        quinzenas.append({
+            "quinzena": label,
+            "posto": r.posto,
+            "total_valor": round(float(r.total_valor), 2),
+            "total_litros": round(float(r.total_litros), 3),
+            "quantidade": int(r.quantidade),
+            "motoristas": int(r.motoristas),
+        })
+        acc = totais.setdefault(r.posto, {"posto": r.posto, "total_valor": 0.0, "total_litros": 0.0, "quantidade": 0})
+        acc["total_valor"] += float(r.total_valor)
+        acc["total_litros"] += float(r.total_litros)
+        acc["quantidade"] += int(r.quantidade)
+
+    for acc in totais.values():
+        acc["total_valor"] = round(acc["total_valor"], 2)
+        acc["total_litros"] = round(acc["total_litros"], 3)
+        acc["preco_medio_litro"] = (
+            round(acc["total_valor"] / acc["total_litros"], 3) if acc["total_litros"] else None
+        )
+    return {"postos": sorted(totais.values(), key=lambda p: p["posto"]), "por_quinzena": quinzenas}
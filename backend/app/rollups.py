@@ -0,0 +1,157 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Callable
+
+from sqlalchemy import delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .models import Abastecimento, AbastecimentoRollup
+from .utils import quinzena_range
+
+# =============================
+# PERÍODO (QUINZENA)
+# =============================
+
+def periodo_de(dt: datetime) -> date:
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    inicio, _, _ = quinzena_range(dt)
+    return inicio.date()
+
+# =============================
+# UPSERT INCREMENTAL
+# =============================
+
+def upsert_delta_stmt(
+    dialect: str,
+    user_id: int,
+    periodo: date,
+    posto: str,
+    valor: Decimal,
+    litros: Decimal,
+    quantidade: int
+):
+    insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+    stmt = insert(AbastecimentoRollup).values(
+        user_id=user_id,
+        periodo=periodo,
+        posto=posto,
+        total_valor=valor,
+        total_litros=litros,
+        quantidade=quantidade,
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[
+            AbastecimentoRollup.user_id,
+            AbastecimentoRollup.periodo,
+            AbastecimentoRollup.posto,
+        ],
+        set_={
+            "total_valor": AbastecimentoRollup.total_valor + stmt.excluded.total_valor,
+            "total_litros": AbastecimentoRollup.total_litros + stmt.excluded.total_litros,
+            "quantidade": AbastecimentoRollup.quantidade + stmt.excluded.quantidade,
+        },
+    )
+
+
+def abastecimento_delta_stmt(dialect: str, ab: Abastecimento, sinal: int):
+    """Upsert que soma (sinal=1) ou subtrai (sinal=-1) um lançamento do rollup."""
+    return upsert_delta_stmt(
+        dialect,
+        user_id=ab.user_id,
+        periodo=periodo_de(ab.data_hora),
+        posto=ab.posto,
+        valor=Decimal(str(ab.valor)) * sinal,
+        litros=Decimal(str(ab.litros)) * sinal,
+        quantidade=sinal,
+    )
+
+
+def apply_abastecimento(db: Session, ab: Abastecimento, sinal: int) -> None:
+    # Sem commit: roda na transação da escrita
+    db.execute(abastecimento_delta_stmt(db.get_bind().dialect.name, ab, sinal))
+
+# =============================
+# REBUILD COMPLETO
+# =============================
+
+def rebuild_rollups(
+    db: Session,
+    user_id: int | None = None,
+    batch_size: int = 5000,
+    shard: tuple[int, int] | None = None,
+    desde: date | None = None
+) -> int:
+    """Recalcula os rollups a partir de abastecimentos (todos, um usuário ou um shard).
+
+    shard=(i, n) limita aos usuários com user_id % n == i. Com `desde` (início de
+    quinzena), só os períodos a partir dele: os anteriores foram arquivados e
+    não estão mais em abastecimentos.
+    """
+    limpar = delete(AbastecimentoRollup)
+    query = db.query(
+        Abastecimento.user_id,
+        Abastecimento.data_hora,
+        Abastecimento.posto,
+        Abastecimento.valor,
+        Abastecimento.litros,
+    )
+    if user_id is not None:
+        limpar = limpar.where(AbastecimentoRollup.user_id == user_id)
+        query = query.filter(Abastecimento.user_id == user_id)
+    if shard is not None:
+        indice, total = shard
+        limpar = limpar.where(AbastecimentoRollup.user_id % total == indice)
+        query = query.filter(Abastecimento.user_id % total == indice)
+    if desde is not None:
+        limpar = limpar.where(AbastecimentoRollup.periodo >= desde)
+        query = query.filter(
+            Abastecimento.data_hora >= datetime(desde.year, desde.month, desde.day, tzinfo=timezone.utc)
+        )
+
+    totais: dict[tuple[int, date, str], list] = {}
+    for uid, data_hora, posto, valor, litros in query.yield_per(batch_size):
+        chave = (uid, periodo_de(data_hora), posto)
+        acc = totais.setdefault(chave, [Decimal("0"), Decimal("0"), 0])
+        acc[0] += Decimal(str(valor))
+        acc[1] += Decimal(str(litros))
+        acc[2] += 1
+
+    db.execute(limpar)
+    db.add_all([
+        AbastecimentoRollup(
+            user_id=uid,
+            periodo=periodo,
+            posto=posto,
+            total_valor=valor,
+            total_litros=litros,
+            quantidade=quantidade,
+        )
+        for (uid, periodo, posto), (valor, litros, quantidade) in totais.items()
+    ])
+    db.commit()
+    return len(totais)
+
+
+def rebuild_rollups_paralelo(
+    session_factory: Callable[[], Session],
+    workers: int,
+    desde: date | None = None
+) -> int:
+    """Rebuild completo dividido em `workers` shards de usuários, cada um na sua conexão.
+
+    Cada shard apaga e regrava só os seus usuários numa transação própria; a
+    leitura de abastecimentos e o commit de um shard não esperam os outros.
+    """
+    def rodar(indice: int) -> int:
+        db = session_factory()
+        try:
+            return rebuild_rollups(db, shard=(indice, workers), desde=desde)
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rollup-shard") as pool:
+        return sum(pool.map(rodar, range(workers)))
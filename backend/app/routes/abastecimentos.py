@@ -1,12 +1,30 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime
-from dateutil.relativedelta import relativedelta
+from datetime import datetime, timezone
 
 from ..db import get_db
-from ..models import Abastecimento
+from ..replica import HEADER_ESCRITA, get_read_db, open_read_session
+from ..models import Abastecimento, Veiculo
+from ..schemas import AbastecimentoCreate, AbastecimentoUpdate, AbastecimentoOut, SyncRequest, SyncResponse
 from ..auth import get_current_user
+from ..aggregates import monthly_series, period_totals, vehicle_series
+from ..events import publicar_escrita
+from ..rollups import apply_abastecimento
+from ..importer import importar
+from ..sync import aplicar_lote
+from ..versions import bump_data_version, conditional_json
+from ..exporter import export_stmt, stream_export
+from ..listing import (
+    FiltrosLista,
+    abastecimento_to_out,
+    decode_cursor,
+    encode_cursor,
+    filtros_lista,
+    list_stmt,
+    row_to_out,
+)
 
 router = APIRouter()
 
@@ -16,26 +34,18 @@ router = APIRouter()
 
 @router.get("/summary")
 def get_summary(
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_user)
 ):
-    hoje = datetime.now()
-    inicio_mes = hoje.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-    total_mes = db.query(func.sum(Abastecimento.valor)).filter(
-        Abastecimento.user_id == current_user.id,
-        Abastecimento.data_hora >= inicio_mes
-    ).scalar() or 0
+    def build():
+        totais = period_totals(db, current_user.id, datetime.now(timezone.utc))
+        return {
+            "total_mes": totais["total_mes"],
+            "litros_mes": totais["litros_mes"]
+        }
 
-    litros_mes = db.query(func.sum(Abastecimento.litros)).filter(
-        Abastecimento.user_id == current_user.id,
-        Abastecimento.data_hora >= inicio_mes
-    ).scalar() or 0
-
-    return {
-        "total_mes": float(total_mes),
-        "litros_mes": float(litros_mes)
-    }
+    return conditional_json(request, db, current_user.id, "abastecimentos.summary", build)
 
 # =============================
 # GRÁFICOS
@@ -43,70 +53,225 @@ def get_summary(
 
 @router.get("/charts")
 def get_charts(
+    request: Request,
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    def build():
+        # Gastos e litros dos últimos 6 meses numa única query agrupada
+        serie = monthly_series(db, current_user.id, datetime.now(timezone.utc), meses=6)
+
+        gastos_mensais = [{"mes": m["mes"], "valor": m["valor"]} for m in serie]
+        litros_mensais = [{"mes": m["mes"], "litros": m["litros"]} for m in serie]
+
+        # gastos_por_veiculo (todo o histórico) e consumo_por_veiculo_6m
+        por_veiculo = vehicle_series(db, current_user.id, datetime.now(timezone.utc), meses=6)
+
+        return {
+            "gastos_mensais": gastos_mensais,
+            "litros_mensais": litros_mensais,
+            **por_veiculo
+        }
+
+    # 304 / cache por versão dos dados antes de qualquer agregação
+    return conditional_json(request, db, current_user.id, "abastecimentos.charts", build, comprimir=True)
+
+# =============================
+# LISTAGEM (cursor / keyset)
+# =============================
+# O próximo cursor vai no header X-Next-Cursor; o corpo continua sendo a lista.
+# Filtros (posto, inicio/fim, valor_min/valor_max, veiculo_id, q) combinam com o cursor.
+
+@router.get("", response_model=list[AbastecimentoOut])
+def list_abastecimentos(
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    cursor: str | None = None,
+    filtros: FiltrosLista = Depends(filtros_lista),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    posicao = None
+    if cursor:
+        try:
+            posicao = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    rows = db.execute(list_stmt(current_user.id, limit, order, posicao, filtros)).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        ultimo = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(ultimo.data_hora, ultimo.id)
+
+    return [row_to_out(r) for r in rows]
+
+# =============================
+# CRIAR / ATUALIZAR / EXCLUIR
+# =============================
+# Cada escrita ajusta abastecimentos_rollup na mesma transação.
+
+def _get_owned(db: Session, abastecimento_id: int, user_id: int) -> Abastecimento:
+    ab = db.query(Abastecimento).filter(
+        Abastecimento.id == abastecimento_id,
+        Abastecimento.user_id == user_id
+    ).first()
+    if ab is None:
+        raise HTTPException(status_code=404, detail="Lançamento não encontrado")
+    return ab
+
+
+def _checar_veiculos(db: Session, user_id: int, veiculo_ids: set[int]) -> None:
+    # Só veículos do próprio usuário (odômetro e km/l são acompanhados por veículo)
+    veiculo_ids = {v for v in veiculo_ids if v is not None}
+    if not veiculo_ids:
+        return
+    encontrados = set(db.execute(
+        select(Veiculo.id).where(Veiculo.user_id == user_id, Veiculo.id.in_(veiculo_ids))
+    ).scalars())
+    if encontrados != veiculo_ids:
+        raise HTTPException(status_code=400, detail="Veículo não encontrado")
+
+
+@router.post("", response_model=AbastecimentoOut, status_code=status.HTTP_201_CREATED)
+def create_abastecimento(
+    payload: AbastecimentoCreate,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    _checar_veiculos(db, current_user.id, {payload.veiculo_id})
+    dados = payload.model_dump()
+    if dados["data_hora"] is None:
+        dados["data_hora"] = datetime.now(timezone.utc)
+
+    ab = Abastecimento(user_id=current_user.id, **dados)
+    db.add(ab)
+    db.flush()
+    apply_abastecimento(db, ab, 1)
+    bump_data_version(db, current_user.id)
+    publicar_escrita(db, current_user.id, "criado", ab.id)
+    db.commit()
+    db.refresh(ab)
+    return abastecimento_to_out(ab)
+
+
+@router.put("/{abastecimento_id}", response_model=AbastecimentoOut)
+def update_abastecimento(
+    abastecimento_id: int,
+    payload: AbastecimentoUpdate,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    hoje = datetime.now()
-
-    # -----------------------------
-    # 1️⃣ Gastos últimos 6 meses
-    # -----------------------------
-    gastos_mensais = []
-
-    for i in range(5, -1, -1):
-        inicio = (hoje - relativedelta(months=i)).replace(day=1)
-        fim = inicio + relativedelta(months=1)
-
-        total = db.query(func.sum(Abastecimento.valor)).filter(
-            Abastecimento.user_id == current_user.id,
-            Abastecimento.data_hora >= inicio,
-            Abastecimento.data_hora < fim
-        ).scalar() or 0
-
-        gastos_mensais.append({
-            "mes": inicio.strftime("%m/%Y"),
-            "valor": float(total)
-        })
-
-    # -----------------------------
-    # 2️⃣ Litros últimos 6 meses
-    # -----------------------------
-    litros_mensais = []
-
-    for i in range(5, -1, -1):
-        inicio = (hoje - relativedelta(months=i)).replace(day=1)
-        fim = inicio + relativedelta(months=1)
-
-        litros = db.query(func.sum(Abastecimento.litros)).filter(
-            Abastecimento.user_id == current_user.id,
-            Abastecimento.data_hora >= inicio,
-            Abastecimento.data_hora < fim
-        ).scalar() or 0
-
-        litros_mensais.append({
-            "mes": inicio.strftime("%m/%Y"),
-            "litros": float(litros)
-        })
-
-    # -----------------------------
-    # 3️⃣ Gastos por veículo
-    # -----------------------------
-    por_veiculo = db.query(
-        Abastecimento.veiculo,
-        func.sum(Abastecimento.valor)
-    ).filter(
-        Abastecimento.user_id == current_user.id
-    ).group_by(
-        Abastecimento.veiculo
-    ).all()
-
-    gastos_por_veiculo = [
-        {"veiculo": v, "valor": float(total)}
-        for v, total in por_veiculo
-    ]
-
-    return {
-        "gastos_mensais": gastos_mensais,
-        "litros_mensais": litros_mensais,
-        "gastos_por_veiculo": gastos_por_veiculo
-    }
+    _checar_veiculos(db, current_user.id, {payload.veiculo_id})
+    ab = _get_owned(db, abastecimento_id, current_user.id)
+
+    apply_abastecimento(db, ab, -1)
+    for campo, valor in payload.model_dump(exclude_unset=True).items():
+        if valor is None and campo not in ("observacao", "veiculo_id"):
+            continue
+        setattr(ab, campo, valor)
+    db.flush()
+    apply_abastecimento(db, ab, 1)
+    bump_data_version(db, current_user.id)
+    publicar_escrita(db, current_user.id, "atualizado", ab.id)
+    db.commit()
+    db.refresh(ab)
+    return abastecimento_to_out(ab)
+
+
+@router.delete("/{abastecimento_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_abastecimento(
+    abastecimento_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    ab = _get_owned(db, abastecimento_id, current_user.id)
+
+    apply_abastecimento(db, ab, -1)
+    bump_data_version(db, current_user.id)
+    publicar_escrita(db, current_user.id, "excluido", ab.id)
+    db.delete(ab)
+    db.commit()
+
+# =============================
+# SINCRONIZAÇÃO OFFLINE (LOTE)
+# =============================
+# A fila do PWA sobe num único request; o último km volta junto (sem GET extra).
+
+@router.post("/sync", response_model=SyncResponse)
+def sync_abastecimentos(
+    payload: SyncRequest,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    _checar_veiculos(db, current_user.id, {
+        op.dados.veiculo_id for op in payload.operacoes if op.op != "delete"
+    })
+    return aplicar_lote(db, current_user.id, payload.operacoes)
+
+# =============================
+# IMPORTAÇÃO EM MASSA (CSV / NDJSON)
+# =============================
+
+def _formato_upload(arquivo: UploadFile, formato: str | None) -> str:
+    if formato:
+        return formato
+    nome = (arquivo.filename or "").lower()
+    tipo = (arquivo.content_type or "").lower()
+    if nome.endswith((".ndjson", ".jsonl")) or "ndjson" in tipo or "jsonl" in tipo:
+        return "ndjson"
+    if nome.endswith(".csv") or "csv" in tipo:
+        return "csv"
+    raise HTTPException(status_code=400, detail="Informe formato=csv ou formato=ndjson")
+
+
+@router.post("/import")
+def import_abastecimentos(
+    arquivo: UploadFile = File(...),
+    formato: str | None = Query(None, pattern="^(csv|ndjson)$"),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    # Colunas: data_hora, posto, valor, litros, km_odometro, observacao
+    return importar(db, current_user.id, arquivo.file, _formato_upload(arquivo, formato))
+
+# =============================
+# EXPORTAÇÃO EM STREAMING (CSV / NDJSON)
+# =============================
+
+_EXPORT_MEDIA = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+@router.get("/export")
+def export_abastecimentos(
+    request: Request,
+    formato: str = Query("csv", pattern="^(csv|ndjson)$"),
+    inicio: datetime | None = None,
+    fim: datetime | None = None,
+    posto: str | None = Query(None, pattern="^(IPIRANGA|OUTRO)$"),
+    user_id: int | None = None,
+    frota: bool = False,
+    current_user = Depends(get_current_user)
+):
+    # user_id de outro motorista ou frota inteira: apenas admin
+    alvo = current_user.id
+    if frota or (user_id is not None and user_id != current_user.id):
+        if not current_user.is_admin:
+            raise HTTPException(status_code=403, detail="Acesso negado")
+        alvo = None if frota else user_id
+
+    nome = f"abastecimentos_{'frota' if alvo is None else alvo}.{formato}"
+    return StreamingResponse(
+        stream_export(
+            export_stmt(alvo, inicio, fim, posto),
+            formato,
+            lambda: open_read_session(current_user.id, request.headers.get(HEADER_ESCRITA))
+        ),
+        media_type=_EXPORT_MEDIA[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nome}"'},
+    )
@@ -1,8 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date, datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from ..db import get_db
+from ..replica import get_read_db
 from ..models import User
-from ..auth import get_current_user, get_password_hash
+from ..auth import Principal, get_current_user, invalidate_principal, principal_cache
+from ..passwords import hash_password_blocking
+from ..reports import (
+    ORDENS,
+    decode_report_cursor,
+    encode_report_cursor,
+    intervalo_periodos,
+    ipiranga_from_rows,
+    ipiranga_stmt,
+    motoristas_from_rows,
+    motoristas_stmt,
+    postos_from_rows,
+    postos_stmt,
+)
+from ..rollups import periodo_de
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -12,7 +29,7 @@ def create_admin(
     email: str,
     password: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Acesso negado")
@@ -23,10 +40,102 @@ def create_admin(
     admin = User(
         nome=nome,
         email=email,
-        password=get_password_hash(password),
+        password=hash_password_blocking(password),
         is_admin=True
     )
 
     db.add(admin)
     db.commit()
     return {"message": "Admin criado com sucesso"}
+
+# =============================
+# CACHE DE PRINCIPAIS
+# =============================
+
+@router.get("/principal-cache")
+def principal_cache_stats(current_user: Principal = Depends(get_current_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    return principal_cache.stats()
+
+
+@router.delete("/principal-cache")
+def principal_cache_invalidate(
+    user_id: int | None = None,
+    current_user: Principal = Depends(get_current_user)
+):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    return {"removidos": invalidate_principal(user_id)}
+
+# =============================
+# RELATÓRIOS DA FROTA
+# =============================
+# Lidos de abastecimentos_rollup; listas paginadas por cursor (header X-Next-Cursor).
+
+def _cursor_relatorio(cursor: str | None):
+    if not cursor:
+        return None
+    try:
+        return decode_report_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+@router.get("/relatorios/motoristas")
+def relatorio_motoristas(
+    response: Response,
+    inicio: date | None = None,
+    fim: date | None = None,
+    ordem: str = Query("total_valor", pattern=f"^({'|'.join(ORDENS)})$"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = None,
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Gasto/litros por motorista no intervalo; `ordem=total_litros&limit=10` = top consumidores."""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Acesso negado")
+
+    primeiro, ultimo = intervalo_periodos(inicio, fim, datetime.now(timezone.utc))
+    rows = db.execute(motoristas_stmt(primeiro, ultimo, ordem, limit, _cursor_relatorio(cursor))).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_report_cursor(getattr(rows[-1], ordem), rows[-1].user_id)
+    return motoristas_from_rows(rows)
+
+
+@router.get("/relatorios/ipiranga")
+def relatorio_ipiranga(
+    response: Response,
+    quinzena: date | None = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = None,
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Uso do limite Ipiranga por motorista na quinzena que contém `quinzena` (padrão: atual)."""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Acesso negado")
+
+    dia = quinzena or datetime.now(timezone.utc).date()
+    periodo = periodo_de(datetime(dia.year, dia.month, dia.day))
+    rows = db.execute(ipiranga_stmt(periodo, limit, _cursor_relatorio(cursor))).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_report_cursor(rows[-1].gasto, rows[-1].user_id)
+    return ipiranga_from_rows(rows)
+
+
+@router.get("/relatorios/postos")
+def relatorio_postos(
+    inicio: date | None = None,
+    fim: date | None = None,
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Acesso negado")
+
+    primeiro, ultimo = intervalo_periodos(inicio, fim, datetime.now(timezone.utc))
+    return postos_from_rows(db.execute(postos_stmt(primeiro, ultimo)).all())
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session
+
+from ..replica import get_read_db
+from ..auth import get_current_user
+from ..analytics import analisar, carregar_serie
+from ..versions import conditional_json
+
+router = APIRouter()
+
+# =============================
+# CONSUMO (km/l, médias móveis e anomalias)
+# =============================
+# Histórico completo carregado em arrays NumPy; o resultado fica no cache de
+# respostas por versão dos dados (só recalcula depois de uma escrita).
+
+@router.get("/consumo")
+def get_consumo(
+    request: Request,
+    user_id: int | None = None,
+    veiculo_id: int | None = None,
+    janela: int = Query(5, ge=2, le=50),
+    capacidade_tanque: float | None = Query(None, gt=0),
+    z_limite: float = Query(3.5, gt=0),
+    pontos: int = Query(120, ge=0, le=5000),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    # Outro motorista: apenas admin (gestor da frota)
+    alvo = current_user.id
+    if user_id is not None and user_id != current_user.id:
+        if not current_user.is_admin:
+            raise HTTPException(status_code=403, detail="Acesso negado")
+        alvo = user_id
+
+    def build():
+        serie = carregar_serie(db, alvo, veiculo_id)
+        return analisar(serie, janela, capacidade_tanque, z_limite, pontos)
+
+    endpoint = f"analytics.consumo:{veiculo_id}:{janela}:{capacidade_tanque}:{z_limite}:{pontos}"
+    return conditional_json(request, db, alvo, endpoint, build, comprimir=True)
@@ -1,27 +1,50 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 from datetime import timedelta
 
 from ..db import get_db
 from ..models import User
-from ..auth import verify_password, create_access_token
+from ..auth import create_access_token
+from ..passwords import verify_and_update
 
 router = APIRouter()
 
 @router.post("/login", summary="Login do usuário")
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
-    user = db.query(User).filter(User.email == form_data.username).first()
+    user = await run_in_threadpool(
+        lambda: db.execute(
+            select(User.id, User.password).where(User.email == form_data.username)
+        ).first()
+    )
+    # Devolve a conexão ao pool antes do bcrypt: numa rajada de logins a fila
+    # (PASSWORD_MAX_PENDING) responde 503 em vez de esgotar o pool do banco
+    await run_in_threadpool(db.rollback)
+
+    # bcrypt roda no pool de processos; 503 se a fila estiver cheia
+    ok, novo_hash = (False, None)
+    if user:
+        ok, novo_hash = await verify_and_update(form_data.password, user.password)
 
-    if not user or not verify_password(form_data.password, user.password):
+    if not ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciais inválidas"
         )
 
+    # Rehash transparente para o custo configurado em BCRYPT_ROUNDS
+    if novo_hash:
+        def regravar():
+            db.execute(update(User).where(User.id == user.id).values(password=novo_hash))
+            db.commit()
+
+        await run_in_threadpool(regravar)
+
     access_token = create_access_token(
         data={"sub": str(user.id)},
         expires_delta=timedelta(hours=8)
@@ -1,54 +1,142 @@
-from fastapi import APIRouter, Depends
+import asyncio
+import json
+import logging
+import re
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime
-from ..db import get_db
-from ..models import Abastecimento
-from ..auth import get_current_user
+from datetime import datetime, timezone
+from ..db import new_session
+from ..replica import get_read_db
+from ..auth import Principal, _principal_from_token, get_current_user
+from ..events import broker
+from ..settings import settings
+from ..schemas import DashboardSummary
+from ..aggregates import period_totals, quinzena_summary
+from ..bootstrap import SECOES, bootstrap_fields, cache_endpoint
+from ..listing import recent_entries_from_rows, recent_entries_stmt
+from ..versions import conditional_json
 
 router = APIRouter()
 
 @router.get("/summary")
-def get_summary(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    hoje = datetime.now()
-    inicio_mes = hoje.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    
-    # Soma total do mês via SQL (Muito rápido)
-    total_mes = db.query(func.sum(Abastecimento.valor)).filter(
-        Abastecimento.user_id == current_user.id,
-        Abastecimento.data_hora >= inicio_mes
-    ).scalar() or 0.0
-
-    # Soma de litros do mês via SQL
-    litros_mes = db.query(func.sum(Abastecimento.litros)).filter(
-        Abastecimento.user_id == current_user.id,
-        Abastecimento.data_hora >= inicio_mes
-    ).scalar() or 0.0
-
-    # Cálculo da quinzena atual
-    dia_corte = 16 if hoje.day >= 16 else 1
-    inicio_quinzena = hoje.replace(day=dia_corte, hour=0, minute=0, second=0)
-    
-    total_quinzena = db.query(func.sum(Abastecimento.valor)).filter(
-        Abastecimento.user_id == current_user.id,
-        Abastecimento.data_hora >= inicio_quinzena
-    ).scalar() or 0.0
-
-    # Retorna apenas os últimos 10 registros para o Dashboard (Evita lentidão no carregamento)
-    ultimos_registros = db.query(Abastecimento).filter(
-        Abastecimento.user_id == current_user.id
-    ).order_by(Abastecimento.data_hora.desc()).limit(10).all()
-
-    return {
-        "total_mes": float(total_mes),
-        "total_quinzena": float(total_quinzena),
-        "litros_mes": float(litros_mes),
-        "recent_entries": [
-            {
-                "id": a.id,
-                "data_hora": a.data_hora.isoformat(),
-                "valor": float(a.valor),
-                "veiculo": a.veiculo
-            } for a in ultimos_registros
-        ]
-    }
+def get_summary(request: Request, db: Session = Depends(get_read_db), current_user = Depends(get_current_user)):
+    def build():
+        # Totais do mês e da quinzena lidos de abastecimentos_rollup
+        totais = period_totals(db, current_user.id, datetime.now(timezone.utc))
+
+        # Retorna apenas os últimos 10 registros para o Dashboard (Evita lentidão no carregamento)
+        ultimos_registros = db.execute(recent_entries_stmt(current_user.id, 10)).all()
+
+        return {
+            "total_mes": totais["total_mes"],
+            "total_quinzena": totais["total_quinzena"],
+            "litros_mes": totais["litros_mes"],
+            "recent_entries": recent_entries_from_rows(ultimos_registros)
+        }
+
+    # 304 / cache por versão dos dados antes de qualquer agregação
+    return conditional_json(request, db, current_user.id, "dashboard.summary", build)
+
+
+@router.get("/quinzena", response_model=DashboardSummary)
+def get_quinzena(request: Request, db: Session = Depends(get_read_db), current_user = Depends(get_current_user)):
+    def build():
+        # Totais lidos de abastecimentos_rollup; só a quinzena corrente é lida linha a linha
+        return DashboardSummary(**quinzena_summary(db, current_user.id, datetime.now(timezone.utc)))
+
+    return conditional_json(request, db, current_user.id, "dashboard.quinzena", build)
+
+# =============================
+# BOOTSTRAP (PRIMEIRA TELA DO PWA)
+# =============================
+
+@router.get("/bootstrap")
+def get_bootstrap(
+    request: Request,
+    campos: tuple[str, ...] = Depends(bootstrap_fields),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    """Resumo, últimos lançamentos, último km e gráficos numa resposta; `fields` escolhe as seções."""
+    def build():
+        hoje = datetime.now(timezone.utc)
+        saida = {}
+        for campo in campos:
+            stmts, montar = SECOES[campo](current_user.id, hoje)
+            saida[campo] = montar(*(db.execute(stmt).all() for stmt in stmts))
+        return saida
+
+    return conditional_json(request, db, current_user.id, cache_endpoint(campos), build, comprimir=True)
+
+# =============================
+# EVENTOS AO VIVO (SSE)
+# =============================
+# Cada escrita em abastecimentos empurra os novos totais e o lançamento afetado.
+# O token vem no header Authorization (o frontend lê o stream via fetch). ?token=
+# só com EVENTS_TOKEN_QUERY (clientes EventSource, que não enviam headers) e
+# fica fora do access log. O usuário precisa existir (mesmo lookup das rotas);
+# a sessão fecha antes do stream.
+
+_token_opcional = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
+_TOKEN_NA_URL = re.compile(r"([?&]token=)[^&\s]*")
+
+
+class _OcultarTokenNaURL(logging.Filter):
+    """Troca o valor de ?token= por *** nas linhas do access log do uvicorn."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.args, tuple):
+            record.args = tuple(
+                _TOKEN_NA_URL.sub(r"\1***", a) if isinstance(a, str) else a for a in record.args
+            )
+        return True
+
+
+logging.getLogger("uvicorn.access").addFilter(_OcultarTokenNaURL())
+
+
+def _principal_sse(
+    token_header: str | None = Depends(_token_opcional),
+    token: str | None = Query(None, description="Só com EVENTS_TOKEN_QUERY (EventSource)")
+) -> Principal:
+    if not token_header and settings.EVENTS_TOKEN_QUERY:
+        token_header = token
+    if not token_header:
+        raise HTTPException(status_code=401, detail="Credenciais inválidas")
+    db = new_session()
+    try:
+        return _principal_from_token(token_header, db)
+    finally:
+        db.close()
+
+
+def _sse(evento: str, dados: dict) -> str:
+    return f"event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False, separators=(',', ':'))}\n\n"
+
+
+@router.get("/eventos")
+async def stream_eventos(current_user: Principal = Depends(_principal_sse)):
+    async def gerar():
+        assinatura = broker.assinar(current_user.id)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    evento = await asyncio.wait_for(
+                        assinatura.fila.get(), timeout=settings.EVENTS_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield _sse("dashboard", evento)
+        finally:
+            broker.cancelar(assinatura)
+
+    return StreamingResponse(
+        gerar(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
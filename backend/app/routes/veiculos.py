@@ -0,0 +1,91 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..db import get_db
+from ..replica import get_read_db
+from ..models import Abastecimento, Veiculo
+from ..schemas import VeiculoCreate, VeiculoUpdate, VeiculoOut
+from ..auth import get_current_user
+from ..versions import bump_data_version
+
+router = APIRouter()
+
+# =============================
+# VEÍCULOS DO USUÁRIO
+# =============================
+# Alterações mudam a versão dos dados: gráficos e dashboard mostram a placa.
+
+def _get_owned(db: Session, veiculo_id: int, user_id: int) -> Veiculo:
+    veiculo = db.query(Veiculo).filter(
+        Veiculo.id == veiculo_id,
+        Veiculo.user_id == user_id
+    ).first()
+    if veiculo is None:
+        raise HTTPException(status_code=404, detail="Veículo não encontrado")
+    return veiculo
+
+
+def _commit(db: Session):
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Placa já cadastrada")
+
+
+@router.get("", response_model=list[VeiculoOut])
+def list_veiculos(
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    return db.query(Veiculo).filter(Veiculo.user_id == current_user.id).order_by(Veiculo.placa).all()
+
+
+@router.post("", response_model=VeiculoOut, status_code=status.HTTP_201_CREATED)
+def create_veiculo(
+    payload: VeiculoCreate,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    dados = payload.model_dump()
+    dados["placa"] = dados["placa"].strip().upper()
+    veiculo = Veiculo(user_id=current_user.id, **dados)
+    db.add(veiculo)
+    bump_data_version(db, current_user.id)
+    _commit(db)
+    db.refresh(veiculo)
+    return veiculo
+
+
+@router.put("/{veiculo_id}", response_model=VeiculoOut)
+def update_veiculo(
+    veiculo_id: int,
+    payload: VeiculoUpdate,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    veiculo = _get_owned(db, veiculo_id, current_user.id)
+    for campo, valor in payload.model_dump(exclude_unset=True).items():
+        if valor is None and campo == "placa":
+            continue
+        setattr(veiculo, campo, valor.strip().upper() if campo == "placa" else valor)
+    bump_data_version(db, current_user.id)
+    _commit(db)
+    db.refresh(veiculo)
+    return veiculo
+
+
+@router.delete("/{veiculo_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_veiculo(
+    veiculo_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    # Os lançamentos continuam, sem veículo (explícito: o SQLite local não aplica o ON DELETE SET NULL)
+    veiculo = _get_owned(db, veiculo_id, current_user.id)
+    db.execute(update(Abastecimento).where(Abastecimento.veiculo_id == veiculo.id).values(veiculo_id=None))
+    db.delete(veiculo)
+    bump_data_version(db, current_user.id)
+    db.commit()
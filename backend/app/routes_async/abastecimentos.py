@@ -0,0 +1,189 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timezone
+
+from ..db import get_async_db
+from ..replica import get_async_read_db
+from ..models import Abastecimento, Veiculo
+from ..schemas import AbastecimentoCreate, AbastecimentoUpdate, AbastecimentoOut
+from ..auth import get_current_user_async
+from ..aggregates import (
+    monthly_series_from_rows,
+    monthly_series_stmt,
+    period_totals_from_rows,
+    period_totals_stmt,
+    vehicle_series_from_rows,
+    vehicle_series_stmt,
+)
+from ..events import publicar_escrita_async
+from ..rollups import abastecimento_delta_stmt
+from ..versions import bump_version_stmt, conditional_json_async
+from ..listing import (
+    FiltrosLista,
+    abastecimento_to_out,
+    decode_cursor,
+    encode_cursor,
+    filtros_lista,
+    list_stmt,
+    row_to_out,
+)
+
+router = APIRouter()
+
+# =============================
+# RESUMO / GRÁFICOS
+# =============================
+
+@router.get("/summary")
+async def get_summary(
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user = Depends(get_current_user_async)
+):
+    async def build():
+        hoje = datetime.now(timezone.utc)
+        totais = period_totals_from_rows((await db.execute(period_totals_stmt(current_user.id, hoje))).all(), hoje)
+        return {
+            "total_mes": totais["total_mes"],
+            "litros_mes": totais["litros_mes"]
+        }
+
+    return await conditional_json_async(request, db, current_user.id, "abastecimentos.summary", build)
+
+
+@router.get("/charts")
+async def get_charts(
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user = Depends(get_current_user_async)
+):
+    async def build():
+        hoje = datetime.now(timezone.utc)
+        stmt, inicios = monthly_series_stmt(current_user.id, hoje, meses=6)
+        serie = monthly_series_from_rows((await db.execute(stmt)).all(), inicios)
+        veiculos = (await db.execute(vehicle_series_stmt(current_user.id, hoje, meses=6))).all()
+        return {
+            "gastos_mensais": [{"mes": m["mes"], "valor": m["valor"]} for m in serie],
+            "litros_mensais": [{"mes": m["mes"], "litros": m["litros"]} for m in serie],
+            **vehicle_series_from_rows(veiculos)
+        }
+
+    return await conditional_json_async(request, db, current_user.id, "abastecimentos.charts", build, comprimir=True)
+
+# =============================
+# LISTAGEM (cursor / keyset)
+# =============================
+
+@router.get("", response_model=list[AbastecimentoOut])
+async def list_abastecimentos(
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    cursor: str | None = None,
+    filtros: FiltrosLista = Depends(filtros_lista),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user = Depends(get_current_user_async)
+):
+    posicao = None
+    if cursor:
+        try:
+            posicao = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    rows = (await db.execute(list_stmt(current_user.id, limit, order, posicao, filtros))).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        ultimo = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(ultimo.data_hora, ultimo.id)
+
+    return [row_to_out(r) for r in rows]
+
+# =============================
+# CRIAR / ATUALIZAR / EXCLUIR
+# =============================
+
+async def _get_owned(db: AsyncSession, abastecimento_id: int, user_id: int) -> Abastecimento:
+    ab = (await db.execute(
+        select(Abastecimento).where(
+            Abastecimento.id == abastecimento_id,
+            Abastecimento.user_id == user_id
+        )
+    )).scalar_one_or_none()
+    if ab is None:
+        raise HTTPException(status_code=404, detail="Lançamento não encontrado")
+    return ab
+
+
+async def _checar_veiculo(db: AsyncSession, user_id: int, veiculo_id: int | None) -> None:
+    if veiculo_id is None:
+        return
+    encontrado = (await db.execute(
+        select(Veiculo.id).where(Veiculo.id == veiculo_id, Veiculo.user_id == user_id)
+    )).scalar()
+    if encontrado is None:
+        raise HTTPException(status_code=400, detail="Veículo não encontrado")
+
+
+@router.post("", response_model=AbastecimentoOut, status_code=status.HTTP_201_CREATED)
+async def create_abastecimento(
+    payload: AbastecimentoCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user_async)
+):
+    await _checar_veiculo(db, current_user.id, payload.veiculo_id)
+    dados = payload.model_dump()
+    if dados["data_hora"] is None:
+        dados["data_hora"] = datetime.now(timezone.utc)
+
+    ab = Abastecimento(user_id=current_user.id, **dados)
+    db.add(ab)
+    await db.flush()
+    await db.execute(abastecimento_delta_stmt(db.bind.dialect.name, ab, 1))
+    await db.execute(bump_version_stmt(current_user.id))
+    await publicar_escrita_async(db, current_user.id, "criado", ab.id)
+    await db.commit()
+    await db.refresh(ab)
+    return abastecimento_to_out(ab)
+
+
+@router.put("/{abastecimento_id}", response_model=AbastecimentoOut)
+async def update_abastecimento(
+    abastecimento_id: int,
+    payload: AbastecimentoUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user_async)
+):
+    await _checar_veiculo(db, current_user.id, payload.veiculo_id)
+    ab = await _get_owned(db, abastecimento_id, current_user.id)
+    dialect = db.bind.dialect.name
+
+    await db.execute(abastecimento_delta_stmt(dialect, ab, -1))
+    for campo, valor in payload.model_dump(exclude_unset=True).items():
+        if valor is None and campo not in ("observacao", "veiculo_id"):
+            continue
+        setattr(ab, campo, valor)
+    await db.flush()
+    await db.execute(abastecimento_delta_stmt(dialect, ab, 1))
+    await db.execute(bump_version_stmt(current_user.id))
+    await publicar_escrita_async(db, current_user.id, "atualizado", ab.id)
+    await db.commit()
+    await db.refresh(ab)
+    return abastecimento_to_out(ab)
+
+
+@router.delete("/{abastecimento_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_abastecimento(
+    abastecimento_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user_async)
+):
+    ab = await _get_owned(db, abastecimento_id, current_user.id)
+
+    await db.execute(abastecimento_delta_stmt(db.bind.dialect.name, ab, -1))
+    await db.execute(bump_version_stmt(current_user.id))
+    await publicar_escrita_async(db, current_user.id, "excluido", ab.id)
+    await db.delete(ab)
+    await db.commit()
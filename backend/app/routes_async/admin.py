@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..db import get_async_db
+from ..models import User
+from ..auth import Principal, get_current_user_async
+from ..passwords import hash_password
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+@router.post("/create")
+async def create_admin(
+    nome: str,
+    email: str,
+    password: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user_async)
+):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Acesso negado")
+
+    if (await db.execute(select(User.id).where(User.email == email))).first():
+        raise HTTPException(status_code=400, detail="Email já cadastrado")
+
+    admin = User(
+        nome=nome,
+        email=email,
+        password=await hash_password(password),
+        is_admin=True
+    )
+
+    db.add(admin)
+    await db.commit()
+    return {"message": "Admin criado com sucesso"}
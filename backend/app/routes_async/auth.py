@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import timedelta
+
+from ..db import get_async_db
+from ..models import User
+from ..auth import create_access_token
+from ..passwords import verify_and_update
+
+router = APIRouter()
+
+@router.post("/login", summary="Login do usuário")
+async def login(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    user = (await db.execute(
+        select(User.id, User.password).where(User.email == form_data.username)
+    )).first()
+    # Conexão de volta ao pool antes do bcrypt (ver routes/auth.py)
+    await db.rollback()
+
+    ok, novo_hash = (False, None)
+    if user:
+        ok, novo_hash = await verify_and_update(form_data.password, user.password)
+
+    if not ok:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Credenciais inválidas"
+        )
+
+    if novo_hash:
+        await db.execute(update(User).where(User.id == user.id).values(password=novo_hash))
+        await db.commit()
+
+    access_token = create_access_token(
+        data={"sub": str(user.id)},
+        expires_delta=timedelta(hours=8)
+    )
+
+    return {
+        "access_token": access_token,
+        "token_type": "bearer"
+    }
@@ -0,0 +1,81 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timezone
+from ..replica import HEADER_ESCRITA, get_async_read_db, open_async_read_session
+from ..settings import settings
+from ..auth import get_current_user_async
+from ..schemas import DashboardSummary
+from ..aggregates import (
+    period_totals_from_rows,
+    period_totals_stmt,
+    quinzena_entries_stmt,
+    quinzena_summary_from_rows,
+)
+from ..bootstrap import SECOES, bootstrap_fields, cache_endpoint
+from ..listing import recent_entries_from_rows, recent_entries_stmt
+from ..versions import conditional_json_async
+
+router = APIRouter()
+
+@router.get("/summary")
+async def get_summary(request: Request, db: AsyncSession = Depends(get_async_read_db), current_user = Depends(get_current_user_async)):
+    async def build():
+        hoje = datetime.now(timezone.utc)
+        totais = period_totals_from_rows((await db.execute(period_totals_stmt(current_user.id, hoje))).all(), hoje)
+        ultimos_registros = (await db.execute(recent_entries_stmt(current_user.id, 10))).all()
+
+        return {
+            "total_mes": totais["total_mes"],
+            "total_quinzena": totais["total_quinzena"],
+            "litros_mes": totais["litros_mes"],
+            "recent_entries": recent_entries_from_rows(ultimos_registros)
+        }
+
+    return await conditional_json_async(request, db, current_user.id, "dashboard.summary", build)
+
+
+@router.get("/quinzena", response_model=DashboardSummary)
+async def get_quinzena(request: Request, db: AsyncSession = Depends(get_async_read_db), current_user = Depends(get_current_user_async)):
+    async def build():
+        hoje = datetime.now(timezone.utc)
+        totais = period_totals_from_rows((await db.execute(period_totals_stmt(current_user.id, hoje))).all(), hoje)
+        lancamentos = (await db.execute(quinzena_entries_stmt(current_user.id, hoje))).all()
+        return DashboardSummary(**quinzena_summary_from_rows(totais, lancamentos, hoje))
+
+    return await conditional_json_async(request, db, current_user.id, "dashboard.quinzena", build)
+
+
+@router.get("/bootstrap")
+async def get_bootstrap(
+    request: Request,
+    campos: tuple[str, ...] = Depends(bootstrap_fields),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user = Depends(get_current_user_async)
+):
+    async def build():
+        hoje = datetime.now(timezone.utc)
+        pendentes = list(campos)
+        saida = {}
+
+        # Cada worker consome seções da fila numa sessão; o da sessão do request mais
+        # até BOOTSTRAP_CONEXOES - 1 em sessões próprias (conexões por request limitadas)
+        async def trabalhar(sessao: AsyncSession):
+            while pendentes:
+                campo = pendentes.pop(0)
+                stmts, montar = SECOES[campo](current_user.id, hoje)
+                saida[campo] = montar(*[(await sessao.execute(stmt)).all() for stmt in stmts])
+
+        async def trabalhar_em_sessao_propria():
+            sessao = await open_async_read_session(current_user.id, request.headers.get(HEADER_ESCRITA))
+            try:
+                await trabalhar(sessao)
+            finally:
+                await sessao.close()
+
+        extras = min(settings.BOOTSTRAP_CONEXOES, len(campos)) - 1
+        await asyncio.gather(trabalhar(db), *(trabalhar_em_sessao_propria() for _ in range(extras)))
+        return {campo: saida[campo] for campo in campos}
+
+    return await conditional_json_async(request, db, current_user.id, cache_endpoint(campos), build, comprimir=True)
@@ -0,0 +1,59 @@
+from __future__ import annotations
+from pathlib import Path
+
+from sqlalchemy import inspect, select
+from sqlalchemy.engine import Connection
+
+from .db import Base, get_engine
+from .models import Abastecimento, AbastecimentoRollup
+
+# =============================
+# SCHEMA DO BANCO x MODELS
+# =============================
+# Bancos novos saem completos do create_all. Nos existentes, o create_all não
+# altera tabelas que já existem: colunas e índices novos vêm de schema_updates.sql
+# e os rollups de rebuild-rollups. `manage upgrade-db` faz tudo no deploy; a API
+# confere tabelas e colunas no startup e não sobe com o schema atrás dos models.
+
+SCHEMA_UPDATES = Path(__file__).resolve().parents[1] / "schema_updates.sql"
+
+
+def aplicar_schema_updates(conn: Connection) -> None:
+    """Roda schema_updates.sql (idempotente) na transação de `conn` (PostgreSQL)."""
+    # Vários statements num execute: direto no cursor do driver, sem parâmetros
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(SCHEMA_UPDATES.read_text(encoding="utf-8"))
+    finally:
+        cursor.close()
+
+
+def rollups_vazios(conn: Connection) -> bool:
+    """Há lançamentos e nenhum rollup: a tabela foi criada depois dos dados."""
+    tem_lancamentos = conn.execute(select(Abastecimento.id).limit(1)).first() is not None
+    return tem_lancamentos and conn.execute(select(AbastecimentoRollup.user_id).limit(1)).first() is None
+
+
+def schema_pendente(conn: Connection) -> list[str]:
+    """Tabelas e colunas dos models que faltam no banco."""
+    inspector = inspect(conn)
+    existentes = set(inspector.get_table_names())
+    pendente = []
+    for tabela in Base.metadata.sorted_tables:
+        if tabela.name not in existentes:
+            pendente.append(f"tabela {tabela.name}")
+            continue
+        colunas = {c["name"] for c in inspector.get_columns(tabela.name)}
+        pendente += [f"coluna {tabela.name}.{c.name}" for c in tabela.columns if c.name not in colunas]
+    return pendente
+
+
+def verificar_schema() -> None:
+    """Falha alto no startup em vez de erro 500 na primeira query com a coluna nova."""
+    with get_engine().connect() as conn:
+        pendente = schema_pendente(conn)
+    if pendente:
+        raise RuntimeError(
+            f"Schema do banco atrás dos models ({', '.join(pendente)}): "
+            "rode `python -m app.manage upgrade-db`"
+        )
@@ -1,5 +1,6 @@
 from datetime import datetime
-from pydantic import BaseModel, Field
+from typing import Annotated, Literal, Union
+from pydantic import BaseModel, Field, model_validator
 
 class Token(BaseModel):
     access_token: str
@@ -9,8 +10,28 @@ class LoginRequest(BaseModel):
     username: str
     password: str
 
+class VeiculoCreate(BaseModel):
+    placa: str = Field(..., min_length=1, max_length=10)
+    descricao: str | None = Field(default=None, max_length=100)
+    capacidade_tanque: float | None = Field(default=None, gt=0)
+
+class VeiculoUpdate(BaseModel):
+    placa: str | None = Field(default=None, min_length=1, max_length=10)
+    descricao: str | None = Field(default=None, max_length=100)
+    capacidade_tanque: float | None = Field(default=None, gt=0)
+
+class VeiculoOut(BaseModel):
+    id: int
+    placa: str
+    descricao: str | None
+    capacidade_tanque: float | None
+
+    class Config:
+        from_attributes = True
+
 class AbastecimentoBase(BaseModel):
     data_hora: datetime | None = None
+    veiculo_id: int | None = None
     posto: str = Field(..., pattern="^(IPIRANGA|OUTRO)$")
     valor: float = Field(..., gt=0)
     litros: float = Field(..., gt=0)
@@ -22,6 +43,7 @@ class AbastecimentoCreate(AbastecimentoBase):
 
 class AbastecimentoUpdate(BaseModel):
     data_hora: datetime | None = None
+    veiculo_id: int | None = None
     posto: str | None = Field(default=None, pattern="^(IPIRANGA|OUTRO)$")
     valor: float | None = Field(default=None, gt=0)
     litros: float | None = Field(default=None, gt=0)
@@ -31,6 +53,7 @@ class AbastecimentoUpdate(BaseModel):
 class AbastecimentoOut(BaseModel):
     id: int
     data_hora: datetime
+    veiculo_id: int | None = None
     posto: str
     valor: float
     litros: float
@@ -62,3 +85,50 @@ class DashboardSummary(BaseModel):
     gastos_por_dia: list[float]
     preco_litro_por_lancamento: list[float]
     km_por_litro_por_lancamento: list[float]
+
+# Sincronização offline (fila do PWA enviada num único request)
+class SyncCreate(BaseModel):
+    op: Literal["create"]
+    chave: str = Field(..., min_length=1, max_length=64)
+    dados: AbastecimentoCreate
+
+class SyncUpdate(BaseModel):
+    op: Literal["update"]
+    chave: str = Field(..., min_length=1, max_length=64)
+    # id do servidor ou `ref` = chave de um create anterior (mesmo lote ou já sincronizado)
+    id: int | None = None
+    ref: str | None = None
+    dados: AbastecimentoUpdate
+
+class SyncDelete(BaseModel):
+    op: Literal["delete"]
+    chave: str = Field(..., min_length=1, max_length=64)
+    id: int | None = None
+    ref: str | None = None
+
+SyncOperacaoIn = Annotated[Union[SyncCreate, SyncUpdate, SyncDelete], Field(discriminator="op")]
+
+class SyncRequest(BaseModel):
+    operacoes: list[SyncOperacaoIn] = Field(..., max_length=500)
+
+    @model_validator(mode="after")
+    def _validar(self):
+        chaves = [o.chave for o in self.operacoes]
+        if len(set(chaves)) != len(chaves):
+            raise ValueError("chave repetida no lote")
+        for o in self.operacoes:
+            if o.op != "create" and (o.id is None) == (o.ref is None):
+                raise ValueError(f"{o.chave}: informe id ou ref")
+        return self
+
+class SyncResultado(BaseModel):
+    chave: str
+    op: str
+    # aplicado | repetido (chave já processada) | nao_encontrado
+    status: str
+    id: int | None = None
+    abastecimento: AbastecimentoOut | None = None
+
+class SyncResponse(BaseModel):
+    resultados: list[SyncResultado]
+    ultimo_km: int | None
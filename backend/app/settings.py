@@ -5,6 +5,26 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_ignore_empty=True, extra="ignore")
 
     DATABASE_URL: str = Field(..., description="PostgreSQL connection string")
+    # "sync" (threadpool + Session) ou "async" (AsyncEngine + rotas async)
+    DB_MODE: str = Field("sync", pattern="^(sync|async)$")
+    # Conexões por worker: o Session Pooler do Supabase limita o total por projeto
+    DB_POOL_SIZE: int = Field(5)
+    DB_MAX_OVERFLOW: int = Field(5)
+    DB_POOL_TIMEOUT: float = Field(10.0)
+    DB_POOL_RECYCLE: int = Field(1800)
+    # "session" (Session Pooler, porta 5432) ou "transaction" (Transaction Pooler, porta 6543):
+    # no modo transaction, sem prepared statements no servidor e pool ajustado (ver db.py)
+    DB_POOLER_MODE: str = Field("session", pattern="^(session|transaction)$")
+    # Recycle no modo transaction: conexões com o pooler são baratas, renovar cedo evita pre-ping
+    DB_TXN_POOL_RECYCLE: int = Field(300)
+
+    # Réplica de leitura opcional para os GETs (vazio = tudo no primário)
+    DATABASE_READ_URL: str | None = Field(None, description="Connection string da réplica (somente leitura)")
+    # Depois de uma escrita, as leituras do mesmo usuário ficam no primário por este tempo
+    READ_YOUR_WRITES_SECONDS: float = Field(5.0)
+    # Réplica que falhou fica fora por este tempo antes de uma nova tentativa
+    REPLICA_RETRY_SECONDS: float = Field(30.0)
+
     JWT_SECRET: str = Field("change-me", description="Secret used to sign JWTs")
     JWT_ALGORITHM: str = Field("HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(60*24*7)  # 7 days
@@ -14,4 +34,39 @@ class Settings(BaseSettings):
 
     IPIRANGA_LIMIT_PER_QUINZENA: float = Field(1000.0)
 
+    # bcrypt: custo e pool de processos usado no login
+    BCRYPT_ROUNDS: int = Field(12)
+    PASSWORD_WORKERS: int = Field(2, description="Processos para bcrypt (0 = thread, sem pool)")
+    PASSWORD_MAX_PENDING: int = Field(32, description="Fila máxima antes de responder 503")
+
+    # Cache de usuários autenticados (evita SELECT em users a cada request)
+    PRINCIPAL_CACHE_TTL_SECONDS: float = Field(60.0)
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = Field(10_000)
+
+    # Cache de respostas agregadas por (usuário, endpoint, versão dos dados)
+    RESPONSE_CACHE_MAX_ENTRIES: int = Field(2048)
+
+    # Conexões do pool por request do bootstrap async (a do request + sessões extras
+    # para seções em paralelo); 1 = seções em sequência, como na rota sync
+    BOOTSTRAP_CONEXOES: int = Field(2, ge=1)
+
+    # gzip nas respostas com séries (bootstrap, gráficos, análise): só acima deste tamanho
+    GZIP_MIN_BYTES: int = Field(1024)
+    GZIP_LEVEL: int = Field(5, ge=1, le=9)
+
+    # Eventos do dashboard (SSE): "memory" (um processo) ou "postgres" (LISTEN/NOTIFY, vários workers)
+    EVENTS_BACKEND: str = Field("memory", pattern="^(memory|postgres)$")
+    # Conexão direta/Session Pooler para o LISTEN (o Transaction Pooler não mantém LISTEN)
+    EVENTS_DATABASE_URL: str | None = Field(None)
+    # Comentário SSE enviado em conexões ociosas (proxies fecham conexões sem tráfego)
+    EVENTS_KEEPALIVE_SECONDS: float = Field(15.0)
+    # Aceita o token em ?token= no stream (EventSource não envia headers); fica fora do access log
+    EVENTS_TOKEN_QUERY: bool = Field(False)
+
+    # Startup confere se o banco tem as tabelas/colunas dos models (ver `manage upgrade-db`)
+    SCHEMA_CHECK: bool = Field(True)
+
+    # Log de aviso quando um request passa desse número de statements SQL (0 = desliga)
+    QUERY_BUDGET: int = Field(10)
+
 settings = Settings()
@@ -0,0 +1,62 @@
+import logging
+import os
+import time
+
+logger = logging.getLogger("uvicorn.error")
+
+# =============================
+# TEMPO DE STARTUP POR FASE
+# =============================
+# main.py marca cada fase; o primeiro request fecha o relatório (log + GET /startup).
+
+_t0 = time.perf_counter()
+
+
+def _idade_do_processo_ms() -> float | None:
+    # Tempo entre o exec do processo e o import do app (Linux: /proc)
+    try:
+        with open("/proc/self/stat") as f:
+            inicio_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return (uptime - inicio_ticks / os.sysconf("SC_CLK_TCK")) * 1000
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupTimer:
+    def __init__(self):
+        self._ultimo = _t0
+        self.fases: dict[str, float] = {}
+        self.antes_do_app_ms = _idade_do_processo_ms()
+        self.concluido = False
+
+    def mark(self, fase: str) -> None:
+        agora = time.perf_counter()
+        self.fases[fase] = round((agora - self._ultimo) * 1000, 1)
+        self._ultimo = agora
+
+    def start_first_request(self) -> bool:
+        """Fecha a espera pelo primeiro request; False se ele já começou."""
+        if "ate_primeiro_request" in self.fases:
+            return False
+        self.mark("ate_primeiro_request")
+        return True
+
+    def first_request(self) -> None:
+        # Fases contíguas: primeiro_request começa onde ate_primeiro_request termina
+        self.mark("primeiro_request")
+        self.concluido = True
+        logger.info("Startup (ms): %s", self.report())
+
+    def report(self) -> dict:
+        return {
+            "processo_ate_import_app_ms": (
+                round(self.antes_do_app_ms, 1) if self.antes_do_app_ms is not None else None
+            ),
+            "fases_ms": dict(self.fases),
+            "total_app_ms": round(sum(self.fases.values()), 1),
+        }
+
+
+timer = StartupTimer()
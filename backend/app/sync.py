@@ -0,0 +1,166 @@
+from __future__ import annotations
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .events import publicar_escrita
+from .listing import abastecimento_to_out, last_km_stmt
+from .models import Abastecimento, SyncOperacao
+from .rollups import periodo_de, upsert_delta_stmt
+from .schemas import SyncCreate, SyncDelete, SyncUpdate
+from .versions import bump_version_stmt
+
+# =============================
+# SINCRONIZAÇÃO EM LOTE (FILA OFFLINE DO PWA)
+# =============================
+# Cada operação traz uma chave gerada no cliente; chaves já vistas não são
+# reaplicadas (o reenvio após perda de conexão devolve o mesmo resultado).
+
+def _acumular(deltas: dict, ab: Abastecimento, sinal: int) -> None:
+    acc = deltas.setdefault((periodo_de(ab.data_hora), ab.posto), [Decimal("0"), Decimal("0"), 0])
+    acc[0] += Decimal(str(ab.valor)) * sinal
+    acc[1] += Decimal(str(ab.litros)) * sinal
+    acc[2] += sinal
+
+
+def _aplicar(db: Session, user_id: int, operacoes: list) -> dict:
+    chaves = {o.chave for o in operacoes}
+    refs = {o.ref for o in operacoes if not isinstance(o, SyncCreate) and o.ref}
+
+    # 1 query: chaves já processadas (repetições e refs de lotes anteriores)
+    vistas = {
+        s.chave: s
+        for s in db.execute(
+            select(SyncOperacao).where(
+                SyncOperacao.user_id == user_id,
+                SyncOperacao.chave.in_(chaves | refs)
+            )
+        ).scalars()
+    }
+
+    # 1 query: todos os lançamentos existentes que o lote toca
+    ids = {o.id for o in operacoes if not isinstance(o, SyncCreate) and o.id is not None}
+    ids |= {s.abastecimento_id for s in vistas.values() if s.abastecimento_id is not None}
+    existentes = {}
+    if ids:
+        existentes = {
+            ab.id: ab
+            for ab in db.execute(
+                select(Abastecimento).where(
+                    Abastecimento.user_id == user_id,
+                    Abastecimento.id.in_(ids)
+                )
+            ).scalars()
+        }
+
+    criados: dict[str, Abastecimento] = {}
+    excluidos: set[Abastecimento] = set()
+    deltas: dict[tuple, list] = {}
+    resultados: list[tuple] = []  # (operação, status, abastecimento)
+    novas: list[tuple] = []  # (operação, abastecimento afetado)
+
+    def alvo(op) -> Abastecimento | None:
+        if op.ref:
+            if op.ref in criados:
+                ab = criados[op.ref]
+            else:
+                anterior = vistas.get(op.ref)
+                ab = existentes.get(anterior.abastecimento_id) if anterior else None
+        else:
+            ab = existentes.get(op.id)
+        return None if ab is None or ab in excluidos else ab
+
+    for op in operacoes:
+        if op.chave in vistas:
+            ab = existentes.get(vistas[op.chave].abastecimento_id)
+            resultados.append((op, "repetido", ab))
+            continue
+
+        if isinstance(op, SyncCreate):
+            dados = op.dados.model_dump()
+            if dados["data_hora"] is None:
+                dados["data_hora"] = datetime.now(timezone.utc)
+            ab = Abastecimento(user_id=user_id, **dados)
+            db.add(ab)
+            criados[op.chave] = ab
+            _acumular(deltas, ab, 1)
+
+        elif isinstance(op, SyncUpdate):
+            ab = alvo(op)
+            if ab is None:
+                resultados.append((op, "nao_encontrado", None))
+                continue
+            _acumular(deltas, ab, -1)
+            for campo, valor in op.dados.model_dump(exclude_unset=True).items():
+                if valor is None and campo not in ("observacao", "veiculo_id"):
+                    continue
+                setattr(ab, campo, valor)
+            _acumular(deltas, ab, 1)
+
+        elif isinstance(op, SyncDelete):
+            ab = alvo(op)
+            if ab is None:
+                resultados.append((op, "nao_encontrado", None))
+                continue
+            _acumular(deltas, ab, -1)
+            excluidos.add(ab)
+            if ab in db.new:
+                db.expunge(ab)  # criado e excluído no mesmo lote: nunca chega ao banco
+            else:
+                db.delete(ab)
+
+        novas.append((op, ab))
+        resultados.append((op, "aplicado", ab))
+
+    # 1 flush: INSERTs em lote (RETURNING id), UPDATEs e DELETEs
+    db.flush()
+
+    dialect = db.get_bind().dialect.name
+    # Chaves em ordem fixa: lotes concorrentes do mesmo usuário travam as linhas do
+    # rollup na mesma ordem e esperam um pelo outro em vez de dar deadlock
+    for (periodo, posto), (valor, litros, quantidade) in sorted(deltas.items()):
+        if quantidade or valor or litros:
+            db.execute(upsert_delta_stmt(dialect, user_id, periodo, posto, valor, litros, quantidade))
+
+    db.add_all([
+        SyncOperacao(user_id=user_id, chave=op.chave, op=op.op, abastecimento_id=ab.id)
+        for op, ab in novas
+    ])
+    if novas:
+        db.execute(bump_version_stmt(user_id))
+        publicar_escrita(db, user_id, "sync")
+    db.flush()
+
+    saida = []
+    for op, status, ab in resultados:
+        vivo = ab is not None and ab not in excluidos
+        saida.append({
+            "chave": op.chave,
+            "op": op.op,
+            "status": status,
+            "id": ab.id if ab is not None else (
+                vistas[op.chave].abastecimento_id if status == "repetido" else None
+            ),
+            "abastecimento": abastecimento_to_out(ab) if vivo else None,
+        })
+    ultimo_km = db.execute(last_km_stmt(user_id)).scalar()
+
+    db.commit()
+    return {"resultados": saida, "ultimo_km": ultimo_km}
+
+
+def aplicar_lote(db: Session, user_id: int, operacoes: list) -> dict:
+    """Aplica creates/updates/deletes em ordem, numa única transação.
+
+    Poucas queries por lote, independente do tamanho: chaves vistas, lançamentos
+    tocados, um flush, os upserts de rollup por quinzena/posto e o último km.
+    """
+    try:
+        return _aplicar(db, user_id, operacoes)
+    except IntegrityError:
+        # Reenvio concorrente do mesmo lote gravou as chaves antes: agora são "repetido"
+        db.rollback()
+        return _aplicar(db, user_id, operacoes)
@@ -0,0 +1,174 @@
+from __future__ import annotations
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable
+
+import orjson
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .models import User
+from .rollups import periodo_de
+from .settings import settings
+
+# =============================
+# VERSÃO DOS DADOS POR USUÁRIO
+# =============================
+# users.data_version é incrementada em toda escrita em abastecimentos, na mesma
+# transação. As respostas agregadas usam (versão, quinzena atual) como ETag.
+
+def bump_version_stmt(user_id: int):
+    return update(User).where(User.id == user_id).values(data_version=User.data_version + 1)
+
+
+def version_stmt(user_id: int):
+    return select(User.data_version).where(User.id == user_id)
+
+
+def bump_data_version(db: Session, user_id: int) -> None:
+    db.execute(bump_version_stmt(user_id))
+
+# =============================
+# CACHE DE RESPOSTAS (LRU)
+# =============================
+
+class ResponseCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> bytes | None:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def set(self, key: tuple, body: bytes) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_MAX_ENTRIES)
+
+# =============================
+# GET CONDICIONAL
+# =============================
+
+def _chave(user_id: int, endpoint: str, version: int) -> tuple:
+    # A quinzena entra na chave: os totais "do mês/quinzena" mudam na virada mesmo sem escrita
+    return (user_id, endpoint, version, periodo_de(datetime.now(timezone.utc)).isoformat())
+
+
+def make_etag(chave: tuple) -> str:
+    digest = hashlib.sha1(repr(chave).encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def _if_none_match(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [t.strip() for t in header.split(",")]
+
+
+def _headers(etag: str, comprimir: bool = False) -> dict:
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if comprimir:
+        headers["Vary"] = "Accept-Encoding"
+    return headers
+
+
+def _serializar(payload: Any) -> bytes:
+    # orjson serializa dict/list/float/datetime e arrays NumPy direto; o resto
+    # (Decimal, modelos pydantic) passa pelo jsonable_encoder, como antes
+    return orjson.dumps(payload, default=jsonable_encoder, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _aceita_gzip(request: Request) -> bool:
+    return "gzip" in request.headers.get("accept-encoding", "")
+
+
+def _resposta(body: bytes, etag: str, gzip_ok: bool, comprimir: bool) -> Response:
+    headers = _headers(etag, comprimir)
+    if gzip_ok and len(body) >= settings.GZIP_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=settings.GZIP_LEVEL)
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def conditional_json(
+    request: Request,
+    db: Session,
+    user_id: int,
+    endpoint: str,
+    build: Callable[[], Any],
+    comprimir: bool = False
+) -> Response:
+    """304 se o If-None-Match bater; senão serve do cache ou calcula com build().
+
+    Com `comprimir`, respostas grandes (séries) saem em gzip para quem aceita;
+    o cache guarda o JSON puro e cada codificação tem seu ETag.
+    """
+    version = db.execute(version_stmt(user_id)).scalar() or 0
+    chave = _chave(user_id, endpoint, version)
+    gzip_ok = comprimir and _aceita_gzip(request)
+    etag = make_etag(chave + ("gzip",) if gzip_ok else chave)
+
+    if _if_none_match(request, etag):
+        return Response(status_code=304, headers=_headers(etag, comprimir))
+
+    body = response_cache.get(chave)
+    if body is None:
+        body = _serializar(build())
+        response_cache.set(chave, body)
+    return _resposta(body, etag, gzip_ok, comprimir)
+
+
+async def conditional_json_async(
+    request: Request,
+    db: AsyncSession,
+    user_id: int,
+    endpoint: str,
+    build: Callable[[], Awaitable[Any]],
+    comprimir: bool = False
+) -> Response:
+    version = (await db.execute(version_stmt(user_id))).scalar() or 0
+    chave = _chave(user_id, endpoint, version)
+    gzip_ok = comprimir and _aceita_gzip(request)
+    etag = make_etag(chave + ("gzip",) if gzip_ok else chave)
+
+    if _if_none_match(request, etag):
+        return Response(status_code=304, headers=_headers(etag, comprimir))
+
+    body = response_cache.get(chave)
+    if body is None:
+        body = _serializar(await build())
+        response_cache.set(chave, body)
+    return _resposta(body, etag, gzip_ok, comprimir)
@@ -0,0 +1,29 @@
+"""Utilidades compartilhadas pelos scripts de benchmark."""
+import statistics
+import subprocess
+
+
+def percentil(valores: list[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    idx = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[idx]
+
+
+def resumo_latencias(latencias_s: list[float]) -> dict:
+    return {
+        "p50_ms": statistics.median(latencias_s) * 1000 if latencias_s else 0.0,
+        "p95_ms": percentil(latencias_s, 95) * 1000,
+        "p99_ms": percentil(latencias_s, 99) * 1000,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
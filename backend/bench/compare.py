@@ -0,0 +1,43 @@
+"""Compara dois arquivos de resultado do bench/load.py (base x novo).
+
+Uso:
+    python bench/compare.py bench/results/abc123.json bench/results/def456.json
+"""
+import argparse
+import json
+
+
+def carregar(caminho: str) -> tuple[dict, dict]:
+    with open(caminho) as f:
+        dados = json.load(f)
+    por_chave = {(r["endpoint"], r["concorrencia"]): r for r in dados["resultados"]}
+    return dados, por_chave
+
+
+def delta(antes: float, depois: float) -> str:
+    if not antes:
+        return "   n/a"
+    return f"{(depois - antes) / antes * 100:+6.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("base")
+    parser.add_argument("novo")
+    args = parser.parse_args()
+
+    base, a = carregar(args.base)
+    novo, b = carregar(args.novo)
+    print(f"base: {base.get('commit')}  novo: {novo.get('commit')}")
+    print(f"{'endpoint':<26} {'conc':>5} {'req/s':>18} {'p99 ms':>20}")
+    for chave in sorted(set(a) & set(b)):
+        ra, rb = a[chave], b[chave]
+        print(
+            f"{chave[0]:<26} {chave[1]:>5} "
+            f"{rb['rps']:>9.1f} {delta(ra['rps'], rb['rps'])} "
+            f"{rb['p99_ms']:>10.1f} {delta(ra['p99_ms'], rb['p99_ms'])}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""Driver de carga: throughput e p50/p95/p99 por endpoint e nível de concorrência.
+
+Faz login com uma amostra dos usuários gerados por bench/seed.py e dispara os
+requests de cada endpoint com tokens sorteados (os relatórios admin com o
+admin@bench.local do seed). PUT e DELETE usam lançamentos criados via /sync
+antes da medição, um por request. As escritas ficam no banco: rode contra o
+banco do bench, nunca produção. O resultado vai para um JSON (com o commit
+atual) para comparar execuções com bench/compare.py.
+
+Uso:
+    python bench/load.py --url http://127.0.0.1:8000 --users 50 \
+        --concurrency 1,8,32 --requests 500 --out bench/results/$(git rev-parse --short HEAD).json
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+
+from common import git_commit, resumo_latencias
+
+SENHA_PADRAO = "bench123"
+ADMIN_EMAIL = "admin@bench.local"  # criado pelo bench/seed.py
+LOTE_SYNC = 500  # máximo de operações por /sync
+
+# =============================
+# CORPOS DOS REQUESTS
+# =============================
+# Cada fábrica devolve os kwargs do request (json= ou files=).
+
+def _novo_abastecimento(rng: random.Random) -> dict:
+    litros = round(rng.uniform(20, 50), 2)
+    return {
+        "posto": rng.choice(("IPIRANGA", "OUTRO")),
+        "valor": round(litros * rng.uniform(5.2, 6.5), 2),
+        "litros": litros,
+        "km_odometro": rng.randint(200_000, 900_000),
+        "observacao": "bench",
+    }
+
+
+def _criar(rng: random.Random) -> dict:
+    return {"json": _novo_abastecimento(rng)}
+
+
+def _editar(rng: random.Random) -> dict:
+    return {"json": {"valor": round(rng.uniform(150, 320), 2), "observacao": "bench editado"}}
+
+
+def _chave(rng: random.Random) -> str:
+    return f"bench-{rng.getrandbits(64):016x}"
+
+
+def _lote_sync(rng: random.Random, tamanho: int = 10) -> dict:
+    # Fila offline do PWA: criações com chaves novas (repetidas seriam só "repetido")
+    return {"json": {"operacoes": [
+        {"op": "create", "chave": _chave(rng), "dados": _novo_abastecimento(rng)}
+        for _ in range(tamanho)
+    ]}}
+
+
+def _arquivo_import(rng: random.Random, linhas: int = 200) -> dict:
+    agora = datetime.now(timezone.utc)
+    saida = io.StringIO()
+    escritor = csv.writer(saida)
+    escritor.writerow(("data_hora", "posto", "valor", "litros", "km_odometro", "observacao"))
+    for _ in range(linhas):
+        a = _novo_abastecimento(rng)
+        data_hora = agora - timedelta(minutes=rng.randint(1, 60 * 24 * 365))
+        escritor.writerow((data_hora.isoformat(), a["posto"], a["valor"], a["litros"], a["km_odometro"], a["observacao"]))
+    return {"files": {"arquivo": ("bench.csv", saida.getvalue().encode(), "text/csv")}}
+
+
+def _novo_veiculo(rng: random.Random) -> dict:
+    return {"json": {"placa": f"LD{rng.randrange(10**8):08d}", "capacidade_tanque": rng.choice((45, 50, 55, 60))}}
+
+# =============================
+# ENDPOINTS
+# =============================
+# nome -> (método, path, params, corpo, admin). path pode ser função do id de um
+# lançamento preparado (PUT/DELETE); corpo é uma das fábricas acima.
+
+def _do_lancamento(alvo: int) -> str:
+    return f"/abastecimentos/{alvo}"
+
+
+ENDPOINTS = {
+    "dashboard.summary": ("GET", "/dashboard/summary", None, None, False),
+    "dashboard.quinzena": ("GET", "/dashboard/quinzena", None, None, False),
+    "dashboard.bootstrap": ("GET", "/dashboard/bootstrap", None, None, False),
+    "abastecimentos.summary": ("GET", "/abastecimentos/summary", None, None, False),
+    "abastecimentos.charts": ("GET", "/abastecimentos/charts", None, None, False),
+    "abastecimentos.list": ("GET", "/abastecimentos", {"limit": 50}, None, False),
+    "abastecimentos.last_km": ("GET", "/abastecimentos", {"limit": 1, "order": "desc"}, None, False),
+    "abastecimentos.create": ("POST", "/abastecimentos", None, _criar, False),
+    "abastecimentos.update": ("PUT", _do_lancamento, None, _editar, False),
+    "abastecimentos.delete": ("DELETE", _do_lancamento, None, None, False),
+    "abastecimentos.sync": ("POST", "/abastecimentos/sync", None, _lote_sync, False),
+    "abastecimentos.export": ("GET", "/abastecimentos/export", {"formato": "ndjson"}, None, False),
+    "abastecimentos.import": ("POST", "/abastecimentos/import", {"formato": "csv"}, _arquivo_import, False),
+    "veiculos.list": ("GET", "/veiculos", None, None, False),
+    "veiculos.create": ("POST", "/veiculos", None, _novo_veiculo, False),
+    "analytics.consumo": ("GET", "/analytics/consumo", None, None, False),
+    "admin.motoristas": ("GET", "/admin/relatorios/motoristas", {"limit": 50}, None, True),
+    "admin.ipiranga": ("GET", "/admin/relatorios/ipiranga", {"limit": 50}, None, True),
+    "admin.postos": ("GET", "/admin/relatorios/postos", None, None, True),
+    "auth.login": ("POST", "/auth/login", None, None, False),
+}
+
+
+async def login(client: httpx.AsyncClient, email: str) -> str:
+    r = await client.post("/auth/login", data={"username": email, "password": SENHA_PADRAO})
+    r.raise_for_status()
+    return r.json()["access_token"]
+
+
+async def preparar_alvos(client, tokens: list[tuple[str, str]], quantidade: int, rng) -> list[tuple[str, str, int]]:
+    """Lançamentos para PUT/DELETE (fora da medição), em lotes de /sync por usuário."""
+    alvos = []
+    while len(alvos) < quantidade:
+        email, token = rng.choice(tokens)
+        tamanho = min(LOTE_SYNC, quantidade - len(alvos))
+        r = await client.post(
+            "/abastecimentos/sync",
+            headers={"Authorization": f"Bearer {token}"},
+            **_lote_sync(rng, tamanho),
+        )
+        r.raise_for_status()
+        alvos += [(email, token, res["id"]) for res in r.json()["resultados"]]
+    rng.shuffle(alvos)
+    return alvos
+
+
+async def rodar(client, nome: str, tokens: list[tuple[str, str]], concorrencia: int, total: int, etag: bool, rng) -> dict:
+    metodo, path, params, corpo, _ = ENDPOINTS[nome]
+    latencias: list[float] = []
+    status: dict[int, int] = {}
+    etags: dict[tuple, str] = {}
+    restantes = total
+    alvos = await preparar_alvos(client, tokens, total, rng) if callable(path) else None
+
+    async def worker():
+        nonlocal restantes
+        while restantes > 0:
+            restantes -= 1
+            if alvos is not None:
+                email, token, alvo = alvos.pop()
+                url = path(alvo)
+            else:
+                email, token = rng.choice(tokens)
+                url = path
+            headers = {"Authorization": f"Bearer {token}"}
+            if etag and (email, nome) in etags:
+                headers["If-None-Match"] = etags[(email, nome)]
+            kwargs = corpo(rng) if corpo else {}
+
+            inicio = time.perf_counter()
+            if nome == "auth.login":
+                r = await client.post(url, data={"username": email, "password": SENHA_PADRAO})
+            else:
+                r = await client.request(metodo, url, params=params, headers=headers, **kwargs)
+            latencias.append(time.perf_counter() - inicio)
+
+            status[r.status_code] = status.get(r.status_code, 0) + 1
+            if "etag" in r.headers:
+                etags[(email, nome)] = r.headers["etag"]
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concorrencia)))
+    duracao = time.perf_counter() - inicio
+
+    return {
+        "endpoint": nome,
+        "concorrencia": concorrencia,
+        "requests": total,
+        "status": {str(k): v for k, v in sorted(status.items())},
+        "rps": total / duracao if duracao else 0.0,
+        **resumo_latencias(latencias),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=50, help="Quantos motoristas usar (motorista1..N)")
+    parser.add_argument("--admin", default=ADMIN_EMAIL, help="Admin dos relatórios")
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--etag", action="store_true", help="Reenvia If-None-Match (simula o polling do PWA)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", default=None, help="Arquivo JSON de resultados")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    niveis = [int(c) for c in args.concurrency.split(",")]
+    nomes = [n for n in args.endpoints.split(",") if n]
+    desconhecidos = [n for n in nomes if n not in ENDPOINTS]
+    if desconhecidos:
+        parser.error(f"Endpoints desconhecidos: {', '.join(desconhecidos)}")
+
+    limites = httpx.Limits(max_connections=max(niveis), max_keepalive_connections=max(niveis))
+    async with httpx.AsyncClient(base_url=args.url, timeout=60, limits=limites) as client:
+        emails = [f"motorista{i}@bench.local" for i in range(1, args.users + 1)]
+        tokens = list(zip(emails, await asyncio.gather(*(login(client, e) for e in emails))))
+        admin = [(args.admin, await login(client, args.admin))] if any(ENDPOINTS[n][4] for n in nomes) else []
+
+        resultados = []
+        print(f"{'endpoint':<26} {'conc':>5} {'req/s':>9} {'p50':>8} {'p95':>8} {'p99':>8}  status")
+        for nome in nomes:
+            for c in niveis:
+                r = await rodar(client, nome, admin if ENDPOINTS[nome][4] else tokens, c, args.requests, args.etag, rng)
+                resultados.append(r)
+                print(
+                    f"{nome:<26} {c:>5} {r['rps']:>9.1f} {r['p50_ms']:>8.1f} "
+                    f"{r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}  {r['status']}"
+                )
+
+    if args.out:
+        destino = Path(args.out)
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        destino.write_text(json.dumps({
+            "commit": git_commit(),
+            "quando": datetime.now(timezone.utc).isoformat(),
+            "url": args.url,
+            "users": args.users,
+            "requests": args.requests,
+            "etag": args.etag,
+            "resultados": resultados,
+        }, indent=2))
+        print(f"Resultados salvos em {destino}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
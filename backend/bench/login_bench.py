@@ -0,0 +1,72 @@
+"""Benchmark de throughput do POST /auth/login.
+
+Uso:
+    python bench/login_bench.py --url http://127.0.0.1:8000 \
+        --email admin@fuelcontrol.com --password admin123 \
+        --concurrency 1,4,16,64 --requests 200
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from common import resumo_latencias
+
+
+async def rodar_nivel(url: str, email: str, password: str, concorrencia: int, total: int) -> dict:
+    latencias: list[float] = []
+    status: dict[int, int] = {}
+    fila = asyncio.Queue()
+    for _ in range(total):
+        fila.put_nowait(None)
+
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        async def worker():
+            while True:
+                try:
+                    fila.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                inicio = time.perf_counter()
+                r = await client.post(
+                    "/auth/login",
+                    data={"username": email, "password": password},
+                )
+                latencias.append(time.perf_counter() - inicio)
+                status[r.status_code] = status.get(r.status_code, 0) + 1
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concorrencia)))
+        duracao = time.perf_counter() - inicio
+
+    return {
+        "concorrencia": concorrencia,
+        "requests": total,
+        "ok": status.get(200, 0),
+        "status": status,
+        "logins_por_s": status.get(200, 0) / duracao if duracao else 0.0,
+        **resumo_latencias(latencias),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", default="1,4,16,64")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'conc':>5} {'ok':>6} {'logins/s':>10} {'p50 ms':>9} {'p99 ms':>9}  status")
+    for c in [int(x) for x in args.concurrency.split(",")]:
+        r = await rodar_nivel(args.url, args.email, args.password, c, args.requests)
+        print(
+            f"{r['concorrencia']:>5} {r['ok']:>6} {r['logins_por_s']:>10.1f} "
+            f"{r['p50_ms']:>9.1f} {r['p99_ms']:>9.1f}  {r['status']}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
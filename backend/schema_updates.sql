@@ -0,0 +1,66 @@
+-- =============================
+-- ATUALIZAÇÕES DE SCHEMA (PostgreSQL, bancos já existentes)
+-- =============================
+-- Aplicado pelo deploy com `python -m app.manage upgrade-db` (create_all, este arquivo
+-- e rebuild-rollups se os rollups estiverem vazios). Idempotente, pode rodar de novo;
+-- à mão: psql "$DATABASE_URL" -f schema_updates.sql && python -m app.manage rebuild-rollups
+
+-- 1. Totais por usuário/quinzena/posto do dashboard
+CREATE TABLE IF NOT EXISTS abastecimentos_rollup (
+    user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    periodo DATE NOT NULL,
+    posto VARCHAR(50) NOT NULL,
+    total_valor NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    total_litros NUMERIC(14, 3) NOT NULL DEFAULT 0,
+    quantidade INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, periodo, posto)
+);
+
+-- 2. Versão dos dados do usuário (ETag e cache dos endpoints agregados)
+ALTER TABLE users ADD COLUMN IF NOT EXISTS data_version INTEGER NOT NULL DEFAULT 0;
+
+-- 3. Paginação por cursor da listagem
+CREATE INDEX IF NOT EXISTS ix_abastecimentos_user_data_hora_id
+    ON abastecimentos (user_id, data_hora DESC, id);
+
+-- 4. Filtros e busca da listagem (trigramas em observacao)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS btree_gin;
+CREATE INDEX IF NOT EXISTS ix_abastecimentos_user_posto_data_hora
+    ON abastecimentos (user_id, posto, data_hora DESC, id);
+CREATE INDEX IF NOT EXISTS ix_abastecimentos_user_valor
+    ON abastecimentos (user_id, valor);
+CREATE INDEX IF NOT EXISTS ix_abastecimentos_user_observacao_trgm
+    ON abastecimentos USING gin (user_id, observacao gin_trgm_ops);
+
+-- 5. Idempotência da sincronização offline
+CREATE TABLE IF NOT EXISTS sync_operacoes (
+    user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    chave VARCHAR(64) NOT NULL,
+    op VARCHAR(10) NOT NULL,
+    abastecimento_id INTEGER,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (user_id, chave)
+);
+CREATE INDEX IF NOT EXISTS ix_sync_operacoes_created_at ON sync_operacoes (created_at);
+
+-- 6. Relatórios da frota
+CREATE INDEX IF NOT EXISTS ix_abastecimentos_rollup_periodo_user
+    ON abastecimentos_rollup (periodo, user_id);
+
+-- 7. Veículos
+CREATE TABLE IF NOT EXISTS veiculos (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    placa VARCHAR(10) NOT NULL,
+    descricao VARCHAR(100),
+    capacidade_tanque NUMERIC(6, 1),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    CONSTRAINT uq_veiculos_user_placa UNIQUE (user_id, placa)
+);
+CREATE INDEX IF NOT EXISTS ix_veiculos_id ON veiculos (id);
+CREATE INDEX IF NOT EXISTS ix_veiculos_user_id ON veiculos (user_id);
+ALTER TABLE abastecimentos
+    ADD COLUMN IF NOT EXISTS veiculo_id INTEGER REFERENCES veiculos (id) ON DELETE SET NULL;
+CREATE INDEX IF NOT EXISTS ix_abastecimentos_veiculo_data_hora
+    ON abastecimentos (veiculo_id, data_hora, id) INCLUDE (valor, litros, km_odometro);
@@ -0,0 +1,106 @@
+import importlib
+import os
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+
+# =============================
+# AMBIENTE (antes de importar o app)
+# =============================
+# Sempre um SQLite temporário: o .env pode apontar para o banco de produção.
+
+_DIR = tempfile.mkdtemp(prefix="fuel-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DIR}/fuel.db"
+os.environ["PASSWORD_WORKERS"] = "0"
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["EVENTS_BACKEND"] = "memory"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.auth import principal_cache  # noqa: E402
+from app.db import Base, get_async_engine, get_engine, new_session  # noqa: E402
+from app.models import User  # noqa: E402
+from app.passwords import pwd_context  # noqa: E402
+from app.settings import settings  # noqa: E402
+from app.versions import response_cache  # noqa: E402
+
+SENHA = "senha-teste"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def banco():
+    Base.metadata.create_all(get_engine())
+    yield
+    get_engine().dispose()
+
+
+@pytest.fixture(scope="session")
+def usuario(banco) -> str:
+    email = "motorista@teste.local"
+    db = new_session()
+    try:
+        db.add(User(nome="Motorista", email=email, password=pwd_context.hash(SENHA), is_admin=False))
+        db.commit()
+    finally:
+        db.close()
+    return email
+
+
+class ContadorSQL:
+    """Statements executados pelos engines do app (sync e async) dentro de `medir()`."""
+
+    def __init__(self):
+        self.total = 0
+        self.statements: list[str] = []
+        self._ativo = False
+
+    def registrar(self, conn, cursor, statement, parameters, context, executemany):
+        if self._ativo:
+            self.total += 1
+            self.statements.append(statement)
+
+    @contextmanager
+    def medir(self):
+        self.total, self.statements, self._ativo = 0, [], True
+        try:
+            yield self
+        finally:
+            self._ativo = False
+
+
+@pytest.fixture(params=["sync", "async"])
+def modo(request, monkeypatch) -> str:
+    monkeypatch.setattr(settings, "DB_MODE", request.param)
+    return request.param
+
+
+@pytest.fixture
+def contador(modo):
+    contador = ContadorSQL()
+    engines = [get_engine()]
+    if modo == "async":
+        engines.append(get_async_engine().sync_engine)
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", contador.registrar)
+    yield contador
+    for engine in engines:
+        event.remove(engine, "before_cursor_execute", contador.registrar)
+
+
+@pytest.fixture
+def client(modo, usuario):
+    # main.py escolhe os routers (sync/async) no import: recarrega com o DB_MODE do teste
+    import app.main
+
+    main = importlib.reload(app.main)
+    principal_cache.invalidate()
+    response_cache._entries.clear()
+    with TestClient(main.app) as client:
+        r = client.post("/auth/login", data={"username": usuario, "password": SENHA})
+        r.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {r.json()['access_token']}"
+        # Aquece o cache de principais: as contagens medem só a rota
+        client.get("/veiculos").raise_for_status()
+        yield client
@@ -0,0 +1,76 @@
+"""Gastos e km/l por veículo no gráfico do dashboard."""
+from datetime import datetime, timedelta, timezone
+
+from app.aggregates import vehicle_series
+from app.db import new_session
+from app.models import Abastecimento, User, Veiculo
+
+
+def test_km_por_litro_sem_litros_do_primeiro(banco):
+    hoje = datetime.now(timezone.utc)
+    db = new_session()
+    try:
+        user = User(nome="Gráfico", email="grafico@teste.local", password="x", is_admin=False)
+        db.add(user)
+        db.flush()
+        carro = Veiculo(user_id=user.id, placa="KML1A00")
+        db.add(carro)
+        db.flush()
+        # 40 L no primeiro abastecimento (km de antes do período), depois 300 km com 30 L
+        for dias, litros, km in ((3, 40, 10_000), (1, 30, 10_300)):
+            db.add(Abastecimento(
+                user_id=user.id,
+                veiculo_id=carro.id,
+                data_hora=hoje - timedelta(days=dias),
+                posto="OUTRO",
+                valor=200,
+                litros=litros,
+                km_odometro=km,
+            ))
+        db.commit()
+
+        [serie] = vehicle_series(db, user.id, hoje)["consumo_por_veiculo_6m"]
+    finally:
+        db.close()
+
+    assert serie["litros"] == 70.0
+    assert serie["km_rodado"] == 300
+    assert serie["km_por_litro"] == 10.0
+
+
+def test_gasto_total_por_veiculo_e_serie_do_periodo(banco):
+    hoje = datetime.now(timezone.utc)
+    db = new_session()
+    try:
+        user = User(nome="Frota", email="frota-graf@teste.local", password="x", is_admin=False)
+        db.add(user)
+        db.flush()
+        antigo, parado = Veiculo(user_id=user.id, placa="ANT1A00"), Veiculo(user_id=user.id, placa="PAR1A00")
+        db.add_all([antigo, parado])
+        db.flush()
+        # Um abastecimento de um ano atrás (fora do gráfico) e um recente
+        for dias, valor in ((365, 150), (2, 250)):
+            db.add(Abastecimento(
+                user_id=user.id,
+                veiculo_id=antigo.id,
+                data_hora=hoje - timedelta(days=dias),
+                posto="OUTRO",
+                valor=valor,
+                litros=30,
+                km_odometro=20_000 + dias,
+            ))
+        db.commit()
+
+        series = vehicle_series(db, user.id, hoje)
+        ids = antigo.id, parado.id
+    finally:
+        db.close()
+
+    # Todo o histórico, com o veículo sem abastecimentos zerado
+    assert series["gastos_por_veiculo"] == [
+        {"veiculo_id": ids[0], "veiculo": "ANT1A00", "valor": 400.0},
+        {"veiculo_id": ids[1], "veiculo": "PAR1A00", "valor": 0.0},
+    ]
+    antigo_6m, parado_6m = series["consumo_por_veiculo_6m"]
+    assert (antigo_6m["valor"], antigo_6m["quantidade"]) == (250.0, 1)
+    assert (parado_6m["valor"], parado_6m["quantidade"], parado_6m["km_por_litro"]) == (0.0, 0, None)
@@ -0,0 +1,51 @@
+"""Autenticação do stream SSE (/dashboard/eventos)."""
+import logging
+
+import pytest
+from fastapi import HTTPException
+
+from app.auth import create_access_token, principal_cache
+from app.db import new_session
+from app.models import User
+from app.routes.dashboard import _OcultarTokenNaURL, _principal_sse
+from app.settings import settings
+
+
+@pytest.fixture
+def user_id(usuario) -> int:
+    principal_cache.invalidate()
+    db = new_session()
+    try:
+        return db.query(User.id).filter(User.email == usuario).scalar()
+    finally:
+        db.close()
+
+
+def test_header(user_id):
+    token = create_access_token({"sub": str(user_id)})
+    assert _principal_sse(token_header=token, token=None).id == user_id
+
+
+def test_usuario_inexistente():
+    token = create_access_token({"sub": "987654"})
+    with pytest.raises(HTTPException) as erro:
+        _principal_sse(token_header=token, token=None)
+    assert erro.value.status_code == 401
+
+
+def test_token_na_url_so_com_opt_in(user_id, monkeypatch):
+    token = create_access_token({"sub": str(user_id)})
+    with pytest.raises(HTTPException):
+        _principal_sse(token_header=None, token=token)
+
+    monkeypatch.setattr(settings, "EVENTS_TOKEN_QUERY", True)
+    assert _principal_sse(token_header=None, token=token).id == user_id
+
+
+def test_access_log_sem_token():
+    record = logging.LogRecord(
+        "uvicorn.access", logging.INFO, __file__, 0, '%s - "%s %s HTTP/%s" %d',
+        ("127.0.0.1:5000", "GET", "/dashboard/eventos?x=1&token=abc.def.ghi", "1.1", 200), None,
+    )
+    assert _OcultarTokenNaURL().filter(record)
+    assert record.getMessage() == '127.0.0.1:5000 - "GET /dashboard/eventos?x=1&token=*** HTTP/1.1" 200'
@@ -0,0 +1,79 @@
+"""km_rodado da exportação com e sem período (a linha de contexto antes de `inicio`)."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.db import new_session
+from app.exporter import export_stmt
+from app.listing import list_stmt
+from app.models import Abastecimento, User, Veiculo
+
+BASE = datetime(2026, 1, 1, 8, 0)
+
+
+@pytest.fixture(scope="module")
+def frota(banco) -> int:
+    db = new_session()
+    try:
+        user = User(nome="Exportação", email="export@teste.local", password="x", is_admin=False)
+        db.add(user)
+        db.flush()
+        carro = Veiculo(user_id=user.id, placa="ABC1D23")
+        moto = Veiculo(user_id=user.id, placa="XYZ9K87")
+        db.add_all([carro, moto])
+        db.flush()
+        # Cadeias intercaladas: carro, moto e lançamentos sem veículo
+        km = {carro.id: 10_000, moto.id: 2_000, None: 50_000}
+        for dia in range(12):
+            veiculo_id = (carro.id, moto.id, None)[dia % 3]
+            km[veiculo_id] += 300 + dia
+            db.add(Abastecimento(
+                user_id=user.id,
+                veiculo_id=veiculo_id,
+                data_hora=BASE + timedelta(days=dia),
+                posto="IPIRANGA" if dia % 2 else "OUTRO",
+                valor=200,
+                litros=30,
+                km_odometro=km[veiculo_id],
+            ))
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def _km_rodado(user_id: int, **filtros) -> dict[int, int | None]:
+    db = new_session()
+    try:
+        return {r.id: r.km_rodado for r in db.execute(export_stmt(user_id, **filtros))}
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("dias", [3, 5, 7])
+def test_periodo_mantem_km_rodado(frota, dias):
+    completo = _km_rodado(frota)
+    periodo = _km_rodado(frota, inicio=BASE + timedelta(days=dias), fim=BASE + timedelta(days=dias + 4))
+
+    assert len(periodo) == 4
+    # Primeira linha de cada cadeia no período também vem com km_rodado (contexto antes de `inicio`)
+    assert all(v is not None for v in periodo.values())
+    assert periodo == {i: completo[i] for i in periodo}
+
+
+def test_posto_filtra_depois_do_lag(frota):
+    completo = _km_rodado(frota)
+    ipiranga = _km_rodado(frota, inicio=BASE + timedelta(days=3), posto="IPIRANGA")
+
+    assert ipiranga
+    assert ipiranga == {i: completo[i] for i in ipiranga}
+
+
+def test_mesmo_km_rodado_da_listagem(frota):
+    # Exportação (LAG) e listagem (km_anterior_expr) seguem a mesma cadeia
+    db = new_session()
+    try:
+        listagem = {r.id: r.km_rodado for r in db.execute(list_stmt(frota, 100))}
+    finally:
+        db.close()
+    assert _km_rodado(frota) == listagem
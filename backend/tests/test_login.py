@@ -0,0 +1,77 @@
+"""Login: a conexão do banco volta ao pool antes do bcrypt."""
+import pytest
+from sqlalchemy import event
+
+import app.routes.auth
+import app.routes_async.auth
+from app.db import get_async_engine, get_engine, new_session
+from app.models import User
+from app.passwords import pwd_context, verify_and_update
+
+from conftest import SENHA
+
+
+@pytest.fixture
+def conexoes_no_bcrypt(modo, monkeypatch):
+    """Conexões do pool em uso no momento em que o bcrypt roda."""
+    medidas = []
+    em_uso = [0]
+    engine = get_async_engine().sync_engine if modo == "async" else get_engine()
+
+    # Eventos do pool: valem também para o NullPool do aiosqlite
+    def checkout(*args):
+        em_uso[0] += 1
+
+    def checkin(*args):
+        em_uso[0] -= 1
+
+    event.listen(engine, "checkout", checkout)
+    event.listen(engine, "checkin", checkin)
+
+    async def verificar(password, hashed):
+        medidas.append(em_uso[0])
+        return await verify_and_update(password, hashed)
+
+    monkeypatch.setattr(app.routes.auth, "verify_and_update", verificar)
+    monkeypatch.setattr(app.routes_async.auth, "verify_and_update", verificar)
+    yield medidas
+    event.remove(engine, "checkout", checkout)
+    event.remove(engine, "checkin", checkin)
+
+
+def test_bcrypt_sem_conexao(client, usuario, conexoes_no_bcrypt):
+    r = client.post("/auth/login", data={"username": usuario, "password": SENHA})
+    assert r.status_code == 200
+    assert conexoes_no_bcrypt == [0]
+
+
+def test_senha_errada(client, usuario):
+    r = client.post("/auth/login", data={"username": usuario, "password": "errada"})
+    assert r.status_code == 401
+
+
+def test_rehash(client, monkeypatch):
+    # Hash com custo desatualizado é regravado no login, numa transação nova
+    db = new_session()
+    try:
+        db.add(User(nome="Rehash", email="rehash@teste.local", password=pwd_context.hash(SENHA), is_admin=False))
+        db.commit()
+    finally:
+        db.close()
+
+    async def verificar(password, hashed):
+        return True, "hash-novo"
+
+    monkeypatch.setattr(app.routes.auth, "verify_and_update", verificar)
+    monkeypatch.setattr(app.routes_async.auth, "verify_and_update", verificar)
+    r = client.post("/auth/login", data={"username": "rehash@teste.local", "password": SENHA})
+    assert r.status_code == 200
+
+    db = new_session()
+    try:
+        user = db.query(User).filter(User.email == "rehash@teste.local").one()
+        assert user.password == "hash-novo"
+    finally:
+        db.query(User).filter(User.email == "rehash@teste.local").delete()
+        db.commit()
+        db.close()
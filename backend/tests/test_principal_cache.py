@@ -0,0 +1,59 @@
+"""Principal em cache some quando papel/senha mudam ou o usuário é excluído."""
+from app.auth import Principal, principal_cache
+from app.db import new_session
+from app.models import User
+
+
+def _usuario(email: str) -> int:
+    db = new_session()
+    try:
+        user = User(nome="Cache", email=email, password="x", is_admin=False)
+        db.add(user)
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def _alterar(user_id: int, **campos) -> None:
+    db = new_session()
+    try:
+        user = db.get(User, user_id)
+        for campo, valor in campos.items():
+            setattr(user, campo, valor)
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_promocao_invalida():
+    user_id = _usuario("promovido@teste.local")
+    principal_cache.set("token", Principal(id=user_id, is_admin=False))
+    _alterar(user_id, is_admin=True)
+    assert principal_cache.get(user_id, "token") is None
+
+
+def test_troca_de_senha_invalida():
+    user_id = _usuario("senha@teste.local")
+    principal_cache.set("token", Principal(id=user_id, is_admin=False))
+    _alterar(user_id, password="novo-hash")
+    assert principal_cache.get(user_id, "token") is None
+
+
+def test_outros_campos_mantem_cache():
+    user_id = _usuario("nome@teste.local")
+    principal_cache.set("token", Principal(id=user_id, is_admin=False))
+    _alterar(user_id, nome="Outro nome")
+    assert principal_cache.get(user_id, "token") is not None
+
+
+def test_exclusao_invalida():
+    user_id = _usuario("excluido@teste.local")
+    principal_cache.set("token", Principal(id=user_id, is_admin=False))
+    db = new_session()
+    try:
+        db.delete(db.get(User, user_id))
+        db.commit()
+    finally:
+        db.close()
+    assert principal_cache.get(user_id, "token") is None
@@ -0,0 +1,132 @@
+"""Statements SQL por request, nas rotas sync e async (guarda contra N+1)."""
+import pytest
+from sqlalchemy import event
+
+from app.auth import principal_cache
+from app.db import get_async_engine, get_engine
+from app.settings import settings
+from app.versions import response_cache
+
+
+def _novo(km: int, posto: str = "IPIRANGA") -> dict:
+    return {"posto": posto, "valor": 250.0, "litros": 42.5, "km_odometro": km}
+
+
+@pytest.fixture
+def lancamentos(client):
+    ids = []
+    for km, posto in ((10_000, "IPIRANGA"), (10_400, "OUTRO"), (10_800, "IPIRANGA")):
+        r = client.post("/abastecimentos", json=_novo(km, posto))
+        r.raise_for_status()
+        ids.append(r.json()["id"])
+    return ids
+
+
+def test_create(client, contador, lancamentos):
+    with contador.medir():
+        r = client.post("/abastecimentos", json=_novo(20_000))
+    assert r.status_code == 201
+    assert contador.total <= 4, contador.statements
+
+
+def test_update(client, contador, lancamentos):
+    with contador.medir():
+        r = client.put(f"/abastecimentos/{lancamentos[0]}", json={"valor": 300.0, "posto": "OUTRO"})
+    assert r.status_code == 200
+    assert contador.total <= 6, contador.statements
+
+
+@pytest.mark.parametrize("path, limite", [
+    ("/dashboard/summary", 3),
+    ("/dashboard/quinzena", 3),
+    ("/abastecimentos/summary", 2),
+    ("/abastecimentos/charts", 3),
+    ("/dashboard/bootstrap", 6),
+])
+def test_agregados(client, contador, lancamentos, path, limite):
+    response_cache._entries.clear()
+    with contador.medir():
+        r = client.get(path)
+    assert r.status_code == 200
+    assert contador.total <= limite, contador.statements
+
+
+@pytest.mark.parametrize("path", [
+    "/dashboard/summary",
+    "/dashboard/quinzena",
+    "/abastecimentos/charts",
+    "/dashboard/bootstrap",
+])
+def test_agregado_em_cache(client, contador, lancamentos, path):
+    client.get(path).raise_for_status()
+    with contador.medir():
+        r = client.get(path)
+    assert r.status_code == 200
+    # Só a versão dos dados: a resposta sai do cache
+    assert contador.total == 1, contador.statements
+
+
+def test_listagem(client, contador, lancamentos):
+    with contador.medir():
+        r = client.get("/abastecimentos", params={"limit": 2})
+    assert r.status_code == 200
+    assert len(r.json()) == 2
+    assert contador.total == 1, contador.statements
+
+
+def test_routers_do_modo(client, modo):
+    # No modo async as rotas async vêm antes: são elas que respondem (e são medidas)
+    rota = next(r for r in client.app.routes if getattr(r, "path", None) == "/dashboard/summary")
+    esperado = "app.routes_async.dashboard" if modo == "async" else "app.routes.dashboard"
+    assert rota.endpoint.__module__ == esperado
+
+
+@pytest.mark.parametrize("limite", [1, 2, 3])
+def test_bootstrap_conexoes(client, modo, lancamentos, monkeypatch, limite):
+    # Sync: seções em sequência na sessão do request. Async: em paralelo, em até
+    # BOOTSTRAP_CONEXOES conexões do pool
+    monkeypatch.setattr(settings, "BOOTSTRAP_CONEXOES", limite)
+    engine = get_async_engine().sync_engine if modo == "async" else get_engine()
+    em_uso, pico = [0], [0]
+
+    def checkout(*args):
+        em_uso[0] += 1
+        pico[0] = max(pico[0], em_uso[0])
+
+    def checkin(*args):
+        em_uso[0] -= 1
+
+    event.listen(engine, "checkout", checkout)
+    event.listen(engine, "checkin", checkin)
+    try:
+        response_cache._entries.clear()
+        r = client.get("/dashboard/bootstrap")
+    finally:
+        event.remove(engine, "checkout", checkout)
+        event.remove(engine, "checkin", checkin)
+    assert r.status_code == 200
+    assert r.json().keys() == {"summary", "recent_entries", "ultimo_km", "charts"}
+    assert pico[0] == (limite if modo == "async" else 1)
+
+
+@pytest.mark.parametrize("path", ["/veiculos", "/abastecimentos", "/dashboard/summary"])
+def test_leitura_sem_principal_em_cache_usa_uma_conexao(client, modo, lancamentos, path):
+    # O principal é resolvido na sessão de leitura da rota, não numa sessão à parte
+    # (/veiculos segue no router sync mesmo com DB_MODE=async: conta os dois engines)
+    engines = [get_engine()] + ([get_async_engine().sync_engine] if modo == "async" else [])
+    checkouts = []
+
+    def checkout(*args):
+        checkouts.append(1)
+
+    for engine in engines:
+        event.listen(engine, "checkout", checkout)
+    try:
+        principal_cache.invalidate()
+        response_cache._entries.clear()
+        r = client.get(path)
+    finally:
+        for engine in engines:
+            event.remove(engine, "checkout", checkout)
+    assert r.status_code == 200
+    assert len(checkouts) == 1
@@ -0,0 +1,28 @@
+"""Planos das queries das rotas contra bench/plans_baseline.json (só PostgreSQL).
+
+Roda bench/plans.py (que gera os dados do bench se o banco estiver vazio) no
+banco de PLANS_DATABASE_URL; sem ele, o módulo é pulado.
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+PLANS_DATABASE_URL = os.environ.get("PLANS_DATABASE_URL")
+if not PLANS_DATABASE_URL:
+    pytest.skip("PLANS_DATABASE_URL não definido (PostgreSQL local do bench)", allow_module_level=True)
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+
+def test_planos_dentro_do_baseline():
+    r = subprocess.run(
+        [sys.executable, str(BACKEND / "bench" / "plans.py"), "--seed-se-vazio"],
+        cwd=BACKEND,
+        env={**os.environ, "DATABASE_URL": PLANS_DATABASE_URL},
+        capture_output=True,
+        text=True,
+    )
+    assert r.returncode == 0, r.stdout + r.stderr
@@ -0,0 +1,85 @@
+"""Read-your-writes: a marca sai antes do corpo da resposta e vale em outros workers."""
+import asyncio
+import time
+
+from app import replica
+from app.auth import create_access_token
+from app.replica import (
+    HEADER_ESCRITA,
+    ReadYourWritesMiddleware,
+    assinar_escrita,
+    escrita_assinada_recente,
+    recent_writes,
+)
+from app.settings import settings
+
+
+def _chamar(status: int, user_id: int, headers: list | None = None) -> list[bool]:
+    # Estado da marca no momento de cada mensagem enviada ao cliente
+    marcado_ao_enviar = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}", "more_body": False})
+
+    async def send(message):
+        marcado_ao_enviar.append(recent_writes.recent(user_id))
+        if headers is not None and message["type"] == "http.response.start":
+            headers.extend(message["headers"])
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    token = create_access_token({"sub": str(user_id)})
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+    }
+    asyncio.run(ReadYourWritesMiddleware(app)(scope, receive, send))
+    return marcado_ao_enviar
+
+
+def test_marca_no_inicio_da_resposta():
+    assert _chamar(201, 90_001) == [True, True]
+
+
+def test_erro_nao_marca():
+    assert _chamar(422, 90_002) == [False, False]
+
+
+def test_escrita_devolve_marca_assinada():
+    headers = []
+    _chamar(200, 90_003, headers)
+    marca = dict(headers)[HEADER_ESCRITA.lower().encode()].decode()
+    assert escrita_assinada_recente(marca, 90_003)
+
+    headers = []
+    _chamar(400, 90_004, headers)
+    assert HEADER_ESCRITA.lower().encode() not in dict(headers)
+
+
+def test_marca_assinada_recusada():
+    marca = assinar_escrita(90_005)
+    dono, ate, assinatura = marca.split(".")
+    assert not escrita_assinada_recente(marca, 90_006)  # outro usuário
+    assert not escrita_assinada_recente(f"{dono}.{int(ate) + 3600}.{assinatura}", 90_005)  # prazo forjado
+    assert not escrita_assinada_recente(f"{dono}.{ate}.{'0' * len(assinatura)}", 90_005)
+    assert not escrita_assinada_recente("lixo", 90_005)
+    assert not escrita_assinada_recente(None, 90_005)
+
+
+def test_marca_vencida(monkeypatch):
+    marca = assinar_escrita(90_007)
+    agora = time.time()
+    monkeypatch.setattr(replica.time, "time", lambda: agora + settings.READ_YOUR_WRITES_SECONDS + 2)
+    assert not escrita_assinada_recente(marca, 90_007)
+
+
+def test_marca_do_header_vale_em_outro_worker(monkeypatch):
+    # Outro processo: nada em recent_writes, só o header que o cliente reenviou
+    monkeypatch.setattr(settings, "DATABASE_READ_URL", "postgresql+psycopg://replica/db")
+    assert not recent_writes.recent(90_008)
+    assert replica._usar_replica(90_008)
+    assert not replica._usar_replica(90_008, assinar_escrita(90_008))
+    assert replica._usar_replica(90_008, assinar_escrita(90_009))
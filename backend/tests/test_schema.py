@@ -0,0 +1,29 @@
+"""Conferência do schema do banco contra os models (startup e `manage upgrade-db`)."""
+from sqlalchemy import create_engine, text
+
+from app.db import Base, get_engine
+from app.schema import rollups_vazios, schema_pendente
+
+
+def test_banco_dos_testes_em_dia(banco):
+    with get_engine().connect() as conn:
+        assert schema_pendente(conn) == []
+
+
+def test_banco_antigo(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'antigo.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE users DROP COLUMN data_version"))
+        conn.execute(text("DROP TABLE sync_operacoes"))
+        conn.execute(text(
+            "INSERT INTO users (nome, email, password, is_admin) VALUES ('A', 'a@teste.local', 'x', 0)"
+        ))
+        conn.execute(text(
+            "INSERT INTO abastecimentos (user_id, data_hora, posto, valor, litros, km_odometro) "
+            "VALUES (1, '2026-01-05 10:00:00', 'OUTRO', 200, 40, 1000)"
+        ))
+    with engine.connect() as conn:
+        assert schema_pendente(conn) == ["coluna users.data_version", "tabela sync_operacoes"]
+        assert rollups_vazios(conn)
+    engine.dispose()
@@ -1,6 +1,7 @@
 import { useEffect, useState } from 'react';
 import { api } from '../services/api';
 import { clearToken } from '../services/authStore';
+import { assinarEventos } from '../services/eventos';
 
 interface Summary {
   total_mes: number;
@@ -12,9 +13,19 @@ export default function Dashboard() {
   const [data, setData] = useState<Summary | null>(null);
 
   useEffect(() => {
-    api.get('/dashboard/summary')
-      .then(res => setData(res.data))
+    // Só a seção que esta tela mostra (o bootstrap também traz lançamentos, km e gráficos)
+    api.get('/dashboard/bootstrap', { params: { fields: 'summary' } })
+      .then(res => setData(res.data.summary))
       .catch(() => {});
+
+    // Atualizações ao vivo: cada evento traz os totais já recalculados
+    return assinarEventos('dashboard', (evento) => {
+      setData({
+        total_mes: evento.total_mes,
+        total_quinzena: evento.total_quinzena,
+        litros_mes: evento.litros_mes,
+      });
+    });
   }, []);
 
   function logout() {
@@ -13,16 +13,27 @@ export function setAuthToken(token: string | null) {
   }
 }
 
+// Marca assinada da última escrita: reenviada, faz os GETs seguintes lerem do
+// primário (e não da réplica) em qualquer worker até o servidor a dar por vencida.
+let marcaEscrita: string | null = null;
+
 api.interceptors.request.use((config) => {
   const token = localStorage.getItem('token');
   if (token && config.headers) {
     config.headers.Authorization = `Bearer ${token}`;
   }
+  if (marcaEscrita && config.headers) {
+    config.headers['X-Read-Your-Writes'] = marcaEscrita;
+  }
   return config;
 });
 
 api.interceptors.response.use(
-  response => response,
+  response => {
+    const marca = response.headers['x-read-your-writes'];
+    if (marca) marcaEscrita = marca;
+    return response;
+  },
   error => {
     if (error.response?.status === 401) {
       clearToken();
@@ -0,0 +1,53 @@
+import { getToken } from './authStore';
+
+// Stream SSE do dashboard lido via fetch: EventSource não envia o header
+// Authorization, e o token na URL acabaria nos logs de acesso.
+export function assinarEventos(evento: string, onDados: (dados: any) => void): () => void {
+  const controle = new AbortController();
+  let retry = 5000;
+
+  async function conectar() {
+    const token = getToken();
+    if (!token) return;
+    const res = await fetch(`${import.meta.env.VITE_API_URL}/dashboard/eventos`, {
+      headers: { Authorization: `Bearer ${token}`, Accept: 'text/event-stream' },
+      signal: controle.signal,
+    });
+    if (res.status === 401 || !res.body) return;
+
+    const leitor = res.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = '';
+    for (;;) {
+      const { value, done } = await leitor.read();
+      if (done) break;
+      buffer += value;
+      const blocos = buffer.split('\n\n');
+      buffer = blocos.pop() ?? '';
+      for (const bloco of blocos) {
+        let nome = 'message';
+        let dados = '';
+        for (const linha of bloco.split('\n')) {
+          if (linha.startsWith('event:')) nome = linha.slice(6).trim();
+          else if (linha.startsWith('data:')) dados += linha.slice(5).trim();
+          else if (linha.startsWith('retry:')) retry = Number(linha.slice(6)) || retry;
+        }
+        if (nome === evento && dados) onDados(JSON.parse(dados));
+      }
+    }
+  }
+
+  // Reconecta como o EventSource: depois de `retry` ms, até o cancelamento
+  (async () => {
+    while (!controle.signal.aborted) {
+      try {
+        await conectar();
+      } catch {
+        // rede caiu ou cancelado
+      }
+      if (controle.signal.aborted || !getToken()) return;
+      await new Promise(r => setTimeout(r, retry));
+    }
+  })();
+
+  return () => controle.abort();
+}